@@ -2,6 +2,9 @@
 
 import pyautogui
 import time
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 # Configure PyAutoGUI failsafe (optional but recommended)
 pyautogui.FAILSAFE = True # Move mouse to top-left corner to abort
@@ -19,14 +22,14 @@ def click(x: int, y: int, button: str = 'left', clicks: int = 1, interval: float
         interval: Time interval between clicks for double-clicks (in seconds).
     """
     try:
-        print(f"Attempting to click {button} button {clicks} times at ({x}, {y})")
+        log.debug("Attempting to click %s button %s times at (%s, %s)", button, clicks, x, y)
         pyautogui.click(x=x, y=y, clicks=clicks, interval=interval, button=button)
-        print(f"Click successful at ({x}, {y})")
+        log.info("Click successful at (%s, %s)", x, y)
     except pyautogui.FailSafeException:
-        print("FAILSAFE triggered! Mouse moved to top-left corner.")
+        log.warning("FAILSAFE triggered! Mouse moved to top-left corner.")
         raise # Re-raise so the runner knows execution stopped
     except Exception as e:
-        print(f"Error during click at ({x}, {y}): {e}")
+        log.error("Error during click at (%s, %s): %s", x, y, e)
         raise # Re-raise for the runner to handle
 
 def move_to(x: int, y: int, duration: float = 0.1):
@@ -34,10 +37,10 @@ def move_to(x: int, y: int, duration: float = 0.1):
     try:
         pyautogui.moveTo(x, y, duration=duration)
     except pyautogui.FailSafeException:
-        print("FAILSAFE triggered during move!")
+        log.warning("FAILSAFE triggered during move!")
         raise
     except Exception as e:
-        print(f"Error during mouse move to ({x}, {y}): {e}")
+        log.error("Error during mouse move to (%s, %s): %s", x, y, e)
         raise
 
 # Add other functions later if needed (drag, scroll, etc.)
\ No newline at end of file
@@ -3,6 +3,9 @@
 import platform
 import time
 from typing import Optional, Tuple
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 # Import Windows-specific modules conditionally
 if platform.system() == "Windows":
@@ -11,7 +14,7 @@ if platform.system() == "Windows":
         import win32api
         import win32con
     except ImportError:
-        print("Warning: pywin32 library not found. Background simulation will be disabled.")
+        log.warning("Warning: pywin32 library not found. Background simulation will be disabled.")
         win32gui = None; win32api = None; win32con = None
 else:
     win32gui = None; win32api = None; win32con = None
@@ -40,7 +43,7 @@ def simulate_click(hwnd: int, x: int, y: int, button: str = 'left', clicks: int
     # Convert relative coordinates to lParam format
     # MAKELONG packs the x (low-order word) and y (high-order word)
     lParam = win32api.MAKELONG(x, y)
-    print(f"Simulating {button} {clicks}x click at client coords ({x},{y}) on HWND {hwnd}, lParam={lParam}")
+    log.debug("Simulating %s %sx click at client coords (%s,%s) on HWND %s, lParam=%s", button, clicks, x, y, hwnd, lParam)
 
     # Map button string to Windows message constants
     if button == 'left':
@@ -72,11 +75,11 @@ def simulate_click(hwnd: int, x: int, y: int, button: str = 'left', clicks: int
             if clicks > 1:
                  time.sleep(delay_ms / 1000.0) # Wait between multiple clicks if needed
 
-        print(f"Posted {button} click messages to HWND {hwnd}")
+        log.info("Posted %s click messages to HWND %s", button, hwnd)
 
     except Exception as e:
         # This might catch errors if the HWND becomes invalid between checks and posting
-        print(f"Error posting click messages to HWND {hwnd}: {e}")
+        log.error("Error posting click messages to HWND %s: %s", hwnd, e)
         raise RuntimeError(f"Failed to simulate click on HWND {hwnd}: {e}")
 
 
@@ -91,7 +94,7 @@ def screen_to_client(hwnd: int, screen_x: int, screen_y: int) -> Optional[Tuple[
         client_x, client_y = win32gui.ScreenToClient(hwnd, (screen_x, screen_y))
         return client_x, client_y
     except Exception as e:
-        print(f"Error converting screen coords ({screen_x},{screen_y}) to client for HWND {hwnd}: {e}")
+        log.error("Error converting screen coords (%s,%s) to client for HWND %s: %s", screen_x, screen_y, hwnd, e)
         return None
 
 # Example Usage (for testing - hard to test directly without a target HWND)
@@ -0,0 +1,53 @@
+# benchmarks/bench_capture_session.py
+#
+# Compares a fresh mss handle per capture (the old screen_capture behavior)
+# with the persistent per-thread CaptureSession. Small regions show the setup
+# cost most clearly, since the grab itself is cheap. Needs a display.
+#
+#   python -m benchmarks.bench_capture_session --repeat 50
+
+import argparse
+import statistics
+import time
+
+import cv2
+import mss
+import numpy as np
+
+from vision import screen_capture
+
+REGIONS = {
+    "pixel": (100, 100, 1, 1),
+    "200x200": (100, 100, 200, 200),
+    "full": None,
+}
+
+def _capture_per_call(region):
+    with mss.mss() as sct:
+        monitor = sct.monitors[1] if region is None else {"left": region[0], "top": region[1], "width": region[2], "height": region[3]}
+        return cv2.cvtColor(np.array(sct.grab(monitor)), cv2.COLOR_BGRA2BGR)
+
+def _time(capture, region, repeat: int) -> float:
+    capture(region) # Warm-up
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter(); capture(region); timings.append(time.perf_counter() - start)
+    return statistics.median(timings)
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-call mss handle vs persistent capture session.")
+    parser.add_argument("--repeat", type=int, default=30, help="Captures per configuration (median is reported).")
+    parser.add_argument("--regions", nargs="+", default=list(REGIONS), choices=list(REGIONS), help="Capture regions to test.")
+    args = parser.parse_args()
+
+    print(f"{'region':<10} {'per-call ms':>12} {'session ms':>11} {'saved ms':>9} {'speedup':>8}")
+    for name in args.regions:
+        region = REGIONS[name]
+        per_call_s = _time(_capture_per_call, region, args.repeat)
+        session_s = _time(screen_capture.capture, region, args.repeat)
+        print(f"{name:<10} {per_call_s * 1000:>12.2f} {session_s * 1000:>11.2f} {(per_call_s - session_s) * 1000:>9.2f} {per_call_s / session_s:>7.2f}x")
+
+    screen_capture.close_all_sessions()
+
+if __name__ == "__main__":
+    main()
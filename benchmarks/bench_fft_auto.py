@@ -0,0 +1,76 @@
+# benchmarks/bench_fft_auto.py
+#
+# Checks the fft_mode="auto" choice end to end: find_template latency with
+# "auto", "never" and "always" on the suite's synthetic screens, per
+# resolution and configuration. "auto" and "never" are timed in alternating
+# order so drift hits both alike. "auto" must never be slower than "never"
+# (beyond the suite's latency tolerance); the exit code is 1 if it is.
+#
+#   python -m benchmarks.bench_fft_auto
+#   python -m benchmarks.bench_fft_auto --sizes 4k --configs gray-multi --repeat 5
+
+import argparse
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List, Tuple
+
+from benchmarks.suite import SUITE_SIZES, CONFIGS, SEARCH_OPTIONS, LATENCY_TOLERANCE, LATENCY_FLOOR_MS, _make_case
+from benchmarks.synthetic import synthetic_screen
+from vision import object_detector
+from vision.fft_match import spectrum_cache
+from core.log import set_profile, PROFILE_TURBO
+
+MODES = ["auto", "never", "always"]
+
+
+def _search_ms(template_path: str, config: dict, mode: str) -> float:
+    start = time.perf_counter()
+    object_detector.find_template(template_path, fft_mode=mode, **config, **SEARCH_OPTIONS)
+    return (time.perf_counter() - start) * 1000
+
+
+def _time_modes(template_path: str, config: dict, repeat: int) -> Tuple[Dict[str, float], bool]:
+    """Median ms per mode, and whether "auto" used the frequency domain (it left template spectra in the cache)."""
+    spectrum_cache.clear()
+    _search_ms(template_path, config, "auto") # Warm-up: template variants, and the spectra auto keeps
+    auto_used_fft = len(spectrum_cache) > 0
+    timings: Dict[str, List[float]] = {mode: [] for mode in MODES}
+    for i in range(repeat):
+        for mode in (["auto", "never"] if i % 2 == 0 else ["never", "auto"]): timings[mode].append(_search_ms(template_path, config, mode))
+    # "always" last: the search after it pays for re-faulting the memory its large buffers released
+    _search_ms(template_path, config, "always")
+    for _ in range(repeat): timings["always"].append(_search_ms(template_path, config, "always"))
+    return {mode: statistics.median(values) for mode, values in timings.items()}, auto_used_fft
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="fft_mode auto vs never vs always.")
+    parser.add_argument("--sizes", nargs="+", default=SUITE_SIZES, choices=SUITE_SIZES)
+    parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS))
+    parser.add_argument("--repeat", type=int, default=6, help="Timed searches per mode (median is reported).")
+    args = parser.parse_args()
+
+    set_profile(PROFILE_TURBO)
+    problems = []
+    print(f"{'case':<20} " + " ".join(f"{mode + ' ms':>10}" for mode in MODES) + "  auto picked")
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for size_name in args.sizes:
+            for config_name in args.configs:
+                config = CONFIGS[config_name]
+                haystack, template_path, _ = _make_case(size_name, config, 0, tmp_dir)
+                with synthetic_screen(haystack):
+                    timings, auto_used_fft = _time_modes(template_path, config, args.repeat)
+                picked = "fft" if auto_used_fft else "spatial"
+                case = f"{size_name}/{config_name}"
+                print(f"{case:<20} " + " ".join(f"{timings[mode]:>10.1f}" for mode in MODES) + f"  {picked}")
+                if timings["auto"] > timings["never"] * (1 + LATENCY_TOLERANCE) and timings["auto"] - timings["never"] > LATENCY_FLOOR_MS:
+                    problems.append(f"{case}: auto {timings['auto']:.1f} ms > never {timings['never']:.1f} ms")
+    object_detector.shutdown_pool()
+    for problem in problems: print(f"SLOWER: {problem}")
+    print("auto is never slower than never" if not problems else f"{len(problems)} case(s) where auto is slower")
+    return 1 if problems else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
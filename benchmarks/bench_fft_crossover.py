@@ -0,0 +1,66 @@
+# benchmarks/bench_fft_crossover.py
+#
+# Crossover chart of cv2.matchTemplate (TM_CCOEFF_NORMED) against the cached
+# frequency-domain path in vision.fft_match, over template size x haystack size.
+# Each cell is the per-search cost with the frame and template spectra already
+# cached (as in a multi-scale / multi-template search); the one-off frame
+# transform is listed per row. Cells read "F" where the FFT path was faster,
+# and the model column shows what fft_match.prefer_fft() picks for a 7-scale
+# search (F = frequency domain, S = matchTemplate).
+#
+#   python -m benchmarks.bench_fft_crossover --color --repeat 3
+
+import argparse
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import make_haystack
+from vision import fft_match
+
+HAYSTACK_SIZES = [(640, 480), (1280, 720), (1920, 1080), (2560, 1440)]
+TEMPLATE_SIZES = [32, 64, 96, 128, 192, 256, 384]
+
+def _median_ms(fn, repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter(); fn(); timings.append(time.perf_counter() - start)
+    return statistics.median(timings) * 1000
+
+def main():
+    parser = argparse.ArgumentParser(description="matchTemplate vs FFT correlation crossover.")
+    parser.add_argument("--color", action="store_true", help="Match BGR instead of grayscale images.")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per cell (median is reported).")
+    args = parser.parse_args()
+
+    print(f"{'haystack':<11} {'frame ms':>8}  " + "  ".join(f"{s:>14}" for s in TEMPLATE_SIZES))
+    print(f"{'':<11} {'':>8}  " + "  ".join(f"{'cv/fft (model)':>14}" for _ in TEMPLATE_SIZES))
+    max_error = 0.0
+    for (width, height) in HAYSTACK_SIZES:
+        haystack = make_haystack(width, height, color=args.color)
+        fft_haystack = fft_match.FFTHaystack(haystack)
+        frame_ms = _median_ms(lambda: fft_match.FFTHaystack(haystack).spectra(), args.repeat)
+        fft_haystack.spectra()
+        cells = []
+        for size in TEMPLATE_SIZES:
+            w = size; h = size * 3 // 4
+            if w > width or h > height:
+                cells.append(f"{'-':>14}"); continue
+            template = np.ascontiguousarray(haystack[height // 4:height // 4 + h, width // 4:width // 4 + w])
+            spectra, norm = fft_match.spectrum_cache.get(("bench", width, height, size, args.color), template, fft_haystack.size)
+            cv_ms = _median_ms(lambda: cv2.matchTemplate(haystack, template, cv2.TM_CCOEFF_NORMED), args.repeat)
+            def fft_search():
+                fft_haystack._window_std.clear() # Window sums are per template size, so not reused across scales
+                return fft_match.match_ccoeff_normed(fft_haystack, template, spectra, norm)
+            fft_ms = _median_ms(fft_search, args.repeat)
+            max_error = max(max_error, float(np.abs(fft_search() - cv2.matchTemplate(haystack, template, cv2.TM_CCOEFF_NORMED)).max()))
+            winner = "F" if fft_ms < cv_ms else " "
+            model = "F" if fft_match.prefer_fft(width, height, searches=7) else "S"
+            cells.append(f"{cv_ms:>5.0f}/{fft_ms:<4.0f}{winner}({model})")
+        print(f"{width}x{height:<6} {frame_ms:>8.1f}  " + "  ".join(cells))
+    print(f"Max |fft - matchTemplate| over all cells: {max_error:.2e}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_parallel_matching.py
+#
+# Compares the serial multi-scale loop (workers=1) with the parallel scale/tile
+# engine in vision.object_detector on synthetic haystacks. Runs headless.
+#
+#   python -m benchmarks.bench_parallel_matching --workers 4 --repeat 5
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.synthetic import SIZES, make_haystack, make_template, embed
+from vision import object_detector
+from vision.template_cache import template_cache
+
+def _time_search(haystack, cached, workers: int, repeat: int):
+    timings = []; result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = object_detector._search_haystack(haystack, cached, 0.8, cv2.TM_CCOEFF_NORMED, workers=workers, early_exit_confidence=None)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result
+
+def main():
+    parser = argparse.ArgumentParser(description="Serial vs parallel template matching benchmark.")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Worker threads for the parallel run.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per configuration (median is reported).")
+    parser.add_argument("--sizes", nargs="+", default=list(SIZES), choices=list(SIZES), help="Haystack sizes to test.")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template = make_template(120, 80)
+        template_path = os.path.join(tmp_dir, "template.png")
+        cv2.imwrite(template_path, template)
+        cached = template_cache.get(template_path, True, object_detector.get_scales())
+
+        print(f"{'size':<10} {'serial ms':>10} {'parallel ms':>12} {'speedup':>8}  match")
+        for size_name in args.sizes:
+            width, height = SIZES[size_name]
+            haystack = make_haystack(width, height)
+            expected = embed(haystack, template, width * 2 // 3, height // 2)
+
+            serial_s, serial_result = _time_search(haystack, cached, 1, args.repeat)
+            parallel_s, parallel_result = _time_search(haystack, cached, args.workers, args.repeat)
+            same = serial_result is not None and parallel_result is not None and serial_result[:4] == parallel_result[:4] == expected
+            print(f"{size_name:<10} {serial_s * 1000:>10.1f} {parallel_s * 1000:>12.1f} {serial_s / parallel_s:>7.2f}x  {'ok' if same else 'MISMATCH'}")
+
+    object_detector.shutdown_pool()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# benchmarks/bench_scale_order.py
+#
+# Compares the exhaustive scale loop with best-first ordering + early exit in
+# vision.object_detector. The template is embedded at a known scale; the first
+# best-first call starts at 1.0, later calls start at the learned scale.
+#
+#   python -m benchmarks.bench_scale_order --scale 1.2 --repeat 5
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.synthetic import SIZES, make_haystack, make_template, embed
+from vision import object_detector
+
+def _run(haystack, cached, early_exit, start_scale, repeat: int):
+    timings = []; result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = object_detector._search_haystack(haystack, cached, 0.8, cv2.TM_CCOEFF_NORMED, workers=1, start_scale=start_scale, early_exit_confidence=early_exit)
+        timings.append(time.perf_counter() - start)
+    return statistics.median(timings), result, object_detector.get_last_search_stats()
+
+def main():
+    parser = argparse.ArgumentParser(description="Exhaustive vs best-first scale search benchmark.")
+    parser.add_argument("--size", default="1080p", choices=list(SIZES), help="Haystack size.")
+    parser.add_argument("--scale", type=float, default=1.2, help="Scale the template is embedded at.")
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per configuration (median is reported).")
+    args = parser.parse_args()
+
+    width, height = SIZES[args.size]
+    haystack = make_haystack(width, height)
+    template = make_template(120, 80)
+    embed(haystack, template, width // 3, height // 3, args.scale)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        template_path = os.path.join(tmp_dir, "template.png")
+        cv2.imwrite(template_path, template)
+        cached = object_detector.template_cache.get(template_path, True, object_detector.get_scales())
+
+        print(f"{'mode':<22} {'ms':>8} {'scales':>7}  stop")
+        for name, early_exit, start_scale in [
+            ("exhaustive", None, None),
+            ("best-first (cold)", object_detector.DEFAULT_CERTAIN_CONFIDENCE, None),
+            ("best-first (learned)", object_detector.DEFAULT_CERTAIN_CONFIDENCE, args.scale),
+        ]:
+            seconds, result, stats = _run(haystack, cached, early_exit, start_scale, args.repeat)
+            print(f"{name:<22} {seconds * 1000:>8.1f} {stats['scales_evaluated']:>3}/{stats['scales_total']:<3}  {stats['stop_reason']}  {result}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# benchmarks/extract_recording.py
+#
+# Extracts the frames of a frame recording (see vision/frame_recorder.py) as
+# PNG files, so misdetections and slow actions from a live run can be fed to
+# the detector benchmarks. frames.json lists every extracted frame with its
+# time, action, region/origin and detection result. If all extracted frames
+# have the same size, timestamps.txt is written as well, which makes the
+# directory replayable with vision.capture_backends.ImageDirectoryBackend
+# (coordinates are then relative to the frames' origin).
+#
+#   python -m benchmarks.extract_recording ~/.cv_autoclicker/recordings/20250101-120000 out/ --list
+#   python -m benchmarks.extract_recording REC out/ --action 4 --region 100,200,640,360
+
+import argparse
+import json
+import os
+import sys
+
+import cv2
+
+from vision.frame_recorder import RecordingReader
+
+
+def _list(reader: RecordingReader):
+    counts = {}
+    for record in reader.records():
+        if record.get("kind") != "frame": continue
+        key = (record["action"], record["type"], tuple(record["region"]) if record["region"] else None)
+        counts[key] = counts.get(key, 0) + 1
+    print(f"{'action':>6} {'type':<26} {'region':<26} {'frames':>7}")
+    for (action, action_type, region), count in sorted(counts.items(), key=lambda item: item[0][0]):
+        print(f"{action + 1:>6} {action_type:<26} {str(region or 'full screen'):<26} {count:>7}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Extract frames from a frame recording.")
+    parser.add_argument("recording", help="Recording directory.")
+    parser.add_argument("out", nargs="?", default=None, help="Output directory for the PNG frames.")
+    parser.add_argument("--list", action="store_true", help="Only list the recorded actions and regions.")
+    parser.add_argument("--action", type=int, default=None, help="Only frames of this action (1-based, as in the editor).")
+    parser.add_argument("--region", default=None, help="Only frames of this capture region, as left,top,width,height.")
+    parser.add_argument("--every", type=int, default=1, help="Keep every n-th matching frame.")
+    args = parser.parse_args()
+
+    reader = RecordingReader(args.recording)
+    if not reader.segments:
+        print(f"No recording found in '{args.recording}'."); return 1
+    if args.list or not args.out:
+        _list(reader); return 0
+
+    region = [int(v) for v in args.region.split(",")] if args.region else None
+    os.makedirs(args.out, exist_ok=True)
+    manifest = []; shapes = set(); matched = 0
+    for header, image in reader.frames(action=args.action - 1 if args.action else None):
+        if region is not None and header["region"] != region: continue
+        matched += 1
+        if (matched - 1) % args.every: continue
+        name = f"frame_{header['seq']:07d}.png"
+        cv2.imwrite(os.path.join(args.out, name), image)
+        shapes.add(image.shape)
+        manifest.append({"file": name, **{k: header[k] for k in ["seq", "t", "wall", "run", "action", "type", "region", "origin", "result"]}})
+    with open(os.path.join(args.out, "frames.json"), "w", encoding="utf-8") as f:
+        json.dump({"recording": args.recording, "meta": reader.meta, "frames": manifest}, f, indent=2)
+    if len(shapes) == 1:
+        with open(os.path.join(args.out, "timestamps.txt"), "w", encoding="utf-8") as f:
+            f.writelines(f"{entry['t']}\n" for entry in manifest)
+    print(f"Extracted {len(manifest)} frame(s) to '{args.out}'" + (f" ({len(shapes)} different sizes, not replayable as one screen)" if len(shapes) > 1 else "") + ".")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,77 @@
+# benchmarks/replay_scenario.py
+#
+# Runs a whole scenario against a recorded screen (a directory of PNG frames
+# or a video file) instead of the live one, headless and without sending
+# input. On the virtual clock, waits and poll intervals advance replay time
+# instead of sleeping, so every run sees the same frames at the same actions:
+# the clicks the runner would have made are compared across runs and the
+# wall time measures pure scenario overhead (capture, detection, control flow).
+#
+#   python -m benchmarks.replay_scenario my_scenario.json recordings/login/ --runs 5
+#   python -m benchmarks.replay_scenario my_scenario.json session.mp4 --clock wall
+
+import argparse
+import json
+import statistics
+import sys
+import time
+
+from core.scenario import Scenario
+from core.scenario_runner import ScenarioRunner
+from core.log import set_profile, PROFILE_TURBO
+from vision import object_detector
+from vision.capture_backends import create_backend, CLOCK_VIRTUAL, CLOCK_WALL
+from vision.tracker import tracker
+
+
+def _run_once(scenario: Scenario, args) -> dict:
+    backend = create_backend(args.source, clock=args.clock, fps=args.fps, loop=False, step_per_capture=args.step)
+    tracker.forget(); object_detector.invalidate_detection_cache() # Every run starts cold
+    runner = ScenarioRunner(scenario, args.repetitions, profile=PROFILE_TURBO, capture_backend=backend)
+    start = time.perf_counter()
+    try:
+        summary = runner.run() # Synchronously, in this thread
+    finally:
+        backend.close()
+    return {
+        "wall_s": time.perf_counter() - start,
+        "clicks": runner.replay_clicks,
+        "captures": backend.captures,
+        "replay_s": backend.clock.now() if getattr(backend.clock, "virtual", False) else None,
+        "errors": summary.errors,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark a scenario against a recorded screen.")
+    parser.add_argument("scenario", help="Scenario JSON file.")
+    parser.add_argument("source", help="Directory of PNG frames or a video file.")
+    parser.add_argument("--clock", default=CLOCK_VIRTUAL, choices=[CLOCK_VIRTUAL, CLOCK_WALL], help="Replay time source.")
+    parser.add_argument("--fps", type=float, default=None, help="Frame rate of a PNG directory (videos use their own).")
+    parser.add_argument("--step", type=float, default=0.0, help="Virtual seconds added per capture (for scenarios that poll without waits).")
+    parser.add_argument("--repetitions", type=int, default=1, help="Scenario repetitions per run (0 = until the replay ends).")
+    parser.add_argument("--runs", type=int, default=3, help="Timed runs (median is reported).")
+    parser.add_argument("--out", default=None, help="Optional JSON path for the per-run results.")
+    args = parser.parse_args()
+
+    set_profile(PROFILE_TURBO)
+    scenario = Scenario.load_from_file(args.scenario)
+    results = [_run_once(scenario, args) for _ in range(args.runs)]
+    object_detector.shutdown_pool()
+
+    print(f"{'run':>4} {'wall ms':>10} {'captures':>9} {'clicks':>7} {'replay s':>9} {'errors':>7}")
+    for i, result in enumerate(results, 1):
+        replay = f"{result['replay_s']:.2f}" if result["replay_s"] is not None else "-"
+        print(f"{i:>4} {result['wall_s'] * 1000:>10.1f} {result['captures']:>9} {len(result['clicks']):>7} {replay:>9} {len(result['errors']):>7}")
+    print(f"Median wall time: {statistics.median(r['wall_s'] for r in results) * 1000:.1f} ms")
+    deterministic = all(r["clicks"] == results[0]["clicks"] for r in results)
+    if args.clock == CLOCK_VIRTUAL:
+        print("Clicks identical across runs." if deterministic else "WARNING: clicks differ between runs.")
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump({"scenario": args.scenario, "source": args.source, "clock": args.clock, "runs": results}, f, indent=2)
+        print(f"Saved {len(results)} runs to {args.out}")
+    return 0 if deterministic or args.clock != CLOCK_VIRTUAL else 1
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,187 @@
+# benchmarks/suite.py
+#
+# Reproducible find_template benchmark on synthetic screens (1080p, 1440p, 4K)
+# with a template embedded at a known position and scale, pixel noise and
+# look-alike distractors. Reports p50/p95 latency, accuracy and peak Python/
+# NumPy allocation per resolution and configuration, and saves them as JSON.
+# The screen is served from memory, so it runs headless.
+#
+#   python -m benchmarks.suite run --out baseline.json
+#   python -m benchmarks.suite run --out current.json --sizes 1080p --trials 2
+#   python -m benchmarks.suite compare baseline.json current.json
+
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Dict, List, Tuple
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import SIZES, make_haystack, make_template, embed, add_noise, add_distractors, synthetic_screen
+from vision import object_detector
+from core.log import set_profile, PROFILE_TURBO
+
+SUITE_SIZES = ["1080p", "1440p", "4k"]
+CONFIGS = {
+    "gray-single": {"use_grayscale": True, "use_multiscale": False},
+    "gray-multi": {"use_grayscale": True, "use_multiscale": True},
+    "color-single": {"use_grayscale": False, "use_multiscale": False},
+    "color-multi": {"use_grayscale": False, "use_multiscale": True},
+}
+TEMPLATE_SIZE = (120, 80)
+NOISE_SIGMA = 6.0
+DISTRACTORS = 6
+MIN_IOU = 0.5 # A result counts as correct if it overlaps the embedded template this much
+# Every search starts cold: results must not come from earlier calls
+SEARCH_OPTIONS = {"use_tracking": False, "use_change_gating": False, "use_priors": False, "use_detection_cache": False, "use_dirty_tiles": False}
+
+# Regression thresholds for `compare`
+LATENCY_TOLERANCE = 0.15 # Relative p50/p95 slowdown
+LATENCY_FLOOR_MS = 2.0 # Slowdowns smaller than this are treated as noise
+ACCURACY_TOLERANCE = 0.0 # Absolute accuracy drop
+ALLOC_TOLERANCE = 0.25 # Relative peak allocation growth
+
+
+def _iou(a: Tuple[int, int, int, int], b: Tuple[int, int, int, int]) -> float:
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    inter = ix * iy
+    union = a[2] * a[3] + b[2] * b[3] - inter
+    return inter / union if union else 0.0
+
+
+def _make_case(size_name: str, config: dict, trial: int, tmp_dir: str) -> Tuple[np.ndarray, str, Tuple[int, int, int, int]]:
+    """One synthetic screen; returns (haystack, template path, expected box). Fully determined by the arguments."""
+    width, height = SIZES[size_name]
+    color = not config["use_grayscale"]
+    rng = np.random.default_rng(trial)
+    haystack = make_haystack(width, height, seed=trial, color=True)
+    template = make_template(*TEMPLATE_SIZE, seed=1000 + trial, color=True)
+    scales = object_detector.get_scales(config["use_multiscale"])
+    scale = float(scales[int(rng.integers(len(scales)))])
+    (tw, th) = (int(TEMPLATE_SIZE[0] * scale), int(TEMPLATE_SIZE[1] * scale))
+    x = int(rng.integers(0, width - tw)); y = int(rng.integers(0, height - th))
+    expected = embed(haystack, template, x, y, scale)
+    add_distractors(haystack, template, DISTRACTORS, expected, seed=trial)
+    add_noise(haystack, NOISE_SIGMA, seed=trial)
+    template_path = os.path.join(tmp_dir, f"template_{trial}_{'color' if color else 'gray'}.png")
+    cv2.imwrite(template_path, template)
+    return haystack, template_path, expected
+
+
+def _find(template_path: str, config: dict):
+    return object_detector.find_template(template_path, **config, **SEARCH_OPTIONS)
+
+
+def _run_cell(size_name: str, config: dict, trials: int, repeat: int, tmp_dir: str) -> Dict[str, float]:
+    latencies: List[float] = []; peaks: List[float] = []; correct = 0; false_positives = 0
+    for trial in range(trials):
+        haystack, template_path, expected = _make_case(size_name, config, trial, tmp_dir)
+        object_detector.tracker.forget() # The scale order must not carry over from the previous case
+        with synthetic_screen(haystack):
+            result = _find(template_path, config) # Warm-up: template decode and scaled variants
+            if result is not None and _iou(result[:4], expected) >= MIN_IOU: correct += 1
+            elif result is not None: false_positives += 1
+            for _ in range(repeat):
+                start = time.perf_counter(); _find(template_path, config); latencies.append((time.perf_counter() - start) * 1000)
+            tracemalloc.start()
+            try:
+                _find(template_path, config)
+                peaks.append(tracemalloc.get_traced_memory()[1] / 1024)
+            finally:
+                tracemalloc.stop()
+    return {
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "accuracy": round(correct / trials, 4),
+        "false_positives": false_positives,
+        "alloc_peak_kib": round(float(np.median(peaks)), 1),
+        "samples": len(latencies),
+    }
+
+
+def run(args) -> int:
+    results = {}
+    set_profile(PROFILE_TURBO) # Keep per-call detector logging out of the report
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        print(f"{'case':<20} {'p50 ms':>9} {'p95 ms':>9} {'acc':>6} {'fp':>3} {'peak KiB':>10}")
+        for size_name in args.sizes:
+            for config_name in args.configs:
+                cell = _run_cell(size_name, CONFIGS[config_name], args.trials, args.repeat, tmp_dir)
+                key = f"{size_name}/{config_name}"; results[key] = cell
+                print(f"{key:<20} {cell['p50_ms']:>9.1f} {cell['p95_ms']:>9.1f} {cell['accuracy']:>6.2f} {cell['false_positives']:>3} {cell['alloc_peak_kib']:>10.1f}")
+    object_detector.shutdown_pool()
+    report = {
+        "meta": {
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(), "numpy": np.__version__, "opencv": cv2.__version__,
+            "platform": platform.platform(), "cpu_count": os.cpu_count(), "workers": object_detector.get_max_workers(),
+            "trials": args.trials, "repeat": args.repeat,
+        },
+        "results": results,
+    }
+    with open(args.out, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {len(results)} results to {args.out}")
+    return 0
+
+
+def _regressions(baseline: dict, current: dict, args) -> List[str]:
+    problems = []
+    for metric in ["p50_ms", "p95_ms"]:
+        if current[metric] > baseline[metric] * (1 + args.latency_tolerance) and current[metric] - baseline[metric] > LATENCY_FLOOR_MS:
+            problems.append(f"{metric} {baseline[metric]:.1f} -> {current[metric]:.1f}")
+    if current["accuracy"] < baseline["accuracy"] - args.accuracy_tolerance:
+        problems.append(f"accuracy {baseline['accuracy']:.2f} -> {current['accuracy']:.2f}")
+    if current["false_positives"] > baseline["false_positives"]:
+        problems.append(f"false positives {baseline['false_positives']} -> {current['false_positives']}")
+    if current["alloc_peak_kib"] > baseline["alloc_peak_kib"] * (1 + args.alloc_tolerance):
+        problems.append(f"peak alloc {baseline['alloc_peak_kib']:.0f} -> {current['alloc_peak_kib']:.0f} KiB")
+    return problems
+
+
+def compare(args) -> int:
+    with open(args.baseline) as f: baseline = json.load(f)
+    with open(args.current) as f: current = json.load(f)
+    if baseline["meta"].get("platform") != current["meta"].get("platform") or baseline["meta"].get("cpu_count") != current["meta"].get("cpu_count"):
+        print("Warning: baseline was recorded on a different machine; latency comparisons may not be meaningful.")
+    regressions = 0
+    print(f"{'case':<20} {'p50 ms':>17} {'p95 ms':>17} {'acc':>11}  status")
+    for key, cell in current["results"].items():
+        base = baseline["results"].get(key)
+        if base is None:
+            print(f"{key:<20} {'(not in baseline)':>17}"); continue
+        problems = _regressions(base, cell, args)
+        regressions += bool(problems)
+        print(f"{key:<20} {base['p50_ms']:>8.1f}->{cell['p50_ms']:<8.1f} {base['p95_ms']:>8.1f}->{cell['p95_ms']:<8.1f} {base['accuracy']:>5.2f}->{cell['accuracy']:<5.2f}  "
+              + ("REGRESSION: " + "; ".join(problems) if problems else "ok"))
+    print(f"{regressions} regression(s) in {len(current['results'])} case(s).")
+    return 1 if regressions else 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="find_template benchmark suite on synthetic screens.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    run_parser = commands.add_parser("run", help="Run the suite and save results as JSON.")
+    run_parser.add_argument("--out", default="benchmark_results.json", help="Output JSON path.")
+    run_parser.add_argument("--sizes", nargs="+", default=SUITE_SIZES, choices=list(SIZES), help="Screen sizes to test.")
+    run_parser.add_argument("--configs", nargs="+", default=list(CONFIGS), choices=list(CONFIGS), help="Detector configurations to test.")
+    run_parser.add_argument("--trials", type=int, default=3, help="Synthetic screens per case (different positions/scales).")
+    run_parser.add_argument("--repeat", type=int, default=5, help="Timed searches per screen.")
+    compare_parser = commands.add_parser("compare", help="Flag regressions of a result file against a baseline.")
+    compare_parser.add_argument("baseline", help="Baseline results JSON.")
+    compare_parser.add_argument("current", help="New results JSON.")
+    compare_parser.add_argument("--latency-tolerance", type=float, default=LATENCY_TOLERANCE, help="Allowed relative p50/p95 slowdown.")
+    compare_parser.add_argument("--accuracy-tolerance", type=float, default=ACCURACY_TOLERANCE, help="Allowed absolute accuracy drop.")
+    compare_parser.add_argument("--alloc-tolerance", type=float, default=ALLOC_TOLERANCE, help="Allowed relative peak allocation growth.")
+    args = parser.parse_args()
+    return run(args) if args.command == "run" else compare(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
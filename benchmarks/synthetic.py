@@ -0,0 +1,91 @@
+# benchmarks/synthetic.py
+
+from contextlib import contextmanager
+from typing import List, Optional, Tuple
+
+import numpy as np
+import cv2
+
+# Common screen sizes (width, height)
+SIZES = {
+    "1080p": (1920, 1080),
+    "1440p": (2560, 1440),
+    "4k": (3840, 2160),
+    "ultrawide": (5120, 1440),
+}
+
+def make_haystack(width: int, height: int, seed: int = 0, color: bool = False) -> np.ndarray:
+    """Creates a smooth random 'screen' so correlation peaks are well defined."""
+    rng = np.random.default_rng(seed)
+    shape = (height, width, 3) if color else (height, width)
+    noise = (rng.random(shape) * 255).astype(np.uint8)
+    return cv2.GaussianBlur(noise, (9, 9), 0)
+
+def make_template(width: int, height: int, seed: int = 1, color: bool = False) -> np.ndarray:
+    """Creates a distinctive template (blurred noise with a solid border)."""
+    template = make_haystack(width, height, seed=seed, color=color)
+    cv2.rectangle(template, (0, 0), (width - 1, height - 1), (255, 255, 255) if color else 255, 2)
+    return template
+
+def embed(haystack: np.ndarray, template: np.ndarray, x: int, y: int, scale: float = 1.0) -> Tuple[int, int, int, int]:
+    """Pastes `template` resized by `scale` into `haystack` at (x, y); returns its (x, y, w, h)."""
+    if scale != 1.0:
+        (h, w) = template.shape[:2]
+        template = cv2.resize(template, (int(w * scale), int(h * scale)), interpolation=cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR)
+    (h, w) = template.shape[:2]
+    haystack[y:y + h, x:x + w] = template
+    return (x, y, w, h)
+
+def add_noise(image: np.ndarray, sigma: float, seed: int = 0) -> np.ndarray:
+    """Adds Gaussian pixel noise (standard deviation `sigma`) in place; returns the image."""
+    rng = np.random.default_rng(seed)
+    noisy = image.astype(np.float32) + rng.normal(0.0, sigma, image.shape).astype(np.float32)
+    np.clip(noisy, 0, 255, out=noisy)
+    image[...] = noisy.astype(np.uint8)
+    return image
+
+def add_distractors(haystack: np.ndarray, template: np.ndarray, count: int, avoid: Tuple[int, int, int, int], seed: int = 0) -> List[Tuple[int, int, int, int]]:
+    """
+    Pastes `count` look-alikes of `template` (same size and border, different
+    content: flipped copies and unrelated templates) away from the `avoid`
+    box. Returns their (x, y, w, h) boxes.
+    """
+    rng = np.random.default_rng(seed)
+    (haystack_h, haystack_w) = haystack.shape[:2]
+    (h, w) = template.shape[:2]
+    color = template.ndim == 3
+    boxes: List[Tuple[int, int, int, int]] = []
+    for i in range(count * 20): # Bounded number of placement attempts
+        if len(boxes) == count: break
+        x = int(rng.integers(0, haystack_w - w)); y = int(rng.integers(0, haystack_h - h))
+        if any(x < bx + bw and bx < x + w and y < by + bh and by < y + h for (bx, by, bw, bh) in boxes + [avoid]):
+            continue
+        distractor = cv2.flip(template, -1) if len(boxes) % 2 == 0 else make_template(w, h, seed=seed * 100 + i + 2, color=color)
+        boxes.append(embed(haystack, distractor, x, y))
+    return boxes
+
+@contextmanager
+def synthetic_screen(haystack: np.ndarray):
+    """
+    Serves screen_capture.capture()/capture_frame() from `haystack` (screen
+    origin at 0, 0) so detectors run without a display. Frames are fresh BGRA
+    copies, like mss grabs.
+    """
+    from vision import screen_capture
+    from vision.frame import Frame
+    originals = (screen_capture.capture, screen_capture.capture_frame)
+    def crop(region):
+        if region is None:
+            return haystack, (0, 0)
+        (left, top, width, height) = (int(v) for v in region)
+        return haystack[top:top + height, left:left + width], (left, top)
+    def capture(region: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
+        return crop(region)[0].copy()
+    def capture_frame(region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Frame]:
+        image, origin = crop(region)
+        return Frame(cv2.cvtColor(image, cv2.COLOR_BGR2BGRA if image.ndim == 3 else cv2.COLOR_GRAY2BGRA), origin)
+    screen_capture.capture, screen_capture.capture_frame = capture, capture_frame
+    try:
+        yield
+    finally:
+        screen_capture.capture, screen_capture.capture_frame = originals
@@ -0,0 +1,94 @@
+# core/cli.py
+#
+# Runs a scenario without the GUI (no Qt import), for batch jobs and many
+# parallel scenario processes on one machine:
+#
+#   python -m core.cli my_scenario.json --repetitions 10
+#   python -m core.cli my_scenario.json --profile turbo --json summary.json
+#   python -m core.cli my_scenario.json --source recordings/login/   # Against a recorded screen, no input sent
+#
+# Progress goes to the console through the log (see core/log.py); a run
+# summary is printed at the end. Ctrl+C stops the scenario between actions.
+# Exit code: 0 finished, 1 error, 2 scenario not loadable/valid, 130 stopped.
+
+import argparse
+import json
+import sys
+import threading
+from typing import List, Optional
+
+from core.scenario import Scenario
+from core.scenario_runner import ScenarioRunner, RunSummary, RUN_FINISHED, RUN_REPLAY_FINISHED, RUN_INVALID, RUN_STOPPED
+from core.log import PROFILES, DEFAULT_PROFILE, enable_file_log
+
+
+def _print_summary(summary: RunSummary):
+    print(f"\nScenario:     {summary.scenario_name}")
+    print(f"Status:       {summary.status}")
+    print(f"Repetitions:  {summary.repetitions_completed}")
+    print(f"Actions:      {summary.actions_executed}")
+    print(f"Clicks:       {summary.clicks}")
+    print(f"Duration:     {summary.duration_s:.2f}s")
+    for error in summary.errors: print(f"Error:        {error}")
+
+
+def _exit_code(summary: RunSummary) -> int:
+    if summary.status in (RUN_FINISHED, RUN_REPLAY_FINISHED): return 0
+    if summary.status == RUN_INVALID: return 2
+    if summary.status == RUN_STOPPED: return 130
+    return 1
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m core.cli", description="Run a scenario headless (without the GUI).")
+    parser.add_argument("scenario", help="Scenario JSON file.")
+    parser.add_argument("-r", "--repetitions", type=int, default=None, help="Repetitions (0 = until stopped); default: the scenario's own setting.")
+    parser.add_argument("--profile", default=DEFAULT_PROFILE, choices=PROFILES, help="Log profile for the run.")
+    parser.add_argument("--capture-fps", type=float, default=0.0, help="> 0: capture in the background at this rate (see vision/capture_service.py).")
+    parser.add_argument("--source", default=None, help="Replay a recorded screen (PNG directory or video) instead of the live one; no input is sent.")
+    parser.add_argument("--clock", default="virtual", choices=["virtual", "wall"], help="Replay time source (with --source).")
+    parser.add_argument("--loop", action="store_true", help="Loop the replay instead of ending the run at its last frame (with --source).")
+    parser.add_argument("--record-dir", default=None, help="Record the frames detection actions look at into this directory.")
+    parser.add_argument("--log-file", default=None, help="Also write the log to this file.")
+    parser.add_argument("--json", default=None, help="Write the run summary as JSON to this path ('-' for stdout).")
+    args = parser.parse_args(argv)
+
+    try:
+        scenario = Scenario.load_from_file(args.scenario)
+    except (OSError, ValueError) as e:
+        print(f"Could not load scenario '{args.scenario}': {e}", file=sys.stderr); return 2
+    if args.log_file: enable_file_log(args.log_file)
+
+    backend = None
+    if args.source:
+        from vision.capture_backends import create_backend # Only needed for replays
+        try: backend = create_backend(args.source, clock=args.clock, loop=args.loop)
+        except ValueError as e: print(f"Could not open capture source: {e}", file=sys.stderr); return 2
+
+    repetitions = scenario.global_repetitions if args.repetitions is None else args.repetitions
+    runner = ScenarioRunner(scenario, repetitions, profile=args.profile, capture_fps=args.capture_fps, capture_backend=backend, record_dir=args.record_dir)
+    # The runner works on its own thread so Ctrl+C reaches this one and can stop it cleanly.
+    # Waiting on an Event (not Thread.join, whose state an interrupt can leave inconsistent)
+    done = threading.Event()
+    def work():
+        try: runner.run()
+        finally: done.set()
+    threading.Thread(target=work, name="scenario-runner", daemon=True).start()
+    try:
+        while not done.wait(0.2): pass
+    except KeyboardInterrupt:
+        print("\nStopping scenario...", file=sys.stderr); runner.stop(); done.wait()
+    finally:
+        if backend is not None: backend.close()
+
+    summary = runner.summary
+    _print_summary(summary)
+    if args.json:
+        text = json.dumps(summary.to_dict(), indent=2)
+        if args.json == "-": print(text)
+        else:
+            with open(args.json, "w", encoding="utf-8") as f: f.write(text)
+    return _exit_code(summary)
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+# core/log.py
+#
+# Central logging for the runner, vision and automation layers. Messages go
+# through the standard logging module with %-style arguments, so nothing is
+# formatted unless a handler will actually emit the record:
+#
+#   log = get_logger(__name__)
+#   log.debug("Click coords: (%d, %d)", x, y)
+#
+# Records are written to the console, kept in a bounded ring buffer the UI can
+# show, and optionally written to a file by a background thread.
+
+import atexit
+import copy
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+from collections import deque
+from typing import List, Optional, Tuple
+
+ROOT_LOGGER_NAME = "autoclicker"
+RING_BUFFER_SIZE = 2000 # Records kept for the UI log view
+
+# --- Run profiles ---
+PROFILE_DEBUG = "debug" # Everything, including per-click coordinate traces
+PROFILE_NORMAL = "normal" # Progress messages, warnings and errors
+PROFILE_TURBO = "turbo" # Warnings and errors only; the runner also stops UI/overlay signals
+PROFILES = [PROFILE_DEBUG, PROFILE_NORMAL, PROFILE_TURBO]
+_PROFILE_LEVELS = {PROFILE_DEBUG: logging.DEBUG, PROFILE_NORMAL: logging.INFO, PROFILE_TURBO: logging.WARNING}
+DEFAULT_PROFILE = PROFILE_NORMAL
+
+CONSOLE_FORMAT = "%(message)s"
+FILE_FORMAT = "%(asctime)s %(levelname)-7s %(name)s: %(message)s"
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the last `capacity` records in memory. The message is resolved when
+    the record is emitted (its arguments may be mutable state, like a loop
+    stack, that changes later); timestamp and level are only formatted when
+    read. Each record gets a sequence number so a view can fetch only new lines.
+    """
+
+    def __init__(self, capacity: int = RING_BUFFER_SIZE):
+        super().__init__()
+        self._records: "deque[Tuple[int, logging.LogRecord, str]]" = deque(maxlen=capacity)
+        self._sequence = 0
+        self._buffer_lock = threading.Lock()
+        self.setFormatter(logging.Formatter("%(asctime)s %(levelname)-7s %(message)s", "%H:%M:%S"))
+
+    def emit(self, record: logging.LogRecord):
+        try:
+            message = record.getMessage()
+        except Exception:
+            self.handleError(record); return
+        with self._buffer_lock:
+            self._sequence += 1
+            self._records.append((self._sequence, record, message))
+
+    def lines_since(self, sequence: int = 0) -> Tuple[int, List[str]]:
+        """Returns (latest sequence number, formatted records newer than `sequence`)."""
+        with self._buffer_lock:
+            latest = self._sequence
+            records = [(record, message) for seq, record, message in self._records if seq > sequence]
+        return latest, [self._format_resolved(record, message) for record, message in records]
+
+    def _format_resolved(self, record: logging.LogRecord, message: str) -> str:
+        record = copy.copy(record); record.msg = message; record.args = None
+        return self.format(record)
+
+    def clear(self):
+        with self._buffer_lock: self._records.clear()
+
+
+# --- Shared handlers ---
+ring_buffer = RingBufferHandler()
+_console_handler = logging.StreamHandler(sys.stdout)
+_console_handler.setFormatter(logging.Formatter(CONSOLE_FORMAT))
+_file_listener: Optional[logging.handlers.QueueListener] = None
+_file_queue_handler: Optional[logging.handlers.QueueHandler] = None
+_profile = DEFAULT_PROFILE
+_setup_lock = threading.Lock()
+
+_root = logging.getLogger(ROOT_LOGGER_NAME)
+_root.setLevel(_PROFILE_LEVELS[DEFAULT_PROFILE])
+_root.propagate = False
+_root.addHandler(_console_handler)
+_root.addHandler(ring_buffer)
+
+
+def get_logger(name: str) -> logging.Logger:
+    """Logger for a module (pass __name__); all of them share the handlers configured here."""
+    return logging.getLogger(f"{ROOT_LOGGER_NAME}.{name}")
+
+
+def set_profile(profile: str):
+    """Switches the log level for a run profile (see PROFILES)."""
+    global _profile
+    if profile not in PROFILES:
+        raise ValueError(f"Invalid log profile '{profile}'. Use one of {PROFILES}.")
+    with _setup_lock:
+        _profile = profile
+        _root.setLevel(_PROFILE_LEVELS[profile])
+
+
+def get_profile() -> str:
+    return _profile
+
+
+def enable_file_log(path: str, max_bytes: int = 5 * 1024 * 1024, backups: int = 2):
+    """
+    Also writes records to a rotating file. Records are handed to a queue and
+    written by a background thread, so disk I/O never blocks the caller.
+    """
+    global _file_listener, _file_queue_handler
+    disable_file_log()
+    file_handler = logging.handlers.RotatingFileHandler(path, maxBytes=max_bytes, backupCount=backups, encoding="utf-8")
+    file_handler.setFormatter(logging.Formatter(FILE_FORMAT))
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(-1)
+    with _setup_lock:
+        _file_queue_handler = logging.handlers.QueueHandler(log_queue)
+        _file_listener = logging.handlers.QueueListener(log_queue, file_handler)
+        _file_listener.start()
+        _root.addHandler(_file_queue_handler)
+
+
+def disable_file_log():
+    """Stops the file sink after writing out the records still queued."""
+    global _file_listener, _file_queue_handler
+    with _setup_lock:
+        if _file_queue_handler is not None:
+            _root.removeHandler(_file_queue_handler); _file_queue_handler = None
+        if _file_listener is not None:
+            _file_listener.stop() # Drains the queue
+            for handler in _file_listener.handlers: handler.close()
+            _file_listener = None
+
+
+atexit.register(disable_file_log)
@@ -4,6 +4,9 @@ import json
 import os
 from typing import List, Dict, Optional, Any, Tuple
 from dataclasses import dataclass, field
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 # --- Action Type Constants ---
 ACTION_CLICK = "CLICK"
@@ -14,6 +17,10 @@ ACTION_END_IF = "END_IF"
 ACTION_LOOP_START = "LOOP_START"
 ACTION_LOOP_END = "LOOP_END"
 ACTION_CHECK_OBJECT_BREAK_LOOP = "CHECK_OBJECT_BREAK_LOOP"
+ACTION_FOR_EACH_OBJECT = "FOR_EACH_OBJECT" # Loop block (closed by LOOP_END) run once per match
+ACTION_IF_PIXEL_COLOR = "IF_PIXEL_COLOR" # IF block (closed by END_IF) on one pixel's color
+ACTION_WAIT_FOR_PIXEL_COLOR = "WAIT_FOR_PIXEL_COLOR"
+ACTION_FIND_COLOR = "FIND_COLOR" # Sets @found_object to the first pixel of a color
 # ACTION_WAIT_FOR_TEXT = "WAIT_FOR_TEXT" # Add later
 # ACTION_IF_TEXT_FOUND = "IF_TEXT_FOUND" # Add later
 
@@ -26,11 +33,28 @@ ACTION_TYPES = [
     ACTION_LOOP_START,
     ACTION_LOOP_END,
     ACTION_CHECK_OBJECT_BREAK_LOOP,
+    ACTION_FOR_EACH_OBJECT,
+    ACTION_IF_PIXEL_COLOR,
+    ACTION_WAIT_FOR_PIXEL_COLOR,
+    ACTION_FIND_COLOR,
     ACTION_END_IF,
     # ACTION_WAIT_FOR_TEXT, # Add later
     # ACTION_IF_TEXT_FOUND, # Add later
 ]
 
+# Actions that open a block closed by LOOP_END
+LOOP_START_ACTIONS = [ACTION_LOOP_START, ACTION_FOR_EACH_OBJECT]
+# Actions that open a block closed by END_IF
+IF_ACTIONS = [ACTION_IF_OBJECT_FOUND, ACTION_IF_PIXEL_COLOR]
+
+# Orders in which FOR_EACH_OBJECT visits its matches
+FOR_EACH_SORT_ORDERS = ["confidence", "top_to_bottom", "left_to_right"]
+
+# Detector backends for WAIT_FOR_OBJECT / IF_OBJECT_FOUND / CHECK_OBJECT_BREAK_LOOP
+DETECTOR_TEMPLATE = "template" # Multi-scale template matching (vision/object_detector.py)
+DETECTOR_FEATURES = "features" # ORB keypoints + homography, handles rotation (vision/feature_detector.py)
+DETECTOR_BACKENDS = [DETECTOR_TEMPLATE, DETECTOR_FEATURES]
+
 # Special value for position_name when clicking on found object/text
 CLICK_TARGET_FOUND_OBJECT = "@found_object"
 # CLICK_TARGET_FOUND_TEXT = "@found_text" # Add later
@@ -107,25 +131,35 @@ class Action:
         return Action(type=ACTION_WAIT, details={"duration_ms": duration_ms})
 
     @staticmethod
-    def wait_for_object(template_path: str, confidence: float = 0.8, region: Optional[Tuple[int, int, int, int]] = None, timeout_ms: Optional[int] = None):
+    def wait_for_object(template_path: str, confidence: float = 0.8, region: Optional[Tuple[int, int, int, int]] = None, timeout_ms: Optional[int] = None, use_pyramid: bool = False, detector: str = DETECTOR_TEMPLATE, use_color_prefilter: bool = False, use_priors: bool = False):
         """Creates a WAIT_FOR_OBJECT action."""
         if not 0.0 <= confidence <= 1.0: raise ValueError("Confidence must be between 0.0 and 1.0")
         if timeout_ms is not None and timeout_ms <= 0: raise ValueError("Timeout must be positive if specified.")
+        if detector not in DETECTOR_BACKENDS: raise ValueError(f"Invalid detector backend: {detector}")
         return Action(type=ACTION_WAIT_FOR_OBJECT, details={
             "template_path": template_path,
             "confidence": confidence,
             "region": region, # Store region tuple or None
-            "timeout_ms": timeout_ms # Store timeout or None
+            "timeout_ms": timeout_ms, # Store timeout or None
+            "use_pyramid": use_pyramid, # Coarse-to-fine search
+            "detector": detector,
+            "use_color_prefilter": use_color_prefilter, # Skip areas without the template's colors
+            "use_priors": use_priors # Search where this template was found on earlier runs first
         })
 
     @staticmethod
-    def if_object_found(template_path: str, confidence: float = 0.8, region: Optional[Tuple[int, int, int, int]] = None):
+    def if_object_found(template_path: str, confidence: float = 0.8, region: Optional[Tuple[int, int, int, int]] = None, use_pyramid: bool = False, detector: str = DETECTOR_TEMPLATE, use_color_prefilter: bool = False, use_priors: bool = False):
         """Creates an IF_OBJECT_FOUND action."""
         if not 0.0 <= confidence <= 1.0: raise ValueError("Confidence must be between 0.0 and 1.0")
+        if detector not in DETECTOR_BACKENDS: raise ValueError(f"Invalid detector backend: {detector}")
         return Action(type=ACTION_IF_OBJECT_FOUND, details={
             "template_path": template_path,
             "confidence": confidence,
-            "region": region
+            "region": region,
+            "use_pyramid": use_pyramid,
+            "detector": detector,
+            "use_color_prefilter": use_color_prefilter,
+            "use_priors": use_priors
         })
 
     @staticmethod
@@ -152,15 +186,65 @@ class Action:
         return Action(type=ACTION_LOOP_END, details={"break_condition": break_condition})
 
     @staticmethod
-    def check_object_break_loop(template_path: str, confidence: float = 0.8, region: Optional[Tuple[int, int, int, int]] = None):
+    def check_object_break_loop(template_path: str, confidence: float = 0.8, region: Optional[Tuple[int, int, int, int]] = None, use_pyramid: bool = False, detector: str = DETECTOR_TEMPLATE, use_color_prefilter: bool = False, use_priors: bool = False):
         """Creates a CHECK_OBJECT_BREAK_LOOP action."""
         if not 0.0 <= confidence <= 1.0: raise ValueError("Confidence must be between 0.0 and 1.0")
+        if detector not in DETECTOR_BACKENDS: raise ValueError(f"Invalid detector backend: {detector}")
         return Action(type=ACTION_CHECK_OBJECT_BREAK_LOOP, details={
             "template_path": template_path,
             "confidence": confidence,
-            "region": region
+            "region": region,
+            "use_pyramid": use_pyramid,
+            "detector": detector,
+            "use_color_prefilter": use_color_prefilter,
+            "use_priors": use_priors
+        })
+
+    @staticmethod
+    def for_each_object(template_path: str, confidence: float = 0.8, region: Optional[Tuple[int, int, int, int]] = None, sort_by: str = "top_to_bottom", max_matches: int = 0):
+        """
+        Creates a FOR_EACH_OBJECT action. Its body (up to the matching LOOP_END)
+        runs once per match, with @found_object set to the current match.
+        max_matches=0 means all matches.
+        """
+        if not 0.0 <= confidence <= 1.0: raise ValueError("Confidence must be between 0.0 and 1.0")
+        if sort_by not in FOR_EACH_SORT_ORDERS: raise ValueError(f"Invalid sort order: {sort_by}")
+        if max_matches < 0: raise ValueError("Max matches cannot be negative.")
+        return Action(type=ACTION_FOR_EACH_OBJECT, details={
+            "template_path": template_path,
+            "confidence": confidence,
+            "region": region,
+            "sort_by": sort_by,
+            "max_matches": max_matches
         })
 
+    @staticmethod
+    def if_pixel_color(x: int, y: int, color: Tuple[int, int, int], tolerance: int = 0):
+        """
+        Creates an IF_PIXEL_COLOR action. (x, y) is relative to the target
+        window if a target app is set, otherwise absolute. color is (r, g, b);
+        tolerance is the maximum per-channel difference.
+        """
+        if not 0 <= tolerance <= 255: raise ValueError("Tolerance must be between 0 and 255")
+        return Action(type=ACTION_IF_PIXEL_COLOR, details={"x": x, "y": y, "color": list(color), "tolerance": tolerance})
+
+    @staticmethod
+    def wait_for_pixel_color(x: int, y: int, color: Tuple[int, int, int], tolerance: int = 0, timeout_ms: Optional[int] = None):
+        """Creates a WAIT_FOR_PIXEL_COLOR action (coordinates as in if_pixel_color)."""
+        if not 0 <= tolerance <= 255: raise ValueError("Tolerance must be between 0 and 255")
+        if timeout_ms is not None and timeout_ms <= 0: raise ValueError("Timeout must be positive if specified.")
+        return Action(type=ACTION_WAIT_FOR_PIXEL_COLOR, details={"x": x, "y": y, "color": list(color), "tolerance": tolerance, "timeout_ms": timeout_ms})
+
+    @staticmethod
+    def find_color(color: Tuple[int, int, int], region: Optional[Tuple[int, int, int, int]] = None, tolerance: int = 0):
+        """
+        Creates a FIND_COLOR action. region (x, y, w, h) is relative to the
+        target window if a target app is set; None searches the whole window
+        (or screen).
+        """
+        if not 0 <= tolerance <= 255: raise ValueError("Tolerance must be between 0 and 255")
+        return Action(type=ACTION_FIND_COLOR, details={"color": list(color), "region": region, "tolerance": tolerance})
+
     # --- Serialization/Deserialization ---
     def to_dict(self) -> Dict[str, Any]:
         """Converts action to a dictionary for saving."""
@@ -187,10 +271,10 @@ class Action:
                 if len(region_list) == 4 and all(isinstance(n, int) for n in region_list):
                     details["region"] = tuple(region_list)
                 else:
-                    print(f"Warning: Invalid region list format in loaded action: {region_list}. Setting region to None.")
+                    log.warning("Warning: Invalid region list format in loaded action: %s. Setting region to None.", region_list)
                     details["region"] = None
             except Exception: # Catch potential errors during conversion
-                 print(f"Warning: Error converting region list {details['region']} to tuple. Setting region to None.")
+                 log.warning("Warning: Error converting region list %s to tuple. Setting region to None.", details['region'])
                  details["region"] = None
 
         return Action(type=str(data["type"]), details=details)
@@ -276,7 +360,7 @@ class Scenario:
             scenario.is_modified = False
             return scenario
         except (KeyError, ValueError, TypeError) as e:
-            print(f"Error parsing scenario data: {e}")
+            log.error("Error parsing scenario data: %s", e)
             raise ValueError(f"Invalid scenario data format: {e}")
 
     def save_to_file(self, filepath: str):
@@ -290,7 +374,7 @@ class Scenario:
             self.filepath = filepath
             self.is_modified = False
         except IOError as e:
-            print(f"Error saving scenario to {filepath}: {e}")
+            log.error("Error saving scenario to %s: %s", filepath, e)
             raise
 
     @staticmethod
@@ -304,5 +388,5 @@ class Scenario:
             scenario.is_modified = False
             return scenario
         except (IOError, json.JSONDecodeError, ValueError) as e:
-            print(f"Error loading scenario from {filepath}: {e}")
+            log.error("Error loading scenario from %s: %s", filepath, e)
             raise
\ No newline at end of file
@@ -0,0 +1,153 @@
+# core/scenario_compiler.py
+#
+# Turns a Scenario into an immutable program for the runner: block structure
+# is validated once up front, every IF / loop knows where its block ends, and
+# position names and template paths are resolved, so the runner jumps and
+# looks things up in O(1) instead of scanning the action list.
+
+import os
+from dataclasses import dataclass
+from types import MappingProxyType
+from typing import Any, List, Mapping, Optional, Tuple
+
+from core.scenario import (
+    Scenario, ACTION_TYPES, ACTION_CLICK, ACTION_END_IF, ACTION_LOOP_START, ACTION_LOOP_END,
+    CLICK_TARGET_FOUND_OBJECT, IF_ACTIONS, LOOP_START_ACTIONS
+)
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+# Actions whose template_path is resolved (and must exist) at compile time
+TEMPLATE_KEY = "template_path"
+
+
+class ScenarioCompileError(ValueError):
+    """A scenario that cannot run; `problems` lists every issue found, one message per action."""
+
+    def __init__(self, problems: List[str]):
+        super().__init__("; ".join(problems))
+        self.problems = problems
+
+
+@dataclass(frozen=True)
+class CompiledAction:
+    """
+    One action of a compiled program. `type` and `details` mirror Action
+    (details is read-only, with template_path resolved), so action handlers
+    take either.
+
+    end:       IF -> its END_IF, LOOP_START / FOR_EACH_OBJECT -> its LOOP_END,
+               LOOP_END -> its loop start; -1 for other actions.
+    loop_end:  LOOP_END a break request jumps to: the action's own for a loop
+               start, else the one closing the innermost enclosing loop; -1
+               outside loops.
+    position:  (relative_x, relative_y) of a CLICK on a named position.
+    """
+    index: int
+    type: str
+    details: Mapping[str, Any]
+    end: int = -1
+    loop_end: int = -1
+    position: Optional[Tuple[int, int]] = None
+
+
+@dataclass(frozen=True)
+class CompiledProgram:
+    """An immutable, validated scenario (see compile_scenario)."""
+    scenario_name: str
+    target_process_name: Optional[str]
+    require_focus: bool
+    actions: Tuple[CompiledAction, ...]
+
+    def __len__(self) -> int:
+        return len(self.actions)
+
+
+def _freeze(value: Any) -> Any:
+    return tuple(_freeze(v) for v in value) if isinstance(value, list) else value
+
+
+def _resolve_template(path: str, scenario: Scenario) -> Optional[str]:
+    """Absolute path of a template: as given (relative to the working directory), else next to the scenario file."""
+    if os.path.exists(path):
+        return os.path.abspath(path)
+    if scenario.filepath and not os.path.isabs(path):
+        candidate = os.path.join(os.path.dirname(os.path.abspath(scenario.filepath)), path)
+        if os.path.exists(candidate): return candidate
+    return None
+
+
+def compile_scenario(scenario: Scenario) -> CompiledProgram:
+    """
+    Validates and compiles a scenario.
+
+    Blocks must nest properly: END_IF closes the innermost open IF, LOOP_END
+    the innermost open loop, and every block is closed. CLICK positions must
+    exist (with a target app set) and templates must be found.
+
+    Raises:
+        ScenarioCompileError: listing all problems found.
+    """
+    problems: List[str] = []
+    actions = scenario.actions
+    positions = {p.name: (p.relative_x, p.relative_y) for p in scenario.positions}
+    ends = [-1] * len(actions)
+    block_stack: List[int] = [] # Indices of open IF / loop starts
+    loop_stack: List[int] = [] # Indices of open loop starts (subset of block_stack)
+    enclosing_loop = [-1] * len(actions) # Innermost loop start around (or at) each action
+    details_list = []; position_list: List[Optional[Tuple[int, int]]] = []
+
+    for index, action in enumerate(actions):
+        number = index + 1
+        details = {key: _freeze(value) for key, value in action.details.items()}
+        position = None
+        if action.type not in ACTION_TYPES:
+            log.warning("Warning: Action %s has unknown type '%s'; it will be skipped.", number, action.type)
+
+        # --- Block structure ---
+        if action.type in IF_ACTIONS or action.type in LOOP_START_ACTIONS:
+            block_stack.append(index)
+            if action.type in LOOP_START_ACTIONS: loop_stack.append(index)
+        elif action.type == ACTION_END_IF:
+            if not block_stack or actions[block_stack[-1]].type not in IF_ACTIONS:
+                problems.append(f"Action {number} (END_IF) has no open IF block" + (f" (innermost open block is the loop at action {block_stack[-1] + 1})" if block_stack else "") + ".")
+            else:
+                start = block_stack.pop(); ends[start] = index; ends[index] = start
+        elif action.type == ACTION_LOOP_END:
+            if not block_stack or actions[block_stack[-1]].type not in LOOP_START_ACTIONS:
+                problems.append(f"Action {number} (LOOP_END) has no open loop" + (f" (innermost open block is the IF at action {block_stack[-1] + 1})" if block_stack else "") + ".")
+            else:
+                start = block_stack.pop(); loop_stack.pop(); ends[start] = index; ends[index] = start
+        if loop_stack: enclosing_loop[index] = loop_stack[-1] # A loop start is its own: FOR_EACH without matches breaks its own loop
+
+        # --- References ---
+        if action.type == ACTION_CLICK:
+            name = details.get("position_name")
+            if not name: problems.append(f"Action {number} (CLICK) has no target.")
+            elif name != CLICK_TARGET_FOUND_OBJECT:
+                if name not in positions: problems.append(f"Action {number} (CLICK) uses unknown position '{name}'.")
+                elif not scenario.target_process_name: problems.append(f"Action {number} (CLICK) on position '{name}' needs a target app.")
+                else: position = positions[name]
+        if TEMPLATE_KEY in details:
+            path = details.get(TEMPLATE_KEY)
+            resolved = _resolve_template(path, scenario) if path else None
+            if resolved is None: problems.append(f"Action {number} ({action.type}) template not found: '{path}'.")
+            else: details[TEMPLATE_KEY] = resolved
+        if action.type == ACTION_LOOP_START and int(details.get("iterations", 1)) < 0:
+            problems.append(f"Action {number} (LOOP_START) has negative iterations.")
+        details_list.append(details); position_list.append(position)
+
+    for start in block_stack:
+        closer = "END_IF" if actions[start].type in IF_ACTIONS else "LOOP_END"
+        problems.append(f"Action {start + 1} ({actions[start].type}) is never closed by {closer}.")
+    if problems:
+        raise ScenarioCompileError(problems)
+    loop_ends = [ends[start] if start >= 0 else -1 for start in enclosing_loop]
+
+    compiled = tuple(
+        CompiledAction(index, action.type, MappingProxyType(details_list[index]), ends[index], loop_ends[index], position_list[index])
+        for index, action in enumerate(actions)
+    )
+    log.debug("Compiled scenario '%s': %s actions.", scenario.scenario_name, len(compiled))
+    return CompiledProgram(scenario.scenario_name, scenario.target_process_name, scenario.require_focus, compiled)
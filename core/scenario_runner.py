@@ -3,343 +3,652 @@
 import time
 import os
 import platform
-from PyQt6.QtCore import QThread, pyqtSignal
-from typing import Optional, Tuple, List
+from dataclasses import dataclass, field, asdict
+from typing import Optional, Tuple, List, Dict, Set, Any
 
 # --- Import Scenario Actions and Constants ---
 from core.scenario import (
-    Scenario, Action, ACTION_CLICK, ACTION_WAIT, ACTION_WAIT_FOR_OBJECT,
+    Scenario, ACTION_CLICK, ACTION_WAIT, ACTION_WAIT_FOR_OBJECT,
     ACTION_IF_OBJECT_FOUND, ACTION_END_IF, CLICK_TARGET_FOUND_OBJECT,
-    ACTION_LOOP_START, ACTION_LOOP_END, ACTION_CHECK_OBJECT_BREAK_LOOP
+    ACTION_LOOP_START, ACTION_LOOP_END, ACTION_CHECK_OBJECT_BREAK_LOOP,
+    ACTION_FOR_EACH_OBJECT, DETECTOR_FEATURES,
+    ACTION_IF_PIXEL_COLOR, ACTION_WAIT_FOR_PIXEL_COLOR, ACTION_FIND_COLOR, IF_ACTIONS
     # ACTION_WAIT_FOR_TEXT, ACTION_IF_TEXT_FOUND, CLICK_TARGET_FOUND_TEXT # Add later
 )
+from core.scenario_compiler import compile_scenario, CompiledAction, CompiledProgram, ScenarioCompileError
 # --- Import System Utilities ---
 from system.process_utils import find_window_for_process, is_target_active
 # --- Import Automation Modules ---
-from automation import mouse_control
+# mouse_control (pyautogui, needs a display) is imported by the CLICK handler, so headless runs and replays work without it
 from automation import win_input_simulator # For background simulation
 # --- Import Vision Modules ---
-from vision import object_detector, screen_capture
+from vision import object_detector, feature_detector, pixel_color, screen_capture
+from vision.capture_service import capture_service
+from vision.capture_planner import capture_planner, CapturePlan
+from vision.frame_recorder import frame_recorder
+from vision.frame import Frame
+from vision.screen_capture import CaptureBackend
+from core.log import get_logger, get_profile, set_profile, PROFILE_TURBO
+
+# Detection actions that may share one captured frame when they follow each other
+BATCHABLE_ACTIONS = [ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP]
+# Detection actions whose regions are captured together by the capture planner (none of them changes the screen)
+PLANNABLE_ACTIONS = [ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP, ACTION_FOR_EACH_OBJECT, ACTION_IF_PIXEL_COLOR, ACTION_FIND_COLOR]
+# Actions whose captured frames and results go into the frame recording (when recording)
+RECORDED_ACTIONS = [ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP, ACTION_FOR_EACH_OBJECT, ACTION_IF_PIXEL_COLOR, ACTION_WAIT_FOR_PIXEL_COLOR, ACTION_FIND_COLOR]
+# Actions that wait for the target app to have focus (if the scenario requires it)
+INTERACTIVE_ACTIONS = [ACTION_CLICK, ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP, ACTION_FOR_EACH_OBJECT, ACTION_IF_PIXEL_COLOR, ACTION_WAIT_FOR_PIXEL_COLOR, ACTION_FIND_COLOR]
+
+log = get_logger(__name__)
 
 # --- Custom Exceptions ---
 class InterruptedError(Exception): pass
 class LoopError(Exception): pass
 # TimeoutError is built-in, but we handle it gracefully now
 
-class ScenarioRunner(QThread):
-    """Executes a scenario in a separate thread."""
-    # --- Signals for UI updates ---
-    status_update = pyqtSignal(str)
-    finished = pyqtSignal()
-    error_occurred = pyqtSignal(str)
-    action_started = pyqtSignal(int)
-    action_finished = pyqtSignal(int)
-    # --- Signals for Overlay ---
-    object_detected_at = pyqtSignal(int, int, int, int, float, str) # x, y, w, h, confidence, template_name
-    click_target_calculated = pyqtSignal(int, int)      # x, y (screen coords)
-    # --- Signal for Repetition Update ---
-    repetition_update = pyqtSignal(int, int) # current_rep, total_reps (0 for infinite)
-    # --- Signals for Overlay Control (Workaround) ---
-    request_hide_overlay = pyqtSignal()
-    request_show_overlay = pyqtSignal()
+# Run outcomes (RunSummary.status)
+RUN_FINISHED = "finished" # All repetitions done
+RUN_REPLAY_FINISHED = "replay finished" # A replay backend ran out of frames
+RUN_STOPPED = "stopped" # stop() was called
+RUN_ERROR = "error" # An action failed
+RUN_INVALID = "invalid" # The scenario did not compile; nothing ran
+
+
+class RunnerCallbacks:
+    """
+    Events of a scenario run. Subclass and override what you need; every
+    method is a no-op here. They are called on the runner's thread.
+    Per-action events (action_started/finished, status_update, overlay
+    events) are not sent with the turbo log profile.
+    """
+
+    def status_update(self, message: str): pass
+    def finished(self): pass
+    def error_occurred(self, message: str): pass
+    def action_started(self, index: int): pass
+    def action_finished(self, index: int): pass
+    def object_detected_at(self, x: int, y: int, w: int, h: int, confidence: float, label: str): pass
+    def click_target_calculated(self, x: int, y: int): pass
+    def repetition_update(self, current: int, total: int): pass # total 0 = infinite
+
+
+@dataclass
+class RunSummary:
+    """Outcome of ScenarioRunner.run()."""
+    scenario_name: str
+    status: str = RUN_STOPPED # One of the RUN_* constants
+    repetitions_completed: int = 0
+    actions_executed: int = 0 # Handlers run (END_IF / LOOP_END and skipped actions not counted)
+    clicks: int = 0 # Clicks sent, or recorded in replay_clicks on a replay
+    duration_s: float = 0.0
+    errors: List[str] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class ScenarioRunner:
+    """
+    Executes a scenario, without any GUI dependency. run() blocks until the
+    scenario ends; call it on a worker thread (see ui/scenario_runner_thread.py
+    for the Qt adapter) and stop() from another. Progress is reported through
+    `callbacks` and the returned RunSummary.
+    """
 
     # --- Configuration ---
     # This should ideally come from MainWindow/Scenario settings later
     USE_BACKGROUND_SIMULATION = True # <<< Set to True to try background clicks, False for cursor control
 
-    def __init__(self, scenario: Scenario, repetitions: int, parent=None):
-        super().__init__(parent)
+    def __init__(self, scenario: Scenario, repetitions: int, callbacks: Optional[RunnerCallbacks] = None, profile: Optional[str] = None, capture_fps: float = 0.0, capture_backend: Optional[CaptureBackend] = None, record_dir: Optional[str] = None):
         self.scenario = scenario
+        self.callbacks = callbacks or RunnerCallbacks()
         self.repetitions = max(0, repetitions) # Store global repetitions (0 for infinite)
+        # Log profile for the run (see core/log.py); None keeps the current one. "turbo" also
+        # stops per-action UI signals (status, highlights, overlay) for maximum throughput
+        self.profile = profile or get_profile()
+        self._ui_signals = self.profile != PROFILE_TURBO
+        # > 0: detectors read frames from the background capture service at this rate instead of capturing per action
+        self.capture_fps = max(0.0, capture_fps)
+        # Source of captured frames for the run (see vision/capture_backends.py); None keeps the current one.
+        # With a replay backend no input is sent, clicks are recorded in replay_clicks instead, and waits
+        # follow the replay's virtual clock (if it has one)
+        self.capture_backend = capture_backend
+        self._live = True
+        self._virtual_clock = None
+        self.replay_clicks: List[Tuple[int, int]] = []
+        # Directory to record the frames detection actions look at (see vision/frame_recorder.py); None = off
+        self.record_dir = record_dir
         self._is_running = False
+        # Validated scenario with resolved jumps and references, compiled at run start (see core/scenario_compiler.py)
+        self._program: Optional[CompiledProgram] = None
         self._current_action_index = 0
         # --- State Variables ---
-        self._skip_until_endif_level = 0
+        self._jump_to = -1 # Set by a handler to continue at another action (e.g. after the END_IF of an unmet IF)
         self._last_found_object_coords: Optional[Tuple[int, int, int, int]] = None
         self._last_condition_met = False
         self._loop_stack: List[Tuple[int, int]] = []
         self._break_loop_requested = False
-
-    def run(self):
+        # Detection results computed ahead of time by a batch search, keyed by action index
+        self._batched_results: Dict[int, Optional[Tuple[int, int, int, int, float]]] = {}
+        # Matches of active FOR_EACH_OBJECT blocks, keyed by the block's start index
+        self._for_each_matches: Dict[int, List[Tuple[int, int, int, int, float]]] = {}
+        # Frames captured for the upcoming run of detection actions, and the action indices the plan covers
+        self._capture_plan: Optional[CapturePlan] = None
+        self._capture_plan_indices: Set[int] = set()
+        self.summary = RunSummary(scenario.scenario_name)
+
+    def run(self) -> RunSummary:
         """The main execution loop for the scenario, including global repetitions."""
-        self._is_running = True
-        action_count = len(self.scenario.actions)
-        print(f"Starting scenario '{self.scenario.scenario_name}' with {action_count} actions, Repetitions: {'Infinite' if self.repetitions == 0 else self.repetitions}.")
+        self._is_running = True; started_at = time.perf_counter()
+        self.summary = summary = RunSummary(self.scenario.scenario_name)
+        try: self._program = compile_scenario(self.scenario)
+        except ScenarioCompileError as e:
+            for problem in e.problems: log.error("Error: %s", problem)
+            self._report_error(f"Scenario cannot run: {e}"); self._is_running = False; summary.status = RUN_INVALID; return summary
+        actions = self._program.actions; action_count = len(actions)
+        previous_profile = get_profile(); set_profile(self.profile)
+        previous_backend = screen_capture.set_backend(self.capture_backend) if self.capture_backend is not None else None
+        backend = screen_capture.get_backend(); clock = getattr(backend, "clock", None)
+        self._live = backend.live; self._virtual_clock = clock if getattr(clock, "virtual", False) else None; self.replay_clicks = []
+        if previous_backend is not None: object_detector.invalidate_detection_cache() # Frames of the previous backend
+        if self.record_dir:
+            try: frame_recorder.reset_stats(); frame_recorder.start(self.record_dir, meta={"scenario": self.scenario.scenario_name, "live": self._live})
+            except OSError as e: log.error("Error: Could not start frame recording: %s", e)
+        if self.capture_fps > 0: capture_service.reset_stats(); capture_service.start(self.capture_fps)
+        log.info("Starting scenario '%s' with %s actions, Repetitions: %s.", self.scenario.scenario_name, action_count, 'Infinite' if self.repetitions == 0 else self.repetitions)
 
         current_repetition = 0
         # --- Outer loop for global repetitions ---
         while self._is_running:
             current_repetition += 1
             if self.repetitions > 0 and current_repetition > self.repetitions:
-                print(f"Finished {self.repetitions} repetitions.")
+                log.info("Finished %s repetitions.", self.repetitions)
                 break # Finished all requested repetitions
 
-            print(f"\n--- Starting Repetition {current_repetition}/{'Infinite' if self.repetitions == 0 else self.repetitions} ---")
-            self.repetition_update.emit(current_repetition, self.repetitions)
+            log.info("\n--- Starting Repetition %s/%s ---", current_repetition, 'Infinite' if self.repetitions == 0 else self.repetitions)
+            self.callbacks.repetition_update(current_repetition, self.repetitions)
 
             # --- Reset state for this repetition ---
-            self._current_action_index = 0; self._skip_until_endif_level = 0; self._last_found_object_coords = None
+            self._current_action_index = 0; self._jump_to = -1; self._last_found_object_coords = None
             self._loop_stack = []; self._last_condition_met = False; self._break_loop_requested = False
+            self._batched_results = {}; self._for_each_matches = {}; self._drop_capture_plan()
 
             # --- Inner loop for actions ---
             while 0 <= self._current_action_index < action_count and self._is_running:
-                action = self.scenario.actions[self._current_action_index]
+                action = actions[self._current_action_index]
                 action_display_num = self._current_action_index + 1
                 jump_to_index = -1
 
                 # --- Handle Block Endings ---
                 if action.type == ACTION_END_IF:
-                    self.action_started.emit(self._current_action_index)
-                    if self._skip_until_endif_level > 0: self._skip_until_endif_level -= 1; print(f"END_IF reached, decreasing skip level to {self._skip_until_endif_level}")
-                    else: print("END_IF reached (not skipping)")
-                    self.action_finished.emit(self._current_action_index); self._current_action_index += 1; continue
+                    self._emit_ui(self.callbacks.action_started, self._current_action_index); log.info("END_IF reached")
+                    self._emit_ui(self.callbacks.action_finished, self._current_action_index); self._current_action_index += 1; continue
                 elif action.type == ACTION_LOOP_END:
-                    self.action_started.emit(self._current_action_index)
+                    self._emit_ui(self.callbacks.action_started, self._current_action_index); self._batched_results = {}; self._drop_capture_plan()
                     try:
                         if self._break_loop_requested:
-                            print("LOOP END: Breaking loop due to previous request.");
+                            log.info("LOOP END: Breaking loop due to previous request.");
                             if not self._loop_stack: raise LoopError("Attempted to break loop, but loop stack is empty.")
-                            self._loop_stack.pop(); self._break_loop_requested = False; jump_to_index = -1
+                            self._pop_loop(); self._break_loop_requested = False; jump_to_index = -1
                         else: jump_to_index = self._handle_loop_end(action)
-                    except Exception as e: error_msg = f"Error on action {action_display_num} ({action.type}): {e}"; print(error_msg); self.error_occurred.emit(error_msg); self._is_running = False; break
-                    self.action_finished.emit(self._current_action_index)
+                    except Exception as e: self._report_error(f"Error on action {action_display_num} ({action.type}): {e}"); self._is_running = False; break
+                    self._emit_ui(self.callbacks.action_finished, self._current_action_index)
                     if jump_to_index >= 0: self._current_action_index = jump_to_index; continue
                     else: self._current_action_index += 1; continue
 
-                # --- Check Skipping ---
-                if self._skip_until_endif_level > 0:
-                    print(f"Skipping action {action_display_num} ({action.type}) due to unmet IF condition.")
-                    if action.type in [ACTION_IF_OBJECT_FOUND, ACTION_LOOP_START]: self._skip_until_endif_level += 1; print(f"Nested {action.type} found while skipping, increasing skip level to {self._skip_until_endif_level}")
-                    self.action_started.emit(self._current_action_index); self.action_finished.emit(self._current_action_index)
-                    self._current_action_index += 1; continue
-
                 # --- Execute Action ---
-                self.action_started.emit(self._current_action_index) # Emit start before potential waits
-                print(f"Rep {current_repetition}, Executing action {action_display_num}: {action.type} - Details: {action.details}")
+                self._emit_ui(self.callbacks.action_started, self._current_action_index) # Emit start before potential waits
+                log.info("Rep %s, Executing action %s: %s", current_repetition, action_display_num, action.type); log.debug("Action details: %s", action.details)
 
                 try:
                     # --- Target Focus Check ---
-                    interactive_actions = [ACTION_CLICK, ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP]
-                    if action.type in interactive_actions:
-                        if self.scenario.require_focus and self.scenario.target_process_name:
-                            if not is_target_active(self.scenario.target_process_name):
-                                status_msg = f"Rep {current_repetition}: Waiting for target app '{self.scenario.target_process_name}'..."
-                                print(status_msg); self.status_update.emit(status_msg)
-                                while not is_target_active(self.scenario.target_process_name) and self._is_running: time.sleep(0.5)
-                                if not self._is_running: print("Scenario stopped while waiting for target app."); break
-                                print("Target app is active. Resuming...")
+                    if action.type in INTERACTIVE_ACTIONS:
+                        if self._live and self._program.require_focus and self._program.target_process_name:
+                            if not is_target_active(self._program.target_process_name):
+                                status_msg = f"Rep {current_repetition}: Waiting for target app '{self._program.target_process_name}'..."
+                                log.info(status_msg); self._emit_ui(self.callbacks.status_update, status_msg)
+                                while not is_target_active(self._program.target_process_name) and self._is_running: time.sleep(0.5)
+                                if not self._is_running: log.info("Scenario stopped while waiting for target app."); break
+                                log.info("Target app is active. Resuming...")
+
+                    # --- Drop batched detection results once anything else runs (screen may change) ---
+                    if action.type not in BATCHABLE_ACTIONS: self._batched_results = {}
+                    if action.type not in PLANNABLE_ACTIONS: self._drop_capture_plan()
 
                     # --- Reset condition flag before IF checks ---
-                    if action.type in [ACTION_IF_OBJECT_FOUND]: self._last_condition_met = False
+                    if action.type in IF_ACTIONS: self._last_condition_met = False
 
                     # --- Execute Handler ---
+                    self._jump_to = -1; summary.actions_executed += 1
+                    if action.type in RECORDED_ACTIONS: frame_recorder.begin_action(self._current_action_index, action.type)
                     if action.type == ACTION_CLICK:
-                        if self.USE_BACKGROUND_SIMULATION and win_input_simulator.is_simulation_available():
-                            print("--- Using Background Simulation for CLICK ---")
+                        if not self._live: self._handle_click_replay(action)
+                        elif self.USE_BACKGROUND_SIMULATION and win_input_simulator.is_simulation_available():
+                            log.info("Using Background Simulation for CLICK")
                             self._handle_click_simulation(action)
                         else:
-                            if self.USE_BACKGROUND_SIMULATION: print("--- Warning: Background Simulation requested but unavailable, falling back to Cursor Control ---")
-                            print("--- Using Cursor Control for CLICK ---")
+                            if self.USE_BACKGROUND_SIMULATION: log.warning("Warning: Background Simulation requested but unavailable, falling back to Cursor Control")
+                            log.info("Using Cursor Control for CLICK")
                             self._handle_click_cursor_control(action)
+                        summary.clicks += 1; object_detector.invalidate_detection_cache() # The click may change the screen
                     elif action.type == ACTION_WAIT: self._handle_wait(action)
                     elif action.type == ACTION_WAIT_FOR_OBJECT: self._handle_wait_for_object(action)
                     elif action.type == ACTION_IF_OBJECT_FOUND: self._handle_if_object_found(action)
                     elif action.type == ACTION_LOOP_START: self._handle_loop_start(action)
                     elif action.type == ACTION_CHECK_OBJECT_BREAK_LOOP: self._handle_check_object_break_loop(action)
-                    else: print(f"Warning: Action type '{action.type}' not implemented yet. Skipping.")
+                    elif action.type == ACTION_FOR_EACH_OBJECT: self._handle_for_each_object(action)
+                    elif action.type == ACTION_IF_PIXEL_COLOR: self._handle_if_pixel_color(action)
+                    elif action.type == ACTION_WAIT_FOR_PIXEL_COLOR: self._handle_wait_for_pixel_color(action)
+                    elif action.type == ACTION_FIND_COLOR: self._handle_find_color(action)
+                    else: log.warning("Warning: Action type '%s' not implemented yet. Skipping.", action.type)
+                    if action.type in RECORDED_ACTIONS: frame_recorder.end_action(self._detection_result(action))
 
-                    self.action_finished.emit(self._current_action_index)
+                    self._emit_ui(self.callbacks.action_finished, self._current_action_index)
 
                     # --- Check if break was requested ---
                     if self._break_loop_requested:
-                        if not self._loop_stack: print("Warning: Break requested but loop stack is empty."); self._break_loop_requested = False; self._current_action_index += 1
-                        else:
-                            found_loop_end_index = -1; temp_index = self._current_action_index + 1; nesting_level = 0
-                            while temp_index < action_count:
-                                a_type = self.scenario.actions[temp_index].type
-                                if a_type == ACTION_LOOP_START: nesting_level += 1
-                                elif a_type == ACTION_LOOP_END:
-                                    if nesting_level == 0: found_loop_end_index = temp_index; break
-                                    else: nesting_level -= 1
-                                temp_index += 1
-                            if found_loop_end_index != -1: print(f"Break requested, jumping to LOOP_END at index {found_loop_end_index}"); self._current_action_index = found_loop_end_index
-                            else: print("Warning: Break requested but matching LOOP_END not found."); self._break_loop_requested = False; self._current_action_index += 1
+                        if not self._loop_stack: log.warning("Warning: Break requested but loop stack is empty."); self._break_loop_requested = False; self._current_action_index += 1
+                        else: log.info("Break requested, jumping to LOOP_END at index %s", action.loop_end); self._current_action_index = action.loop_end
+                    elif self._jump_to >= 0: self._current_action_index = self._jump_to
                     else:
                         self._current_action_index += 1 # Normal progression
 
-                except InterruptedError: print("Scenario stopped during action."); self.status_update.emit("Scenario stopped."); self._is_running = False; break
-                except Exception as e: error_msg = f"Error on action {action_display_num} ({action.type}): {e}"; print(error_msg); self.error_occurred.emit(error_msg); self._is_running = False; break
+                except InterruptedError: log.info("Scenario stopped during action."); self._emit_ui(self.callbacks.status_update, "Scenario stopped."); self._is_running = False; break
+                except Exception as e: self._report_error(f"Error on action {action_display_num} ({action.type}): {e}"); self._is_running = False; break
 
-                if not self._is_running: print("Stop requested between actions."); break
+                if not self._is_running: log.info("Stop requested between actions."); break
+                if self._replay_finished(): log.info("Replay reached the end of the recording."); break
             # --- End of inner action loop ---
+            if self._current_action_index >= action_count: summary.repetitions_completed += 1
 
-            if not self._is_running: break # Break outer loop if inner loop was stopped
+            if not self._is_running or self._replay_finished(): break # Break outer loop if inner loop was stopped
 
         # --- Outer loop finished ---
+        log.info("Detector tracking stats: %s, change gating: %s, color prefilter: %s, detection cache: %s, dirty tiles: %s, capture planner: %s", object_detector.get_tracking_stats(), object_detector.get_change_gating_stats(), object_detector.get_prefilter_stats(), object_detector.get_detection_cache_stats(), object_detector.get_dirty_tile_stats(), capture_planner.stats())
+        if self.capture_fps > 0: capture_service.stop()
+        if self.record_dir: frame_recorder.stop()
+        if self._live: object_detector.save_priors()
+        screen_capture.close_session() # Release this thread's mss handle
         if self._is_running:
-             if self._loop_stack: print("Warning: Scenario finished with unterminated loops on stack."); self.error_occurred.emit("Scenario finished with unterminated LOOP block(s).")
-             elif self._skip_until_endif_level > 0: print("Warning: Scenario finished with unterminated IF blocks."); self.error_occurred.emit("Scenario finished with unterminated IF block(s).")
-             else: print(f"Scenario '{self.scenario.scenario_name}' finished all repetitions."); self.status_update.emit("Scenario finished."); self.finished.emit()
+             if self._replay_finished(): log.info("Scenario '%s' stopped at the end of the replay (%s clicks).", self.scenario.scenario_name, len(self.replay_clicks)); self._emit_ui(self.callbacks.status_update, "Replay finished."); summary.status = RUN_REPLAY_FINISHED; self.callbacks.finished()
+             else: log.info("Scenario '%s' finished all repetitions.", self.scenario.scenario_name); self._emit_ui(self.callbacks.status_update, "Scenario finished."); summary.status = RUN_FINISHED; self.callbacks.finished()
+        else: summary.status = RUN_ERROR if summary.errors else RUN_STOPPED
         self._is_running = False
+        if previous_backend is not None: screen_capture.set_backend(previous_backend); object_detector.invalidate_detection_cache()
+        set_profile(previous_profile)
+        summary.duration_s = round(time.perf_counter() - started_at, 3)
+        return summary
+
+    def _emit_ui(self, callback, *args):
+        """Sends a per-action UI/overlay event unless the turbo profile is active."""
+        if self._ui_signals: callback(*args)
+
+    def _report_error(self, message: str):
+        log.error(message); self.summary.errors.append(message); self.callbacks.error_occurred(message)
 
     def stop(self):
-        print("Stop signal received by ScenarioRunner.")
+        log.info("Stop signal received by ScenarioRunner.")
         self._is_running = False
 
+    def _skip_block(self, action: CompiledAction):
+        """Continues after the END_IF of an unmet IF (a jump-table lookup, the block is not walked)."""
+        self._jump_to = action.end + 1; log.info("Skipping to action %s (after END_IF).", self._jump_to + 1)
+
+    def _pop_loop(self):
+        """Pops the innermost loop and forgets its FOR_EACH_OBJECT matches, if any."""
+        start_index, _ = self._loop_stack.pop()
+        self._for_each_matches.pop(start_index, None)
+
+    def _detection_result(self, action: CompiledAction) -> dict:
+        """What a detection action found, stored with its frames in the frame recording."""
+        result = {"found": self._last_found_object_coords, "condition": self._last_condition_met}
+        if action.type == ACTION_FOR_EACH_OBJECT: result["matches"] = self._for_each_matches.get(self._current_action_index, [])
+        elif action.type == ACTION_CHECK_OBJECT_BREAK_LOOP: result["break"] = self._break_loop_requested
+        return result
+
+    def _find_target_window(self) -> Tuple[Optional[object], Optional[Tuple[int, int, int, int]]]:
+        """(hwnd, (left, top, right, bottom)) of the target window. A replay has no windows: its recorded screen stands in for the target window."""
+        if self._live: return find_window_for_process(self._program.target_process_name)
+        rect = screen_capture.get_backend().screen_rect()
+        return (None, None) if rect is None else ("replay", (rect[0], rect[1], rect[0] + rect[2], rect[1] + rect[3]))
+
+    def _replay_finished(self) -> bool:
+        return not self._live and getattr(screen_capture.get_backend(), "finished", False)
+
+    def _now(self) -> float:
+        """Current time for waits and timeouts: the replay's virtual clock if there is one, else wall time."""
+        return self._virtual_clock.now() if self._virtual_clock is not None else time.time()
+
+    def _pause(self, seconds: float):
+        """
+        Sleeps in short chunks so stop() is noticed. On a virtual clock it only
+        advances the clock (the replay shows what would be on screen by then).
+        Either way the screen is expected to change meanwhile, so cached
+        captures and results are dropped.
+        """
+        if self._virtual_clock is not None:
+            self._virtual_clock.advance(seconds)
+        else:
+            end_time = time.time() + seconds
+            while time.time() < end_time and self._is_running: sleep_interval = min(0.1, end_time - time.time()); time.sleep(sleep_interval) if sleep_interval > 0 else None
+        object_detector.invalidate_detection_cache()
+
+    def _target_window_rect(self) -> Optional[Tuple[int, int, int, int]]:
+        """Target window as (left, top, width, height), or None without a target app / if not found."""
+        if not self._program.target_process_name: return None
+        hwnd, rect = self._find_target_window()
+        if not hwnd or not rect or rect[2] <= rect[0] or rect[3] <= rect[1]: return None
+        return (rect[0], rect[1], rect[2] - rect[0], rect[3] - rect[1])
+
     def _get_search_region(self, action_region: Optional[Tuple[int, int, int, int]]) -> Optional[Tuple[int, int, int, int]]:
-        if action_region: print(f"Using specified search region: {action_region}"); return action_region
-        if self.scenario.target_process_name and platform.system() == "Windows":
-            print(f"No region specified, attempting to use target window '{self.scenario.target_process_name}'...")
-            hwnd, rect = find_window_for_process(self.scenario.target_process_name)
+        if action_region: log.info("Using specified search region: %s", action_region); return action_region
+        if self._program.target_process_name and platform.system() == "Windows":
+            log.info("No region specified, attempting to use target window '%s'...", self._program.target_process_name)
+            hwnd, rect = self._find_target_window()
             if rect:
                 region = (rect[0], rect[1], rect[2] - rect[0], rect[3] - rect[1])
-                if region[2] > 0 and region[3] > 0: print(f"Using target window rect as search region: {region}"); return region
-                else: print(f"Warning: Target window rect has invalid size: {region}. Searching full screen."); return None
-            else: print(f"Warning: Could not find target window '{self.scenario.target_process_name}'. Searching full screen."); return None
-        else: print("No region specified and no target window usable. Searching full screen."); return None
+                if region[2] > 0 and region[3] > 0: log.info("Using target window rect as search region: %s", region); return region
+                else: log.warning("Warning: Target window rect has invalid size: %s. Searching full screen.", region); return None
+            else: log.warning("Warning: Could not find target window '%s'. Searching full screen.", self._program.target_process_name); return None
+        else: log.info("No region specified and no target window usable. Searching full screen."); return None
+
+    def _get_window_origin(self) -> Tuple[int, int]:
+        """Top-left of the target window (pixel/color action coordinates are relative to it), or (0, 0) without a target app."""
+        if not self._program.target_process_name: return (0, 0)
+        hwnd, rect = self._find_target_window()
+        if not hwnd or not rect: raise RuntimeError(f"Target window for '{self._program.target_process_name}' not found.")
+        return (rect[0], rect[1])
+
+    def _detector(self, action: CompiledAction):
+        """The detector module selected by the action (both share the find_template/find_templates contract)."""
+        return feature_detector if action.details.get("detector") == DETECTOR_FEATURES else object_detector
+
+    def _detector_options(self, action: CompiledAction) -> dict:
+        """Extra find_template keyword arguments stored in a detection action's details."""
+        if self._detector(action) is feature_detector: return {}
+        return {"use_pyramid": bool(action.details.get("use_pyramid", False)), "use_color_prefilter": bool(action.details.get("use_color_prefilter", False)), "use_priors": self._live and bool(action.details.get("use_priors", False))} # Replays must not learn from (or be steered by) the live screen's priors
+
+    def _collect_detection_batch(self, start_index: int) -> List[int]:
+        """
+        Returns indices of the detection actions from start_index on that can be
+        answered from the same captured frame: consecutive IF_OBJECT_FOUND /
+        CHECK_OBJECT_BREAK_LOOP actions (END_IF may sit in between) with the same
+        region and detector options. Stops at the first action that could change
+        the screen.
+        """
+        actions = self._program.actions; first = actions[start_index]
+        batch = [start_index]; index = start_index + 1
+        while index < len(actions):
+            action = actions[index]
+            if action.type == ACTION_END_IF: index += 1; continue
+            if action.type not in BATCHABLE_ACTIONS: break
+            if action.details.get("region") != first.details.get("region") or self._detector(action) is not self._detector(first) or self._detector_options(action) != self._detector_options(first): break
+            template_path = action.details.get("template_path")
+            if not template_path or not os.path.exists(template_path): break # Let the handler report it when reached
+            batch.append(index); index += 1
+        return batch
+
+    def _find_object(self, action: CompiledAction, template_path: str, search_region: Optional[Tuple[int, int, int, int]], confidence: float) -> Optional[Tuple[int, int, int, int, float]]:
+        """Runs detection for a batchable action, searching for following actions in the same frame."""
+        if self._current_action_index in self._batched_results:
+            log.info("Using detection result from batched search.")
+            return self._batched_results.pop(self._current_action_index)
+        self._batched_results = {}
+        batch = self._collect_detection_batch(self._current_action_index); frame = self._planned_frame(search_region)
+        if len(batch) == 1:
+            return self._detector(action).find_template(template_path=template_path, region=search_region, threshold=confidence, frame=frame, **self._detector_options(action))
+
+        batch_actions = [self._program.actions[i] for i in batch]
+        log.info("Batch searching %s templates in one frame (actions %s).", len(batch), ', '.join(str(i + 1) for i in batch))
+        results = self._detector(action).find_templates(
+            [a.details.get("template_path") for a in batch_actions], region=search_region,
+            threshold=[a.details.get("confidence", 0.8) for a in batch_actions], frame=frame, **self._detector_options(action)
+        )
+        self._batched_results = dict(zip(batch[1:], results[1:]))
+        return results[0]
+
+    def _drop_capture_plan(self):
+        self._capture_plan = None; self._capture_plan_indices = set()
+
+    def _planned_frame(self, region: Optional[Tuple[int, int, int, int]]) -> Optional[Frame]:
+        """
+        Zero-copy view of `region` from the capture plan covering the current
+        action (planned on first use), or None to let the detector capture.
+        """
+        if self._current_action_index not in self._capture_plan_indices:
+            self._capture_plan, self._capture_plan_indices = self._plan_captures(self._current_action_index)
+        return self._capture_plan.frame_for(region) if self._capture_plan is not None else None
+
+    def _plan_captures(self, start_index: int) -> Tuple[Optional[CapturePlan], Set[int]]:
+        """
+        Looks ahead from start_index over the detection actions that run before
+        anything can change the screen (END_IF may sit in between; a
+        FOR_EACH_OBJECT ends the run, since its body clicks) and captures their
+        regions in one or two grabs (see vision/capture_planner.py).
+        """
+        indices: List[int] = []; regions: List[Optional[Tuple[int, int, int, int]]] = []
+        window_rect = self._target_window_rect() # Looked up once for the whole plan
+        search_default = window_rect if platform.system() == "Windows" else None # As in _get_search_region
+        origin = (window_rect[0], window_rect[1]) if window_rect else (0, 0) # As in _get_window_origin
+        actions = self._program.actions; index = start_index
+        while index < len(actions):
+            action = actions[index]
+            if action.type == ACTION_END_IF: index += 1; continue
+            if action.type not in PLANNABLE_ACTIONS: break
+            if action.type in [ACTION_IF_PIXEL_COLOR, ACTION_FIND_COLOR] and self._program.target_process_name and window_rect is None: break # The handler reports the missing window
+            action_region = action.details.get("region")
+            if action.type == ACTION_IF_PIXEL_COLOR: region = (origin[0] + action.details.get("x", 0), origin[1] + action.details.get("y", 0), 1, 1)
+            elif action.type == ACTION_FIND_COLOR and action_region: region = (origin[0] + action_region[0], origin[1] + action_region[1], action_region[2], action_region[3])
+            else: region = tuple(action_region) if action_region else search_default
+            indices.append(index); regions.append(region); index += 1
+            if action.type == ACTION_FOR_EACH_OBJECT: break
+        if len(indices) < 2: return None, set(indices) # A lone action captures its own region as before
+        return capture_planner.plan(regions), set(indices)
 
     # --- Action Handlers ---
-    def _handle_wait(self, action: Action):
-        duration_ms = action.details.get("duration_ms", 1000); duration_s = duration_ms / 1000.0; print(f"Waiting for {duration_s:.2f} seconds...")
-        end_time = time.time() + duration_s
-        while time.time() < end_time and self._is_running: sleep_interval = min(0.1, end_time - time.time()); time.sleep(sleep_interval) if sleep_interval > 0 else None
-        if not self._is_running: print("Wait interrupted."); raise InterruptedError("Stopped during wait.")
-        print("Wait finished.")
-
-    def _calculate_click_coords(self, action: Action) -> Tuple[Optional[int], Optional[int]]:
+    def _handle_wait(self, action: CompiledAction):
+        duration_ms = action.details.get("duration_ms", 1000); duration_s = duration_ms / 1000.0; log.info("Waiting for %.2f seconds...", duration_s)
+        self._pause(duration_s)
+        if not self._is_running: log.info("Wait interrupted."); raise InterruptedError("Stopped during wait.")
+        log.info("Wait finished.")
+
+    def _calculate_click_coords(self, action: CompiledAction) -> Tuple[Optional[int], Optional[int]]:
         """Calculates the absolute screen coordinates for a CLICK action."""
         pos_name = action.details.get("position_name"); offset_x = action.details.get("offset_x", 0); offset_y = action.details.get("offset_y", 0)
         absolute_x: Optional[int] = None; absolute_y: Optional[int] = None
-        print(f"--- COORD CALC DEBUG: Action Details: {action.details} ---")
+        log.debug("Coord calc: Action Details: %s", action.details)
 
         if pos_name == CLICK_TARGET_FOUND_OBJECT:
-            print("--- COORD CALC DEBUG: Target is Found Object ---")
+            log.debug("Coord calc: Target is Found Object")
             if self._last_found_object_coords is None: raise ValueError("CLICK targets found object, but no object found previously.")
             fx, fy, fw, fh = self._last_found_object_coords; center_x = fx + fw // 2; center_y = fy + fh // 2; absolute_x = center_x + offset_x; absolute_y = center_y + offset_y
-            print(f"--- COORD CALC DEBUG: Found Object Rect (Screen): ({fx},{fy},{fw},{fh}) ---"); print(f"--- COORD CALC DEBUG: Found Object Center (Screen): ({center_x},{center_y}) ---"); print(f"--- COORD CALC DEBUG: Offset: ({offset_x},{offset_y}) ---")
+            log.debug("Coord calc: Found Object Rect (Screen): (%s,%s,%s,%s)", fx, fy, fw, fh); log.debug("Coord calc: Found Object Center (Screen): (%s,%s)", center_x, center_y); log.debug("Coord calc: Offset: (%s,%s)", offset_x, offset_y)
         # Add CLICK_TARGET_FOUND_TEXT later
         elif pos_name:
-            print(f"--- COORD CALC DEBUG: Target is Position '{pos_name}' ---")
-            if not self.scenario.target_process_name: raise ValueError("Cannot perform relative CLICK without target app.")
-            position = self.scenario.get_position_by_name(pos_name);
-            if not position: raise ValueError(f"Position '{pos_name}' not found.")
-            print(f"--- COORD CALC DEBUG: Finding window for '{self.scenario.target_process_name}'... ---"); hwnd, rect = find_window_for_process(self.scenario.target_process_name)
-            if not hwnd or not rect: raise RuntimeError(f"Target window for '{self.scenario.target_process_name}' not found.")
-            window_x, window_y = rect[0], rect[1]; print(f"--- COORD CALC DEBUG: Target window Rect (Screen): {rect} ---"); print(f"--- COORD CALC DEBUG: Target window TopLeft (Screen): ({window_x}, {window_y}) ---"); print(f"--- COORD CALC DEBUG: Position Relative Coords: ({position.relative_x},{position.relative_y}) ---")
-            absolute_x = window_x + position.relative_x; absolute_y = window_y + position.relative_y
+            log.debug("Coord calc: Target is Position '%s'", pos_name)
+            relative_x, relative_y = action.position # Resolved by the compiler (which also requires a target app)
+            log.debug("Coord calc: Finding window for '%s'...", self._program.target_process_name); hwnd, rect = self._find_target_window()
+            if not hwnd or not rect: raise RuntimeError(f"Target window for '{self._program.target_process_name}' not found.")
+            window_x, window_y = rect[0], rect[1]; log.debug("Coord calc: Target window Rect (Screen): %s", rect); log.debug("Coord calc: Target window TopLeft (Screen): (%s, %s)", window_x, window_y); log.debug("Coord calc: Position Relative Coords: (%s,%s)", relative_x, relative_y)
+            absolute_x = window_x + relative_x; absolute_y = window_y + relative_y
         else: raise ValueError("CLICK action has invalid target.")
 
-        print(f"--- COORD CALC DEBUG: Calculated Absolute Coords: ({absolute_x}, {absolute_y}) ---")
+        log.debug("Coord calc: Calculated Absolute Coords: (%s, %s)", absolute_x, absolute_y)
         return absolute_x, absolute_y
 
-    def _handle_click_cursor_control(self, action: Action):
+    def _handle_click_replay(self, action: CompiledAction):
+        """ Handles CLICK against a replay: computes the target like a real click, but only records it. """
+        abs_x, abs_y = self._calculate_click_coords(action)
+        if abs_x is None or abs_y is None: raise RuntimeError("Failed to determine click coordinates before clicking.")
+        log.info("Replay click at (%s, %s) (not sent).", abs_x, abs_y)
+        self._emit_ui(self.callbacks.click_target_calculated, abs_x, abs_y); self.replay_clicks.append((abs_x, abs_y))
+
+    def _handle_click_cursor_control(self, action: CompiledAction):
         """ Handles CLICK using pyautogui (moves cursor). """
         abs_x, abs_y = self._calculate_click_coords(action)
         if abs_x is not None and abs_y is not None:
-            print(f"--- CURSOR CLICK DEBUG: Final Absolute Coords: ({abs_x}, {abs_y}) ---")
-            self.click_target_calculated.emit(abs_x, abs_y)
-            self.msleep(15) # Pre-click delay
+            log.debug("Cursor click: Final Absolute Coords: (%s, %s)", abs_x, abs_y)
+            self._emit_ui(self.callbacks.click_target_calculated, abs_x, abs_y)
+            time.sleep(0.015) # Pre-click delay
             if self._is_running:
+                 from automation import mouse_control
                  mouse_control.click(x=abs_x, y=abs_y, button=action.details.get("button", "left"), clicks=2 if action.details.get("click_type") == "double" else 1)
             else:
                  raise InterruptedError("Stopped during pre-click delay.")
         else:
             raise RuntimeError("Failed to determine click coordinates before clicking.")
 
-    def _handle_click_simulation(self, action: Action):
+    def _handle_click_simulation(self, action: CompiledAction):
         """ Handles CLICK using win32 messages (background). """
         pos_name = action.details.get("position_name"); offset_x = action.details.get("offset_x", 0); offset_y = action.details.get("offset_y", 0); button = action.details.get("button", "left"); click_type = action.details.get("click_type", "single"); clicks = 2 if click_type == "double" else 1
-        if not self.scenario.target_process_name: raise ValueError("Cannot perform background CLICK without a target application set.")
+        if not self._program.target_process_name: raise ValueError("Cannot perform background CLICK without a target application set.")
 
-        print(f"--- SIM CLICK DEBUG: Finding window for '{self.scenario.target_process_name}'... ---"); hwnd, rect = find_window_for_process(self.scenario.target_process_name)
-        if not hwnd or not rect: raise RuntimeError(f"Target window for '{self.scenario.target_process_name}' not found for simulation.")
-        print(f"--- SIM CLICK DEBUG: Found HWND {hwnd}, Rect {rect} ---")
+        log.debug("Sim click: Finding window for '%s'...", self._program.target_process_name); hwnd, rect = self._find_target_window()
+        if not hwnd or not rect: raise RuntimeError(f"Target window for '{self._program.target_process_name}' not found for simulation.")
+        log.debug("Sim click: Found HWND %s, Rect %s", hwnd, rect)
 
         target_screen_x: Optional[int] = None; target_screen_y: Optional[int] = None
         if pos_name == CLICK_TARGET_FOUND_OBJECT:
-            print("--- SIM CLICK DEBUG: Target is Found Object ---")
+            log.debug("Sim click: Target is Found Object")
             if self._last_found_object_coords is None: raise ValueError("CLICK targets found object, but no object found previously.")
-            fx, fy, fw, fh = self._last_found_object_coords; center_x = fx + fw // 2; center_y = fy + fh // 2; target_screen_x = center_x + offset_x; target_screen_y = center_y + offset_y; print(f"--- SIM CLICK DEBUG: Found Object Center (Screen): ({center_x},{center_y}), Offset: ({offset_x},{offset_y}) ---")
+            fx, fy, fw, fh = self._last_found_object_coords; center_x = fx + fw // 2; center_y = fy + fh // 2; target_screen_x = center_x + offset_x; target_screen_y = center_y + offset_y; log.debug("Sim click: Found Object Center (Screen): (%s,%s), Offset: (%s,%s)", center_x, center_y, offset_x, offset_y)
         elif pos_name:
-            print(f"--- SIM CLICK DEBUG: Target is Position '{pos_name}' ---")
-            position = self.scenario.get_position_by_name(pos_name);
-            if not position: raise ValueError(f"Position '{pos_name}' not found.")
-            window_x, window_y = rect[0], rect[1]; target_screen_x = window_x + position.relative_x; target_screen_y = window_y + position.relative_y; print(f"--- SIM CLICK DEBUG: Window TopLeft (Screen): ({window_x}, {window_y}) ---"); print(f"--- SIM CLICK DEBUG: Position Relative Coords: ({position.relative_x},{position.relative_y}) ---")
+            log.debug("Sim click: Target is Position '%s'", pos_name)
+            relative_x, relative_y = action.position # Resolved by the compiler
+            window_x, window_y = rect[0], rect[1]; target_screen_x = window_x + relative_x; target_screen_y = window_y + relative_y; log.debug("Sim click: Window TopLeft (Screen): (%s, %s)", window_x, window_y); log.debug("Sim click: Position Relative Coords: (%s,%s)", relative_x, relative_y)
         else: raise ValueError("CLICK action has invalid target.")
 
         if target_screen_x is None or target_screen_y is None: raise RuntimeError("Failed to determine target screen coordinates.")
-        print(f"--- SIM CLICK DEBUG: Target Screen Coords: ({target_screen_x}, {target_screen_y}) ---")
-        self.click_target_calculated.emit(target_screen_x, target_screen_y)
+        log.debug("Sim click: Target Screen Coords: (%s, %s)", target_screen_x, target_screen_y)
+        self._emit_ui(self.callbacks.click_target_calculated, target_screen_x, target_screen_y)
 
         client_x, client_y = win_input_simulator.screen_to_client(hwnd, target_screen_x, target_screen_y)
         if client_x is None or client_y is None: raise RuntimeError(f"Failed to convert screen coords to client coords for HWND {hwnd}.")
-        print(f"--- SIM CLICK DEBUG: Target Client Coords: ({client_x}, {client_y}) ---")
+        log.debug("Sim click: Target Client Coords: (%s, %s)", client_x, client_y)
 
-        self.msleep(30) # Delay before sending messages
+        time.sleep(0.03) # Delay before sending messages
         if self._is_running: win_input_simulator.simulate_click(hwnd, client_x, client_y, button=button, clicks=clicks)
         else: raise InterruptedError("Stopped before simulating click.")
 
-    def _handle_wait_for_object(self, action: Action):
+    def _handle_wait_for_object(self, action: CompiledAction):
         template_path = action.details.get("template_path"); confidence = action.details.get("confidence", 0.8); action_region = action.details.get("region"); timeout_ms = action.details.get("timeout_ms")
         if not template_path or not os.path.exists(template_path): raise FileNotFoundError(f"Template image path invalid or not found: '{template_path}'")
         search_region = self._get_search_region(action_region); template_filename = os.path.basename(template_path)
-        print(f"Waiting for object '{template_filename}' (Conf: {confidence:.2f})... Region: {search_region}"); self.status_update.emit(f"Waiting for object: {template_filename}...")
-        start_time = time.time(); timeout_s = (timeout_ms / 1000.0) if timeout_ms else None; check_interval = 0.3; self._last_found_object_coords = None
-        while self._is_running:
-            if timeout_s is not None and (time.time() - start_time) > timeout_s:
-                print(f"Timeout reached while waiting for object '{template_filename}'. Proceeding."); self.status_update.emit(f"Timeout waiting for '{template_filename}'."); self._last_found_object_coords = None; return
-            match_result = object_detector.find_template(template_path=template_path, region=search_region, threshold=confidence)
+        log.info("Waiting for object '%s' (Conf: %.2f)... Region: %s", template_filename, confidence, search_region); self._emit_ui(self.callbacks.status_update, f"Waiting for object: {template_filename}...")
+        start_time = self._now(); timeout_s = (timeout_ms / 1000.0) if timeout_ms else None; check_interval = 0.3 if not capture_service.running else max(0.02, 1.0 / capture_service.fps); self._last_found_object_coords = None
+        while self._is_running and not self._replay_finished():
+            if timeout_s is not None and (self._now() - start_time) > timeout_s:
+                log.info("Timeout reached while waiting for object '%s'. Proceeding.", template_filename); self._emit_ui(self.callbacks.status_update, f"Timeout waiting for '{template_filename}'."); self._last_found_object_coords = None; return
+            match_result = self._detector(action).find_template(template_path=template_path, region=search_region, threshold=confidence, **self._detector_options(action))
             if match_result:
-                x, y, w, h, conf = match_result; print(f"Object '{template_filename}' found at screen coords ({x},{y}) with confidence {conf:.4f}."); self.status_update.emit(f"Object '{template_filename}' found."); self._last_found_object_coords = (x, y, w, h); self.object_detected_at.emit(x, y, w, h, conf, template_filename); return
-            wait_end_time = time.time() + check_interval
-            while time.time() < wait_end_time and self._is_running: sleep_chunk = min(0.1, wait_end_time - time.time()); time.sleep(sleep_chunk) if sleep_chunk > 0 else None
-        if not self._is_running: print("Wait for object interrupted."); raise InterruptedError("Stopped while waiting for object.")
+                x, y, w, h, conf = match_result; log.info("Object '%s' found at screen coords (%s,%s) with confidence %.4f.", template_filename, x, y, conf); self._emit_ui(self.callbacks.status_update, f"Object '{template_filename}' found."); self._last_found_object_coords = (x, y, w, h); self._emit_ui(self.callbacks.object_detected_at, x, y, w, h, conf, template_filename); return
+            self._pause(check_interval)
+        if not self._is_running: log.info("Wait for object interrupted."); raise InterruptedError("Stopped while waiting for object.")
 
-    def _handle_if_object_found(self, action: Action):
+    def _handle_if_object_found(self, action: CompiledAction):
         template_path = action.details.get("template_path"); confidence = action.details.get("confidence", 0.8); action_region = action.details.get("region")
         if not template_path or not os.path.exists(template_path): raise FileNotFoundError(f"Template image path invalid or not found: '{template_path}'")
         search_region = self._get_search_region(action_region); template_filename = os.path.basename(template_path)
-        print(f"Checking IF object '{template_filename}' found (Conf: {confidence:.2f})... Region: {search_region}"); self._last_found_object_coords = None; self._last_condition_met = False
-        match_result = object_detector.find_template(template_path=template_path, region=search_region, threshold=confidence)
+        log.info("Checking IF object '%s' found (Conf: %.2f)... Region: %s", template_filename, confidence, search_region); self._last_found_object_coords = None; self._last_condition_met = False
+        match_result = self._find_object(action, template_path, search_region, confidence)
         if match_result:
-            x, y, w, h, conf = match_result; print(f"IF condition MET: Object found at screen coords ({x},{y}), confidence {conf:.4f}."); self._last_found_object_coords = (x, y, w, h); self._last_condition_met = True; self.object_detected_at.emit(x, y, w, h, conf, template_filename)
+            x, y, w, h, conf = match_result; log.info("IF condition MET: Object found at screen coords (%s,%s), confidence %.4f.", x, y, conf); self._last_found_object_coords = (x, y, w, h); self._last_condition_met = True; self._emit_ui(self.callbacks.object_detected_at, x, y, w, h, conf, template_filename)
         else:
-            print("IF condition NOT MET: Object not found."); self._last_condition_met = False; self._skip_until_endif_level += 1; print(f"Skipping until END_IF level {self._skip_until_endif_level} reached.")
-
-    def _handle_loop_start(self, action: Action):
+            log.info("IF condition NOT MET: Object not found."); self._last_condition_met = False; self._skip_block(action)
+
+    def _handle_if_pixel_color(self, action: CompiledAction):
+        x = action.details.get("x", 0); y = action.details.get("y", 0); color = pixel_color.parse_color(action.details.get("color", (0, 0, 0))); tolerance = action.details.get("tolerance", 0)
+        origin_x, origin_y = self._get_window_origin(); abs_x = origin_x + x; abs_y = origin_y + y
+        self._last_found_object_coords = None; self._last_condition_met = False
+        matches, actual = pixel_color.pixel_matches(abs_x, abs_y, color, tolerance, frame=self._planned_frame((abs_x, abs_y, 1, 1)))
+        log.info("Checking IF pixel (%s,%s) is %s +-%s: actual %s", abs_x, abs_y, color, tolerance, actual)
+        if matches:
+            log.info("IF condition MET: Pixel color matches."); self._last_found_object_coords = (abs_x, abs_y, 1, 1); self._last_condition_met = True; self._emit_ui(self.callbacks.object_detected_at, abs_x, abs_y, 1, 1, 1.0, f"pixel {color}")
+        else:
+            log.info("IF condition NOT MET: Pixel color differs."); self._skip_block(action)
+
+    def _handle_wait_for_pixel_color(self, action: CompiledAction):
+        x = action.details.get("x", 0); y = action.details.get("y", 0); color = pixel_color.parse_color(action.details.get("color", (0, 0, 0))); tolerance = action.details.get("tolerance", 0); timeout_ms = action.details.get("timeout_ms")
+        origin_x, origin_y = self._get_window_origin(); abs_x = origin_x + x; abs_y = origin_y + y
+        log.info("Waiting for pixel (%s,%s) to be %s +-%s...", abs_x, abs_y, color, tolerance); self._emit_ui(self.callbacks.status_update, f"Waiting for pixel color at ({abs_x},{abs_y})...")
+        start_time = self._now(); timeout_s = (timeout_ms / 1000.0) if timeout_ms else None; check_interval = 0.05; self._last_found_object_coords = None
+        while self._is_running and not self._replay_finished():
+            if timeout_s is not None and (self._now() - start_time) > timeout_s:
+                log.info("Timeout reached while waiting for pixel color at (%s,%s). Proceeding.", abs_x, abs_y); self._emit_ui(self.callbacks.status_update, "Timeout waiting for pixel color."); return
+            matches, _ = pixel_color.pixel_matches(abs_x, abs_y, color, tolerance)
+            if matches:
+                log.info("Pixel (%s,%s) matched %s.", abs_x, abs_y, color); self._emit_ui(self.callbacks.status_update, "Pixel color matched."); self._last_found_object_coords = (abs_x, abs_y, 1, 1); self._emit_ui(self.callbacks.object_detected_at, abs_x, abs_y, 1, 1, 1.0, f"pixel {color}"); return
+            self._pause(check_interval) # Single-pixel checks are cheap, so poll faster than WAIT_FOR_OBJECT
+        if not self._is_running: log.info("Wait for pixel color interrupted."); raise InterruptedError("Stopped while waiting for pixel color.")
+
+    def _handle_find_color(self, action: CompiledAction):
+        color = pixel_color.parse_color(action.details.get("color", (0, 0, 0))); tolerance = action.details.get("tolerance", 0); action_region = action.details.get("region")
+        if action_region:
+            origin_x, origin_y = self._get_window_origin(); search_region = (origin_x + action_region[0], origin_y + action_region[1], action_region[2], action_region[3])
+        else: search_region = self._get_search_region(None)
+        log.info("Finding color %s +-%s... Region: %s", color, tolerance, search_region); self._last_found_object_coords = None; self._last_condition_met = False
+        position = pixel_color.find_color(color, search_region, tolerance, frame=self._planned_frame(search_region))
+        if position:
+            px, py = position; log.info("Color found at screen coords (%s,%s).", px, py); self._last_found_object_coords = (px, py, 1, 1); self._last_condition_met = True; self._emit_ui(self.callbacks.object_detected_at, px, py, 1, 1, 1.0, f"color {color}")
+        else: log.info("Color not found.")
+
+    def _handle_loop_start(self, action: CompiledAction):
         iterations = action.details.get("iterations", 1);
         if iterations < 0: raise ValueError("LOOP iterations cannot be negative.")
         iterations_remaining = -1 if iterations == 0 else iterations
         loop_start_index = self._current_action_index
         self._loop_stack.append((loop_start_index, iterations_remaining))
-        print(f"LOOP START: {iterations if iterations > 0 else 'Infinite'} iterations. Stack: {self._loop_stack}")
+        log.info("LOOP START: %s iterations. Stack: %s", iterations if iterations > 0 else 'Infinite', self._loop_stack)
 
-    def _handle_loop_end(self, action: Action) -> int:
+    def _handle_loop_end(self, action: CompiledAction) -> int:
         if not self._loop_stack: raise LoopError("Encountered LOOP_END without matching LOOP_START.")
         start_index, iterations_remaining = self._loop_stack[-1]
         break_condition = action.details.get("break_condition", "none")
 
         if break_condition == "last_if_success" and self._last_condition_met:
-            print("LOOP END: Breaking loop because 'last_if_success' condition met.")
-            self._loop_stack.pop(); self._last_condition_met = False; return -1
+            log.info("LOOP END: Breaking loop because 'last_if_success' condition met.")
+            self._pop_loop(); self._last_condition_met = False; return -1
 
         self._last_condition_met = False
 
-        if iterations_remaining == -1: print("LOOP END: Infinite loop, jumping back."); return start_index + 1
-        iterations_remaining -= 1; print(f"LOOP END: Decrementing count. Remaining: {iterations_remaining}")
+        if iterations_remaining == -1: log.info("LOOP END: Infinite loop, jumping back."); return start_index + 1
+        iterations_remaining -= 1; log.info("LOOP END: Decrementing count. Remaining: %s", iterations_remaining)
         if iterations_remaining > 0:
-            self._loop_stack[-1] = (start_index, iterations_remaining); print("Loop continues, jumping back."); return start_index + 1
+            self._loop_stack[-1] = (start_index, iterations_remaining); log.info("Loop continues, jumping back.")
+            if start_index in self._for_each_matches: self._select_for_each_match(start_index, len(self._for_each_matches[start_index]) - iterations_remaining)
+            return start_index + 1
         else:
-            self._loop_stack.pop(); print(f"Loop finished. Popping stack. Stack: {self._loop_stack}"); return -1
+            self._pop_loop(); log.info("Loop finished. Popping stack. Stack: %s", self._loop_stack); return -1
 
-    def _handle_check_object_break_loop(self, action: Action):
+    def _handle_check_object_break_loop(self, action: CompiledAction):
         template_path = action.details.get("template_path"); confidence = action.details.get("confidence", 0.8); action_region = action.details.get("region")
         if not template_path or not os.path.exists(template_path): raise FileNotFoundError(f"Template image path invalid or not found: '{template_path}'")
         search_region = self._get_search_region(action_region); template_filename = os.path.basename(template_path)
-        print(f"Checking if object '{template_filename}' found to break loop (Conf: {confidence:.2f})... Region: {search_region}"); self._last_found_object_coords = None
-        match_result = object_detector.find_template(template_path=template_path, region=search_region, threshold=confidence)
+        log.info("Checking if object '%s' found to break loop (Conf: %.2f)... Region: %s", template_filename, confidence, search_region); self._last_found_object_coords = None
+        match_result = self._find_object(action, template_path, search_region, confidence)
         if match_result:
-            x, y, w, h, conf = match_result; print(f"Object found at ({x},{y}), confidence {conf:.4f}. Requesting loop break."); self.status_update.emit(f"Object '{template_filename}' found, breaking loop.")
-            self._last_found_object_coords = (x, y, w, h); self.object_detected_at.emit(x, y, w, h, conf, template_filename); self._break_loop_requested = True
+            x, y, w, h, conf = match_result; log.info("Object found at (%s,%s), confidence %.4f. Requesting loop break.", x, y, conf); self._emit_ui(self.callbacks.status_update, f"Object '{template_filename}' found, breaking loop.")
+            self._last_found_object_coords = (x, y, w, h); self._emit_ui(self.callbacks.object_detected_at, x, y, w, h, conf, template_filename); self._break_loop_requested = True
         else:
-            print("Object not found, loop continues."); self._break_loop_requested = False
\ No newline at end of file
+            log.info("Object not found, loop continues."); self._break_loop_requested = False
+
+    def _handle_for_each_object(self, action: CompiledAction):
+        template_path = action.details.get("template_path"); confidence = action.details.get("confidence", 0.8); action_region = action.details.get("region")
+        sort_by = action.details.get("sort_by", "top_to_bottom"); max_matches = action.details.get("max_matches", 0)
+        if not template_path or not os.path.exists(template_path): raise FileNotFoundError(f"Template image path invalid or not found: '{template_path}'")
+        search_region = self._get_search_region(action_region); template_filename = os.path.basename(template_path)
+        log.info("FOR EACH object '%s' (Conf: %.2f, Order: %s)... Region: %s", template_filename, confidence, sort_by, search_region); self._last_found_object_coords = None
+        matches = object_detector.find_all(template_path=template_path, region=search_region, threshold=confidence, sort_by=sort_by, max_results=max_matches, frame=self._planned_frame(search_region))
+        loop_start_index = self._current_action_index
+        self._loop_stack.append((loop_start_index, len(matches))); self._for_each_matches[loop_start_index] = matches
+        for x, y, w, h, conf in matches: self._emit_ui(self.callbacks.object_detected_at, x, y, w, h, conf, template_filename)
+        if not matches:
+            log.info("FOR EACH: No matches found, skipping block."); self._break_loop_requested = True; return
+        self._emit_ui(self.callbacks.status_update, f"Found {len(matches)} x '{template_filename}'.")
+        self._select_for_each_match(loop_start_index, 0)
+
+    def _select_for_each_match(self, loop_start_index: int, match_index: int):
+        """Makes one FOR_EACH_OBJECT match the current @found_object."""
+        matches = self._for_each_matches[loop_start_index]
+        x, y, w, h, conf = matches[match_index]; self._last_found_object_coords = (x, y, w, h)
+        log.info("FOR EACH: Match %s/%s at (%s,%s), confidence %.4f.", match_index + 1, len(matches), x, y, conf)
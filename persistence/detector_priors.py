@@ -0,0 +1,119 @@
+# persistence/detector_priors.py
+
+import json
+import os
+import threading
+from typing import Optional, Tuple, List, Dict, Any
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_PRIORS_PATH = os.path.join(os.path.expanduser("~"), ".cv_autoclicker", "detector_priors.json")
+MIN_PRIOR_HITS = 3 # Hits needed before a prior narrows the search
+MAX_NARROWED_MISSES = 10 # Consecutive misses (~3 s of 0.3 s polls) before the search widens again
+REGION_MARGIN = 32 # Pixels added around the learned sub-region (plus half the template size)
+
+
+class DetectorPriors:
+    """
+    Persistent per-template search priors.
+
+    Keyed by template content hash plus search-region (target window) size, each
+    prior records which scales matches came from and the bounding box of all
+    match rectangles relative to the search region. The detector uses them to
+    narrow the scale set and the captured area, and falls back to the full
+    search after MAX_NARROWED_MISSES consecutive misses until the next hit.
+    """
+
+    def __init__(self, filepath: str = DEFAULT_PRIORS_PATH):
+        self.filepath = filepath
+        self._priors: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def make_key(content_hash: str, region_size: Optional[Tuple[int, int]]) -> str:
+        size = f"{region_size[0]}x{region_size[1]}" if region_size else "screen"
+        return f"{content_hash}@{size}"
+
+    def suggest(self, key: str, scales: List[float], region_size: Optional[Tuple[int, int]]) -> Optional[Tuple[List[float], Optional[Tuple[int, int, int, int]]]]:
+        """
+        Returns (narrowed scales, sub-region relative to the search region) for a
+        key with enough history, or None to run the full search. The sub-region
+        is None when only the scale set is narrowed.
+        """
+        with self._lock:
+            self._ensure_loaded()
+            prior = self._priors.get(key)
+            if not prior or prior.get("hits", 0) < MIN_PRIOR_HITS or prior.get("misses", 0) >= MAX_NARROWED_MISSES:
+                return None
+            seen = [float(s) for s in prior.get("scales", {})]
+            narrowed = [s for s in scales if min(seen) - 1e-6 <= s <= max(seen) + 1e-6] if seen else []
+            if not narrowed: narrowed = list(scales)
+
+            sub_region = None
+            bbox = prior.get("bbox")
+            if bbox:
+                x0, y0, x1, y1 = bbox
+                margin_x = REGION_MARGIN + (x1 - x0) // 2; margin_y = REGION_MARGIN + (y1 - y0) // 2
+                x0 = max(0, x0 - margin_x); y0 = max(0, y0 - margin_y); x1 += margin_x; y1 += margin_y
+                if region_size: x1 = min(region_size[0], x1); y1 = min(region_size[1], y1)
+                if x1 > x0 and y1 > y0: sub_region = (x0, y0, x1 - x0, y1 - y0)
+            return narrowed, sub_region
+
+    def record_hit(self, key: str, scale: float, rect: Tuple[int, int, int, int]):
+        """Records a match (rect relative to the search region) and resets the miss count."""
+        x, y, w, h = rect
+        with self._lock:
+            self._ensure_loaded()
+            prior = self._priors.setdefault(key, {"hits": 0, "misses": 0, "scales": {}, "bbox": None})
+            prior["hits"] += 1; prior["misses"] = 0
+            scale_key = f"{scale:.4f}"
+            prior["scales"][scale_key] = prior["scales"].get(scale_key, 0) + 1
+            bbox = prior.get("bbox")
+            prior["bbox"] = [x, y, x + w, y + h] if not bbox else [min(bbox[0], x), min(bbox[1], y), max(bbox[2], x + w), max(bbox[3], y + h)]
+            self._dirty = True
+
+    def record_miss(self, key: str):
+        """Counts a consecutive miss; MAX_NARROWED_MISSES of them widen the next searches."""
+        with self._lock:
+            prior = self._priors.get(key)
+            if prior is None: return
+            prior["misses"] = prior.get("misses", 0) + 1
+            if prior["misses"] == MAX_NARROWED_MISSES: log.info("Detector prior %s missed %s times, widening search.", key, MAX_NARROWED_MISSES)
+            self._dirty = True
+
+    def clear(self):
+        with self._lock:
+            self._priors = {}; self._loaded = True; self._dirty = True
+
+    def save(self):
+        """Writes the priors to disk if anything changed since the last save."""
+        with self._lock:
+            if not self._dirty: return
+            try:
+                os.makedirs(os.path.dirname(self.filepath) or ".", exist_ok=True)
+                tmp_path = self.filepath + ".tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(self._priors, f, indent=1)
+                os.replace(tmp_path, self.filepath) # Atomic, so a crash never leaves half a file
+                self._dirty = False
+            except (IOError, OSError) as e:
+                log.error("Error saving detector priors to %s: %s", self.filepath, e)
+
+    def _ensure_loaded(self):
+        """Loads the priors file on first use (caller must hold the lock)."""
+        if self._loaded: return
+        self._loaded = True
+        if not os.path.exists(self.filepath): return
+        try:
+            with open(self.filepath, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if isinstance(data, dict): self._priors = data
+        except (IOError, json.JSONDecodeError) as e:
+            log.warning("Warning: Could not load detector priors from %s: %s. Starting cold.", self.filepath, e)
+
+
+# Shared store used by object_detector
+detector_priors = DetectorPriors()
@@ -4,6 +4,9 @@ import psutil
 import sys
 import platform
 from typing import Optional, Tuple, List # Added List
+from core.log import get_logger
+
+log = get_logger(__name__)
 
 # Import Windows-specific modules conditionally
 if platform.system() == "Windows":
@@ -14,7 +17,7 @@ if platform.system() == "Windows":
         import win32con
         # import pythoncom
     except ImportError:
-        print("Warning: pywin32 library not found. Windows-specific features will be disabled.")
+        log.warning("Warning: pywin32 library not found. Windows-specific features will be disabled.")
         win32process = None; win32gui = None; win32api = None; win32con = None
 else:
     win32process = None; win32gui = None; win32api = None; win32con = None
@@ -33,7 +36,7 @@ def get_running_processes():
                     if '\\' in name or '/' in name: name = name.split('\\')[-1].split('/')[-1]
                     processes.append((name, pinfo['pid']))
             except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess): continue
-    except Exception as e: print(f"Error getting process list: {e}"); return []
+    except Exception as e: log.error("Error getting process list: %s", e); return []
     processes.sort(key=lambda x: x[0].lower()); return processes
 
 def get_process_name_from_hwnd(hwnd):
@@ -57,7 +60,7 @@ def get_foreground_window_info():
         if not hwnd: return {"hwnd": None, "pid": None, "process_name": None}
         _, pid = win32process.GetWindowThreadProcessId(hwnd); process_name = get_process_name_from_hwnd(hwnd)
         return {"hwnd": hwnd, "pid": pid, "process_name": process_name}
-    except Exception as e: print(f"Error getting foreground window info: {e}"); return {"hwnd": None, "pid": None, "process_name": None}
+    except Exception as e: log.error("Error getting foreground window info: %s", e); return {"hwnd": None, "pid": None, "process_name": None}
 
 def is_target_active(target_process_name):
     if not target_process_name or platform.system() != "Windows" or not win32gui: return not bool(target_process_name)
@@ -67,7 +70,7 @@ def is_target_active(target_process_name):
 def get_window_under_cursor():
     if platform.system() != "Windows" or not win32gui: return None
     try: return win32gui.WindowFromPoint(win32gui.GetCursorPos())
-    except Exception as e: print(f"Error getting window under cursor: {e}"); return None
+    except Exception as e: log.error("Error getting window under cursor: %s", e); return None
 
 
 # --- REVISED Function ---
@@ -98,15 +101,15 @@ def find_window_for_process(target_process_name: str) -> Optional[Tuple[int, Tup
             rect = win32gui.GetWindowRect(hwnd)
             # Basic sanity check on rect size
             if rect[2] > rect[0] and rect[3] > rect[1]:
-                print(f"Target process '{target_process_name}' is the foreground window. Using HWND: {hwnd}, Rect: {rect}")
+                log.debug("Target process '%s' is the foreground window. Using HWND: %s, Rect: %s", target_process_name, hwnd, rect)
                 return hwnd, rect
             else:
-                 print(f"Foreground window matched process, but rect {rect} seems invalid. Continuing search.")
+                 log.debug("Foreground window matched process, but rect %s seems invalid. Continuing search.", rect)
         else:
-            print(f"Foreground window ({fg_info.get('process_name', 'N/A')}) does not match target '{target_process_name}'. Searching all windows.")
+            log.debug("Foreground window (%s) does not match target '%s'. Searching all windows.", fg_info.get('process_name', 'N/A'), target_process_name)
 
     except Exception as e:
-        print(f"Error checking foreground window: {e}. Searching all windows.")
+        log.error("Error checking foreground window: %s. Searching all windows.", e)
 
 
     # 2. If foreground doesn't match, find all PIDs for the process name
@@ -123,17 +126,17 @@ def find_window_for_process(target_process_name: str) -> Optional[Tuple[int, Tup
             except (psutil.NoSuchProcess, psutil.AccessDenied, psutil.ZombieProcess):
                 continue
     except Exception as e:
-         print(f"Error finding PIDs for {target_process_name}: {e}")
+         log.error("Error finding PIDs for %s: %s", target_process_name, e)
          # Continue without PIDs? Might lead to incorrect matches if EnumWindows callback doesn't check process name.
          # Let's return None if we can't even find PIDs.
          return None, None
 
 
     if not target_pids:
-        print(f"Could not find any running process with name '{target_process_name}'")
+        log.info("Could not find any running process with name '%s'", target_process_name)
         return None, None
 
-    print(f"Found PIDs for '{target_process_name}': {target_pids}. Enumerating windows...")
+    log.debug("Found PIDs for '%s': %s. Enumerating windows...", target_process_name, target_pids)
 
     # 3. Enumerate windows and find the best match for the PIDs
     windows_found = [] # Store potential matches (hwnd, rect, area)
@@ -155,7 +158,7 @@ def find_window_for_process(target_process_name: str) -> Optional[Tuple[int, Tup
                 # Basic check for valid rect (non-zero size)
                 if rect[2] > rect[0] and rect[3] > rect[1]:
                     area = (rect[2] - rect[0]) * (rect[3] - rect[1])
-                    print(f"  Found potential window HWND: {hwnd}, PID: {pid}, Rect: {rect}, Area: {area}")
+                    log.debug("  Found potential window HWND: %s, PID: %s, Rect: %s, Area: %s", hwnd, pid, rect, area)
                     windows_found.append((hwnd, rect, area))
                 # else:
                 #     print(f"  Skipping HWND {hwnd} (PID {pid}) due to invalid rect: {rect}")
@@ -167,17 +170,17 @@ def find_window_for_process(target_process_name: str) -> Optional[Tuple[int, Tup
     try:
         win32gui.EnumWindows(enum_windows_callback, None)
     except Exception as e:
-        print(f"Error during EnumWindows: {e}")
+        log.error("Error during EnumWindows: %s", e)
         # Continue with any windows found before the error
 
     # 4. Select the best match from the enumerated windows
     if not windows_found:
-        print(f"Could not find any suitable visible window for PIDs {target_pids}")
+        log.info("Could not find any suitable visible window for PIDs %s", target_pids)
         return None, None
 
     # Strategy: Choose the largest window among the matches
     windows_found.sort(key=lambda x: x[2], reverse=True) # Sort by area descending
     best_hwnd, best_rect, best_area = windows_found[0]
 
-    print(f"Selected best match: HWND {best_hwnd}, Rect {best_rect}, Area {best_area}")
+    log.debug("Selected best match: HWND %s, Rect %s, Area %s", best_hwnd, best_rect, best_area)
     return best_hwnd, best_rect
\ No newline at end of file
@@ -0,0 +1,23 @@
+# tests/test_capture_planner.py
+
+import numpy as np
+
+from vision.capture_planner import plan_rects, CapturePlan
+from vision.frame import Frame
+
+
+def test_nearby_regions_are_merged_and_distant_ones_kept_apart():
+    assert plan_rects([(0, 0, 100, 100), (90, 0, 100, 100)]) == [(0, 0, 190, 100)]
+    assert plan_rects([(0, 0, 100, 100), (1000, 800, 100, 100)]) == [(0, 0, 100, 100), (1000, 800, 100, 100)]
+    assert plan_rects([(0, 0, 10, 10), (500, 0, 10, 10), (0, 300, 10, 10)]) == [(500, 0, 10, 10), (0, 0, 10, 310)] # At most two captures, cheapest union first
+    assert plan_rects([(0, 0, 10, 10), None]) == [None]
+
+
+def test_plan_serves_views_of_its_captures():
+    rects = plan_rects([(0, 0, 100, 100), (90, 0, 100, 100)])
+    frame = Frame(np.zeros((100, 190, 4), np.uint8), (0, 0))
+    plan = CapturePlan([(rects[0], frame)])
+    view = plan.frame_for((90, 0, 100, 100))
+    assert view.bounds == (90, 0, 100, 100) and np.shares_memory(view.raw, frame.raw)
+    assert plan.frame_for((150, 50, 100, 100)) is None # Not covered: the action captures on its own
+    assert plan.frame_for(None) is None
@@ -0,0 +1,29 @@
+# tests/test_cli.py
+
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def _run_python(code: str) -> subprocess.CompletedProcess:
+    """Runs `code` in a fresh interpreter where pyautogui cannot be imported (as on a headless machine)."""
+    prelude = "import sys; sys.modules['pyautogui'] = None\n"
+    env = dict(os.environ); env.pop("DISPLAY", None)
+    return subprocess.run([sys.executable, "-c", prelude + code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+
+
+def test_cli_imports_without_pyautogui_or_qt():
+    result = _run_python(
+        "import core.cli\n"
+        "assert 'automation.mouse_control' not in sys.modules\n"
+        "assert not any(name.startswith('PyQt6') for name in sys.modules)\n"
+    )
+    assert result.returncode == 0, result.stderr
+
+
+def test_cli_help_without_pyautogui():
+    result = _run_python("from core.cli import main\ntry: main(['--help'])\nexcept SystemExit as e: sys.exit(e.code)\n")
+    assert result.returncode == 0, result.stderr
+    assert "--source" in result.stdout
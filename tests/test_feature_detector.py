@@ -0,0 +1,41 @@
+# tests/test_feature_detector.py
+
+import cv2
+import numpy as np
+import pytest
+
+from vision import feature_detector
+from vision.frame import Frame
+
+
+def _textured(seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    image = np.full((110, 160, 3), rng.integers(0, 255, 3), np.uint8)
+    for _ in range(12):
+        cv2.rectangle(image, tuple(int(v) for v in rng.integers(0, 160, 2)), tuple(int(v) for v in rng.integers(0, 110, 2)), tuple(int(v) for v in rng.integers(0, 255, 3)), -1)
+    cv2.putText(image, f"OK{seed}", (10, 70), cv2.FONT_HERSHEY_SIMPLEX, 1.2, (255, 255, 255), 3)
+    return image
+
+
+def _screen_with(template: np.ndarray, angle: float, scale: float, seed: int) -> Frame:
+    rng = np.random.default_rng(seed)
+    screen = cv2.GaussianBlur((rng.random((600, 900, 3)) * 255).astype(np.uint8), (7, 7), 0)
+    warp = cv2.getRotationMatrix2D((80, 55), angle, scale); warp[:, 2] += (400, 250)
+    screen = cv2.warpAffine(template, warp, (900, 600), dst=screen, borderMode=cv2.BORDER_TRANSPARENT)
+    noisy = np.clip(screen.astype(np.int16) + rng.normal(0, 6, screen.shape).astype(np.int16), 0, 255).astype(np.uint8)
+    return Frame(cv2.cvtColor(noisy, cv2.COLOR_BGR2BGRA))
+
+
+@pytest.mark.parametrize("angle,scale", [(0, 1.0), (10, 0.8), (25, 1.3), (45, 1.0)])
+def test_rotated_hits_pass_the_template_matching_default_threshold(tmp_path, angle, scale):
+    template = _textured(5); path = str(tmp_path / "t.png"); cv2.imwrite(path, template)
+    match = feature_detector.find_template(path, threshold=0.8, frame=_screen_with(template, angle, scale, seed=1))
+    assert match is not None
+    (x, y, w, h, confidence) = match
+    assert 0.8 <= confidence <= 1.0
+    assert x <= 400 + 80 <= x + w and y <= 250 + 55 <= y + h # The box covers the rotation center
+
+
+def test_absent_template_is_not_found(tmp_path):
+    path = str(tmp_path / "other.png"); cv2.imwrite(path, _textured(9))
+    assert feature_detector.find_template(path, threshold=0.8, frame=_screen_with(_textured(5), 10, 1.0, seed=2)) is None
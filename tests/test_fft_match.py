@@ -0,0 +1,48 @@
+# tests/test_fft_match.py
+#
+# Frequency-domain TM_CCOEFF_NORMED against cv2.matchTemplate, and the cost
+# model behind fft_mode="auto".
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_haystack, make_template
+from vision.fft_match import FFTHaystack, TemplateSpectrumCache, match_ccoeff_normed, prefer_fft
+
+TEMPLATE = (120, 80)
+
+
+@pytest.mark.parametrize("color", [False, True])
+def test_fft_result_map_matches_opencv(color):
+    haystack = make_haystack(640, 360, seed=3, color=True); template = make_template(*TEMPLATE, seed=4, color=True)
+    if not color:
+        haystack = cv2.cvtColor(haystack, cv2.COLOR_BGR2GRAY); template = cv2.cvtColor(template, cv2.COLOR_BGR2GRAY)
+    fft_haystack = FFTHaystack(haystack)
+    spectra, norm = TemplateSpectrumCache().get(("t",), template, fft_haystack.size)
+    expected = cv2.matchTemplate(haystack, template, cv2.TM_CCOEFF_NORMED)
+    assert np.abs(match_ccoeff_normed(fft_haystack, template, spectra, norm) - expected).max() < 1e-3
+
+
+def test_spectra_that_do_not_fit_the_cache_are_charged_per_search():
+    sizes = [TEMPLATE] * 7
+    assert prefer_fft(1920, 1080, template_sizes=sizes, cache_bytes=1 << 40)
+    assert not prefer_fft(1920, 1080, template_sizes=sizes, cache_bytes=0)
+
+
+def test_4k_grayscale_stays_spatial():
+    # Seven 4K spectra (~35 MB each) overflow the default cache: every search would re-transform its template
+    for n in (1, 3, 7):
+        assert not prefer_fft(3840, 2160, template_sizes=[TEMPLATE] * n, variants=7)
+
+
+def test_color_prefers_fft():
+    # matchTemplate's multi-channel path costs more than twice the grayscale one per channel
+    for (w, h) in [(1920, 1080), (3840, 2160)]:
+        assert prefer_fft(w, h, template_sizes=[TEMPLATE], channels=3)
+
+
+def test_large_templates_shrink_the_frequency_domain_cost():
+    small = [(8, 8)] * 3; large = [(1200, 700)] * 3
+    assert not prefer_fft(1920, 1080, template_sizes=small, frame_ready=True, cache_bytes=0)
+    assert prefer_fft(1920, 1080, template_sizes=large, frame_ready=True, cache_bytes=0)
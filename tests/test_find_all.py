@@ -0,0 +1,48 @@
+# tests/test_find_all.py
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_haystack, make_template, embed
+from vision import object_detector
+from vision.frame import Frame
+
+COPIES = [(40, 300), (500, 60), (260, 180), (520, 330)]
+
+
+def test_nms_keeps_the_best_of_overlapping_boxes():
+    candidates = np.array([
+        [10, 10, 50, 50, 0.90],
+        [12, 11, 50, 50, 0.95], # Overlaps the first one almost entirely
+        [200, 10, 50, 50, 0.85],
+        [45, 10, 50, 50, 0.80], # IoU 0.2 with the best one
+    ])
+    kept = object_detector._non_max_suppression(candidates, 0.3)
+    assert kept[:, 4].tolist() == [0.95, 0.85, 0.80]
+    assert object_detector._non_max_suppression(candidates, 0.1)[:, 4].tolist() == [0.95, 0.85]
+    assert object_detector._non_max_suppression(np.empty((0, 5)), 0.3).shape == (0, 5)
+
+
+@pytest.fixture
+def screen(tmp_path):
+    haystack = make_haystack(640, 400, seed=11, color=True); template = make_template(60, 40, seed=12, color=True)
+    for (x, y) in COPIES: embed(haystack, template, x, y)
+    path = str(tmp_path / "item.png"); cv2.imwrite(path, template)
+    return Frame(cv2.cvtColor(haystack, cv2.COLOR_BGR2BGRA), (100, 50)), path
+
+
+def test_find_all_returns_every_copy_once(screen):
+    frame, path = screen
+    matches = object_detector.find_all(path, frame=frame, threshold=0.8, sort_by="top_to_bottom", use_detection_cache=False)
+    # One box per copy across all scales, in screen coordinates, rows first
+    assert [(x, y) for x, y, *_ in matches] == [(600, 110), (360, 230), (140, 350), (620, 380)]
+    assert all((w, h) == (60, 40) and conf > 0.99 for *_, w, h, conf in matches)
+
+
+def test_find_all_sorting_and_limit(screen):
+    frame, path = screen
+    by_column = object_detector.find_all(path, frame=frame, threshold=0.8, sort_by="left_to_right", use_detection_cache=False)
+    assert [x for x, *_ in by_column] == [140, 360, 600, 620]
+    assert len(object_detector.find_all(path, frame=frame, threshold=0.8, max_results=2, use_detection_cache=False)) == 2
+    assert object_detector.find_all(path, frame=frame, sort_by="diagonal") == []
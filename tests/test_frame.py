@@ -0,0 +1,38 @@
+# tests/test_frame.py
+
+import gc
+
+import cv2
+import numpy as np
+
+from vision.frame import Frame, BufferPool
+
+
+def _raw(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).integers(0, 256, (48, 64, 4), dtype=np.uint8)
+
+
+def test_dropped_frame_buffers_are_reused():
+    pool = BufferPool()
+    frame = Frame(_raw(1), pool=pool); frame.gray
+    del frame; gc.collect()
+    assert pool.stats()["free"] == 1
+    second = Frame(_raw(2), pool=pool)
+    assert np.array_equal(second.gray, cv2.cvtColor(second.raw, cv2.COLOR_BGRA2GRAY)) # Recycled buffer, fresh content
+    assert pool.stats()["reused"] == 1
+
+
+def test_buffers_still_referenced_stay_out_of_the_pool():
+    pool = BufferPool()
+    frame = Frame(_raw(1), pool=pool); kept = frame.gray; expected = kept.copy()
+    del frame; gc.collect()
+    assert pool.stats()["free"] == 0
+    Frame(_raw(2), pool=pool).gray # Gets a new buffer, so `kept` is not overwritten
+    assert np.array_equal(kept, expected)
+
+
+def test_views_share_the_raw_buffer_and_screen_coordinates():
+    frame = Frame(_raw(3), (100, 200))
+    view = frame.screen_view((110, 210, 20, 10))
+    assert view.bounds == (110, 210, 20, 10) and np.shares_memory(view.raw, frame.raw)
+    assert frame.screen_view((90, 210, 20, 10)) is None # Not inside the frame
@@ -0,0 +1,65 @@
+# tests/test_incremental_search.py
+#
+# The shortcuts of find_template (change gating, dirty-tile correlation
+# updates, tracking) against the exhaustive search, frame by frame while a
+# polled screen changes.
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_haystack, make_template, embed
+from vision import object_detector
+from vision.frame import Frame
+
+EXHAUSTIVE = dict(use_tracking=False, use_change_gating=False, use_dirty_tiles=False, use_detection_cache=False, early_exit_confidence=None, fft_mode="never", workers=1)
+
+
+def _screens():
+    """A polled 640x400 screen: a spinner ticks while the template stays, repeats a frame, moves, disappears and returns."""
+    background = make_haystack(640, 400, seed=21, color=True); template = make_template(60, 40, seed=22, color=True)
+    spinner = [make_haystack(24, 24, seed=30 + i, color=True) for i in range(3)]
+    ticks = [0, 1, 1, 2, 0, 1, 2] # Frames 1 and 2 are identical
+    positions = [(100, 80), (100, 80), (100, 80), (106, 84), (300, 200), None, (480, 300)]
+    screens = []
+    for tick, position in zip(ticks, positions):
+        screen = background.copy(); screen[360:384, 600:624] = spinner[tick]
+        if position is not None: embed(screen, template, *position)
+        screens.append(screen)
+    return screens, template
+
+
+@pytest.fixture
+def polled(tmp_path):
+    screens, template = _screens()
+    path = str(tmp_path / "target.png"); cv2.imwrite(path, template)
+    return [Frame(cv2.cvtColor(screen, cv2.COLOR_BGR2BGRA), (0, 0)) for screen in screens], path
+
+
+def _assert_same(result, expected):
+    if expected is None:
+        assert result is None
+    else:
+        assert result is not None and result[:4] == expected[:4] and result[4] == pytest.approx(expected[4], abs=1e-4)
+
+
+def test_gated_and_incremental_searches_equal_the_exhaustive_search(polled):
+    frames, path = polled
+    gating_before = object_detector.get_change_gating_stats(); tiles_before = object_detector.get_dirty_tile_stats()
+    for frame in frames:
+        expected = object_detector.find_template(path, frame=frame, **EXHAUSTIVE)
+        options = dict(EXHAUSTIVE, use_change_gating=True, use_dirty_tiles=True)
+        _assert_same(object_detector.find_template(path, frame=frame, **options), expected)
+    gating = object_detector.get_change_gating_stats(); tiles = object_detector.get_dirty_tile_stats()
+    assert gating["skipped"] > gating_before["skipped"] # The repeated frame was not searched again
+    assert tiles["partial"] > tiles_before["partial"] # Later frames updated their maps in the dirty tiles only
+
+
+def test_tracked_search_equals_the_full_search(polled):
+    frames, path = polled
+    tracked = 0
+    for frame in frames:
+        expected = object_detector.find_template(path, frame=frame, **EXHAUSTIVE)
+        _assert_same(object_detector.find_template(path, frame=frame, use_tracking=True, use_change_gating=False, use_dirty_tiles=False, use_detection_cache=False), expected)
+        tracked += object_detector.get_last_search_stats().get("stop_reason") == "tracked"
+    assert tracked >= 2 # The still and slightly moved frames were answered near the last match
@@ -0,0 +1,28 @@
+# tests/test_log.py
+
+import logging
+
+from core.log import RingBufferHandler
+
+
+def _logger(handler: RingBufferHandler) -> logging.Logger:
+    logger = logging.getLogger("autoclicker.tests.ring"); logger.propagate = False
+    logger.handlers[:] = [handler]; logger.setLevel(logging.DEBUG)
+    return logger
+
+
+def test_ring_buffer_keeps_arguments_as_they_were_when_logged():
+    handler = RingBufferHandler(capacity=10); log = _logger(handler)
+    loop_stack = [(2, 1)]
+    log.info("Loop stack: %s", loop_stack)
+    loop_stack.append((5, 3))
+    _, lines = handler.lines_since(0)
+    assert lines[0].endswith("Loop stack: [(2, 1)]")
+
+
+def test_ring_buffer_returns_only_new_lines_up_to_capacity():
+    handler = RingBufferHandler(capacity=3); log = _logger(handler)
+    for i in range(5): log.warning("line %d", i)
+    latest, lines = handler.lines_since(0)
+    assert latest == 5 and [line.split()[-1] for line in lines] == ["2", "3", "4"]
+    assert handler.lines_since(latest) == (5, [])
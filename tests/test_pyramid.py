@@ -0,0 +1,38 @@
+# tests/test_pyramid.py
+#
+# Coarse-to-fine search against the exhaustive one on screens with look-alike
+# distractors (which score alike once downsampled).
+
+import cv2
+import numpy as np
+import pytest
+
+from benchmarks.synthetic import make_haystack, make_template, embed, add_noise, add_distractors
+from vision import object_detector
+from vision.frame import Frame
+
+TEMPLATE_SIZES = [(40, 24), (80, 50), (120, 80), (60, 40)]
+SEARCH = dict(threshold=0.7, use_grayscale=True, use_tracking=False, use_change_gating=False, use_detection_cache=False, use_dirty_tiles=False)
+
+
+def _case(seed: int, tmp_path):
+    rng = np.random.default_rng(seed)
+    (tw, th) = TEMPLATE_SIZES[seed % len(TEMPLATE_SIZES)]
+    haystack = make_haystack(1920, 1080, seed=seed, color=True)
+    template = make_template(tw, th, seed=100 + seed, color=True)
+    expected = embed(haystack, template, int(rng.integers(0, 1920 - tw)), int(rng.integers(0, 1080 - th)), 1.0)
+    add_distractors(haystack, template, 6, expected, seed=seed)
+    add_noise(haystack, 6.0, seed=seed)
+    path = str(tmp_path / f"template_{seed}.png"); cv2.imwrite(path, template)
+    return Frame(cv2.cvtColor(haystack, cv2.COLOR_BGR2BGRA)), path
+
+
+@pytest.mark.parametrize("levels", [1, 2])
+@pytest.mark.parametrize("seed", [1, 2, 4, 5, 9, 14, 20, 22])
+def test_pyramid_stays_within_tolerance_of_exhaustive_search(tmp_path, seed, levels):
+    frame, path = _case(seed, tmp_path)
+    exhaustive = object_detector.find_template(path, frame=frame, **SEARCH)
+    pyramid = object_detector.find_template(path, frame=frame, use_pyramid=True, pyramid_levels=levels, **SEARCH)
+    assert exhaustive is not None and pyramid is not None
+    assert pyramid[:4] == exhaustive[:4]
+    assert pyramid[4] >= exhaustive[4] - object_detector.PYRAMID_TOLERANCE
@@ -0,0 +1,72 @@
+# tests/test_replay.py
+#
+# Scenarios replayed against recorded PNG frames: headless, no input sent.
+
+import json
+import os
+import subprocess
+import sys
+
+import cv2
+import numpy as np
+import pytest
+
+from core.scenario import Scenario, Action
+from core.scenario_runner import ScenarioRunner, RUN_FINISHED
+from vision.capture_backends import create_backend
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+TEMPLATE_BOX = (220, 140, 60, 40) # x, y, w, h of the template in the recorded frame
+
+
+@pytest.fixture
+def recording(tmp_path):
+    """(frames directory, present template, absent template, scenario path)."""
+    rng = np.random.default_rng(7)
+    frame = cv2.GaussianBlur((rng.random((300, 400, 3)) * 255).astype(np.uint8), (5, 5), 0)
+    (x, y, w, h) = TEMPLATE_BOX
+    frames = tmp_path / "frames"; frames.mkdir()
+    for i in range(3): cv2.imwrite(str(frames / f"frame_{i:03d}.png"), frame)
+    present = str(tmp_path / "present.png"); cv2.imwrite(present, frame[y:y + h, x:x + w])
+    absent = str(tmp_path / "absent.png"); cv2.imwrite(absent, (rng.random((h, w, 3)) * 255).astype(np.uint8))
+
+    scenario = Scenario(scenario_name="replay", target_process_name="app")
+    scenario.add_position("corner", 5, 5)
+    scenario.actions = [
+        Action.if_object_found(present), Action.click(click_target="found_object"), Action.end_if(),
+        Action.wait(200),
+        Action.if_object_found(absent), Action.click("corner"), Action.end_if(),
+    ]
+    path = str(tmp_path / "scenario.json"); scenario.save_to_file(path)
+    return str(frames), present, absent, path
+
+
+def test_runner_replays_without_sending_input(recording):
+    frames, _, _, path = recording
+    backend = create_backend(frames, loop=True)
+    try:
+        runner = ScenarioRunner(Scenario.load_from_file(path), 2, capture_backend=backend)
+        summary = runner.run()
+    finally:
+        backend.close()
+    assert summary.status == RUN_FINISHED and not summary.errors
+    (x, y, w, h) = TEMPLATE_BOX
+    assert len(runner.replay_clicks) == 2 # Only the present template, once per repetition
+    for (cx, cy) in runner.replay_clicks:
+        assert x <= cx < x + w and y <= cy < y + h
+
+
+def test_cli_replay_without_pyautogui(recording):
+    frames, _, _, path = recording
+    code = (
+        "import sys; sys.modules['pyautogui'] = None\n"
+        "from core.cli import main\n"
+        f"code = main([{path!r}, '--source', {frames!r}, '--profile', 'turbo', '--json', '-'])\n"
+        "assert 'automation.mouse_control' not in sys.modules\n"
+        "sys.exit(code)\n"
+    )
+    env = dict(os.environ); env.pop("DISPLAY", None)
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+    summary = json.loads(result.stdout[result.stdout.index("{"):])
+    assert summary["clicks"] == 1 and summary["errors"] == []
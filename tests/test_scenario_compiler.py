@@ -0,0 +1,74 @@
+# tests/test_scenario_compiler.py
+
+import cv2
+import numpy as np
+import pytest
+
+from core.scenario import Scenario, Action, ACTION_LOOP_START
+from core.scenario_compiler import compile_scenario, ScenarioCompileError
+
+
+@pytest.fixture
+def template(tmp_path):
+    path = str(tmp_path / "button.png"); cv2.imwrite(path, np.full((10, 10, 3), 200, np.uint8))
+    return path
+
+
+def _scenario(*actions, **kwargs) -> Scenario:
+    return Scenario(actions=list(actions), **kwargs)
+
+
+def test_jump_tables_of_nested_blocks(template):
+    program = compile_scenario(_scenario(
+        Action.loop_start(3),                     # 0
+        Action.if_object_found(template),         # 1
+        Action.wait(10),                          # 2
+        Action.check_object_break_loop(template), # 3
+        Action.end_if(),                          # 4
+        Action.for_each_object(template),         # 5
+        Action.wait(10),                          # 6
+        Action.loop_end(),                        # 7
+        Action.loop_end(),                        # 8
+        Action.wait(10),                          # 9
+    ))
+    assert [a.end for a in program.actions] == [8, 4, -1, -1, 1, 7, -1, 5, 0, -1]
+    # Breaks leave the innermost open loop: a loop start's own, past its LOOP_END the enclosing one's
+    assert [a.loop_end for a in program.actions] == [8, 8, 8, 8, 8, 7, 7, 8, -1, -1]
+
+
+def test_named_positions_and_templates_are_resolved(tmp_path, template, monkeypatch):
+    scenario = _scenario(Action.click("ok"), Action.wait_for_object("button.png"), target_process_name="app.exe", filepath=str(tmp_path / "s.json"))
+    scenario.add_position("ok", 12, 34)
+    monkeypatch.chdir(tmp_path.parent) # Not found relative to the working directory, only next to the scenario
+    program = compile_scenario(scenario)
+    assert program.actions[0].position == (12, 34)
+    assert program.actions[1].details["template_path"] == template
+
+
+@pytest.mark.parametrize("actions, message", [
+    ([Action.loop_start(2)], "never closed by LOOP_END"),
+    ([Action.end_if()], "no open IF block"),
+    ([Action.loop_start(2), Action.end_if(), Action.loop_end()], "innermost open block is the loop at action 1"),
+    ([Action.click("missing")], "unknown position 'missing'"),
+    ([Action.wait_for_object("no/such/file.png")], "template not found"),
+])
+def test_invalid_scenarios_are_rejected(actions, message):
+    with pytest.raises(ScenarioCompileError) as error:
+        compile_scenario(_scenario(*actions, target_process_name="app.exe"))
+    assert any(message in problem for problem in error.value.problems)
+
+
+def test_all_problems_are_reported_at_once():
+    with pytest.raises(ScenarioCompileError) as error:
+        compile_scenario(_scenario(Action.click("missing"), Action.end_if(), Action(type=ACTION_LOOP_START, details={"iterations": -1})))
+    assert len(error.value.problems) == 4 # Unknown position, stray END_IF, negative iterations, unclosed loop
+
+
+def test_compiled_details_are_read_only(template):
+    scenario = _scenario(Action.wait_for_object(template, region=[0, 0, 10, 10]))
+    program = compile_scenario(scenario)
+    with pytest.raises(TypeError):
+        program.actions[0].details["confidence"] = 0.1
+    assert program.actions[0].details["region"] == (0, 0, 10, 10)
+    scenario.actions[0].details["confidence"] = 0.1 # Editing the scenario later does not change the program
+    assert program.actions[0].details["confidence"] == 0.8
@@ -0,0 +1,81 @@
+# tests/test_scenario_runner.py
+
+import cv2
+import numpy as np
+
+from benchmarks.synthetic import make_haystack, make_template, embed
+from core.scenario import Scenario, Action
+from core.scenario_compiler import compile_scenario
+from core.scenario_runner import ScenarioRunner, RunnerCallbacks, RUN_FINISHED
+from core.log import PROFILE_NORMAL
+from vision.frame import Frame
+from vision.screen_capture import CaptureBackend
+
+
+class _SwitchingScreen(CaptureBackend):
+    """A live screen that shows `first` for the first capture and `later` afterwards."""
+
+    name = "switching"
+
+    def __init__(self, first: np.ndarray, later: np.ndarray):
+        self.images = [cv2.cvtColor(first, cv2.COLOR_BGR2BGRA), cv2.cvtColor(later, cv2.COLOR_BGR2BGRA)]
+        self.captures = 0
+
+    def capture_frame(self, region=None):
+        image = self.images[min(self.captures, 1)]; self.captures += 1
+        if region is not None:
+            (x, y, w, h) = region; image = image[y:y + h, x:x + w]
+        return Frame(image.copy(), (region[0], region[1]) if region else (0, 0))
+
+    def screen_rect(self):
+        return (0, 0, self.images[0].shape[1], self.images[0].shape[0])
+
+
+class _Detections(RunnerCallbacks):
+    def __init__(self): self.found = []
+    def object_detected_at(self, x, y, w, h, confidence, label): self.found.append((x, y, w, h))
+
+
+def test_wait_drops_cached_detection_results(tmp_path):
+    rng = np.random.default_rng(3)
+    screen = cv2.GaussianBlur((rng.random((240, 320, 3)) * 255).astype(np.uint8), (5, 5), 0)
+    template = str(tmp_path / "button.png"); cv2.imwrite(template, screen[100:140, 150:210])
+    scenario = Scenario(scenario_name="wait")
+    scenario.actions = [Action.if_object_found(template), Action.end_if(), Action.wait(50), Action.if_object_found(template), Action.end_if()]
+
+    backend = _SwitchingScreen(screen, np.zeros_like(screen)) # The button disappears during the WAIT
+    callbacks = _Detections()
+    summary = ScenarioRunner(scenario, 1, callbacks=callbacks, profile=PROFILE_NORMAL, capture_backend=backend).run()
+    assert summary.status == RUN_FINISHED
+    assert backend.captures == 2 # The second IF captured again instead of reusing the pre-wait frame
+    assert callbacks.found == [(150, 100, 60, 40)]
+
+
+def test_priors_are_opt_in_per_action(tmp_path):
+    template = str(tmp_path / "button.png"); cv2.imwrite(template, np.zeros((10, 10, 3), np.uint8))
+    scenario = Scenario(scenario_name="priors")
+    scenario.actions = [Action.if_object_found(template), Action.end_if(), Action.if_object_found(template, use_priors=True), Action.end_if()]
+    runner = ScenarioRunner(scenario, 1)
+    program = compile_scenario(scenario)
+    assert runner._detector_options(program.actions[0])["use_priors"] is False
+    assert runner._detector_options(program.actions[2])["use_priors"] is True
+
+
+class _Started(RunnerCallbacks):
+    def __init__(self): self.started = []
+    def action_started(self, index): self.started.append(index)
+
+
+def test_for_each_runs_its_block_once_per_match(tmp_path):
+    screen = make_haystack(320, 240, seed=5, color=True); item = make_template(30, 20, seed=6, color=True)
+    for (x, y) in [(20, 30), (200, 40), (120, 170)]: embed(screen, item, x, y)
+    template = str(tmp_path / "item.png"); cv2.imwrite(template, item)
+    missing = str(tmp_path / "missing.png"); cv2.imwrite(missing, make_haystack(30, 20, seed=7, color=True)) # No border, matches nothing
+    scenario = Scenario(scenario_name="for each")
+    scenario.actions = [Action.for_each_object(template), Action.wait(1), Action.loop_end(), Action.for_each_object(missing), Action.wait(1), Action.loop_end()]
+
+    callbacks = _Started()
+    summary = ScenarioRunner(scenario, 1, callbacks=callbacks, capture_backend=_SwitchingScreen(screen, screen)).run()
+    assert summary.status == RUN_FINISHED
+    assert callbacks.started.count(1) == 3
+    assert callbacks.started.count(4) == 0 # No matches: the block is skipped
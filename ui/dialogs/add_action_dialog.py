@@ -12,9 +12,12 @@ from PyQt6.QtCore import Qt
 from core.scenario import (
     Action, ACTION_TYPES, ACTION_CLICK, ACTION_WAIT, ACTION_WAIT_FOR_OBJECT,
     ACTION_IF_OBJECT_FOUND, ACTION_END_IF, CLICK_TARGET_FOUND_OBJECT,
-    ACTION_LOOP_START, ACTION_LOOP_END, ACTION_CHECK_OBJECT_BREAK_LOOP
+    ACTION_LOOP_START, ACTION_LOOP_END, ACTION_CHECK_OBJECT_BREAK_LOOP,
+    ACTION_FOR_EACH_OBJECT, FOR_EACH_SORT_ORDERS, DETECTOR_BACKENDS, DETECTOR_TEMPLATE, DETECTOR_FEATURES,
+    ACTION_IF_PIXEL_COLOR, ACTION_WAIT_FOR_PIXEL_COLOR, ACTION_FIND_COLOR
     # ACTION_WAIT_FOR_TEXT, ACTION_IF_TEXT_FOUND, CLICK_TARGET_FOUND_TEXT # Add later
 )
+from vision.pixel_color import parse_color
 
 
 class AddActionDialog(QDialog):
@@ -104,7 +107,64 @@ class AddActionDialog(QDialog):
         self.obj_region_input.setPlaceholderText(
             "Optional: x,y,w,h (e.g., 100,150,300,200)")
         find_object_layout.addRow("Search Region:", self.obj_region_input)
+        self.obj_detector_label = QLabel("Detector:")
+        self.obj_detector_combo = QComboBox()
+        self.obj_detector_combo.addItems(DETECTOR_BACKENDS)
+        self.obj_detector_combo.setToolTip("template: multi-scale template matching\nfeatures: ORB keypoints, also finds rotated/skewed objects (same confidence scale)")
+        self.obj_detector_combo.currentTextChanged.connect(self._update_detector_options)
+        find_object_layout.addRow(self.obj_detector_label, self.obj_detector_combo)
+        self.obj_pyramid_checkbox = QCheckBox("Coarse-to-fine search (faster on large regions)")
+        find_object_layout.addRow(self.obj_pyramid_checkbox)
+        self.obj_color_prefilter_checkbox = QCheckBox("Color prefilter (skip areas without the template's colors)")
+        find_object_layout.addRow(self.obj_color_prefilter_checkbox)
+        self.obj_priors_checkbox = QCheckBox("Learned priors (search where this template was found on earlier runs)")
+        self.obj_priors_checkbox.setToolTip("After a few hits, only the learned scales and area are searched; an object that appears elsewhere\nis missed until several searches in a row have failed there. Leave off for IF/loop checks that must see the whole region.")
+        find_object_layout.addRow(self.obj_priors_checkbox)
+        self.obj_sort_label = QLabel("Match Order:")
+        self.obj_sort_combo = QComboBox()
+        self.obj_sort_combo.addItems(FOR_EACH_SORT_ORDERS)
+        self.obj_sort_combo.setCurrentText("top_to_bottom")
+        find_object_layout.addRow(self.obj_sort_label, self.obj_sort_combo)
+        self.obj_max_matches_label = QLabel("Max Matches:")
+        self.obj_max_matches_spinbox = QSpinBox()
+        self.obj_max_matches_spinbox.setRange(0, 9999)
+        self.obj_max_matches_spinbox.setSpecialValueText("All")
+        find_object_layout.addRow(
+            self.obj_max_matches_label, self.obj_max_matches_spinbox)
         form_layout.addRow(self.find_object_widget)
+        # Pixel color options (IF_PIXEL_COLOR / WAIT_FOR_PIXEL_COLOR / FIND_COLOR)
+        self.pixel_color_widget = QWidget()
+        pixel_color_layout = QFormLayout(self.pixel_color_widget)
+        pixel_color_layout.setContentsMargins(0, 0, 0, 0)
+        self.pixel_position_label = QLabel("Pixel (X, Y):")
+        pixel_position_layout = QHBoxLayout()
+        self.pixel_x_spinbox = QSpinBox()
+        self.pixel_x_spinbox.setRange(0, 20000)
+        self.pixel_y_spinbox = QSpinBox()
+        self.pixel_y_spinbox.setRange(0, 20000)
+        pixel_position_layout.addWidget(self.pixel_x_spinbox)
+        pixel_position_layout.addWidget(self.pixel_y_spinbox)
+        pixel_color_layout.addRow(self.pixel_position_label, pixel_position_layout)
+        self.pixel_color_input = QLineEdit()
+        self.pixel_color_input.setPlaceholderText("R,G,B or #RRGGBB (e.g., 255,0,0)")
+        self.pixel_color_input.textChanged.connect(self._update_ok_button_state)
+        pixel_color_layout.addRow("Color:", self.pixel_color_input)
+        self.pixel_tolerance_spinbox = QSpinBox()
+        self.pixel_tolerance_spinbox.setRange(0, 255)
+        self.pixel_tolerance_spinbox.setToolTip("Maximum difference per color channel")
+        pixel_color_layout.addRow("Tolerance:", self.pixel_tolerance_spinbox)
+        self.pixel_timeout_label = QLabel("Timeout:")
+        self.pixel_timeout_spinbox = QSpinBox()
+        self.pixel_timeout_spinbox.setRange(0, 3600000)
+        self.pixel_timeout_spinbox.setValue(0)
+        self.pixel_timeout_spinbox.setSuffix(" ms (0=Infinite)")
+        pixel_color_layout.addRow(self.pixel_timeout_label, self.pixel_timeout_spinbox)
+        self.pixel_region_label = QLabel("Search Region:")
+        self.pixel_region_input = QLineEdit()
+        self.pixel_region_input.setPlaceholderText(
+            "Optional: x,y,w,h (e.g., 100,150,300,200)")
+        pixel_color_layout.addRow(self.pixel_region_label, self.pixel_region_input)
+        form_layout.addRow(self.pixel_color_widget)
         # LOOP_START options
         self.loop_start_widget = QWidget()
         loop_start_layout = QFormLayout(self.loop_start_widget)
@@ -177,13 +237,29 @@ class AddActionDialog(QDialog):
         elif action.type == ACTION_WAIT:
             self.wait_duration_spinbox.setValue(details.get("duration_ms", 1000))
 
-        elif action.type in [ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP]:
+        elif action.type in [ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP, ACTION_FOR_EACH_OBJECT]:
             self.template_path_input.setText(details.get("template_path", ""))
             self.confidence_spinbox.setValue(details.get("confidence", 0.8))
             region = details.get("region")
             self.obj_region_input.setText(",".join(map(str, region)) if region else "")
+            self.obj_pyramid_checkbox.setChecked(bool(details.get("use_pyramid", False)))
+            self.obj_detector_combo.setCurrentText(details.get("detector", DETECTOR_TEMPLATE))
+            self.obj_color_prefilter_checkbox.setChecked(bool(details.get("use_color_prefilter", False)))
+            self.obj_priors_checkbox.setChecked(bool(details.get("use_priors", False)))
             if action.type == ACTION_WAIT_FOR_OBJECT:
                 self.obj_timeout_spinbox.setValue(details.get("timeout_ms", 0))
+            if action.type == ACTION_FOR_EACH_OBJECT:
+                self.obj_sort_combo.setCurrentText(details.get("sort_by", "top_to_bottom"))
+                self.obj_max_matches_spinbox.setValue(details.get("max_matches", 0))
+
+        elif action.type in [ACTION_IF_PIXEL_COLOR, ACTION_WAIT_FOR_PIXEL_COLOR, ACTION_FIND_COLOR]:
+            self.pixel_x_spinbox.setValue(details.get("x", 0))
+            self.pixel_y_spinbox.setValue(details.get("y", 0))
+            self.pixel_color_input.setText(",".join(map(str, details.get("color", []))))
+            self.pixel_tolerance_spinbox.setValue(details.get("tolerance", 0))
+            self.pixel_timeout_spinbox.setValue(details.get("timeout_ms") or 0)
+            region = details.get("region")
+            self.pixel_region_input.setText(",".join(map(str, region)) if region else "")
 
         elif action.type == ACTION_LOOP_START:
             self.loop_iterations_spinbox.setValue(details.get("iterations", 1))
@@ -229,7 +305,11 @@ class AddActionDialog(QDialog):
         is_wait_obj = selected_type == ACTION_WAIT_FOR_OBJECT
         is_if_obj = selected_type == ACTION_IF_OBJECT_FOUND
         is_check_break = selected_type == ACTION_CHECK_OBJECT_BREAK_LOOP
-        is_find_obj = is_wait_obj or is_if_obj or is_check_break
+        is_for_each = selected_type == ACTION_FOR_EACH_OBJECT
+        is_find_obj = is_wait_obj or is_if_obj or is_check_break or is_for_each
+        is_wait_pixel = selected_type == ACTION_WAIT_FOR_PIXEL_COLOR
+        is_find_color = selected_type == ACTION_FIND_COLOR
+        is_pixel_color = selected_type == ACTION_IF_PIXEL_COLOR or is_wait_pixel or is_find_color
         is_loop_start = selected_type == ACTION_LOOP_START
         is_end_if = selected_type == ACTION_END_IF
         is_loop_end = selected_type == ACTION_LOOP_END
@@ -238,6 +318,7 @@ class AddActionDialog(QDialog):
         self.click_options_widget.setVisible(is_click)
         self.wait_options_widget.setVisible(is_wait)
         self.find_object_widget.setVisible(is_find_obj)
+        self.pixel_color_widget.setVisible(is_pixel_color)
         self.loop_start_widget.setVisible(is_loop_start)
         self.end_block_widget.setVisible(is_end_block)
 
@@ -245,6 +326,27 @@ class AddActionDialog(QDialog):
         self.obj_timeout_label.setVisible(is_wait_obj)
         self.obj_timeout_spinbox.setVisible(is_wait_obj)
 
+        # Show/hide match order/limit, detector and pyramid option (find_all is template matching only)
+        self.obj_sort_label.setVisible(is_for_each)
+        self.obj_sort_combo.setVisible(is_for_each)
+        self.obj_max_matches_label.setVisible(is_for_each)
+        self.obj_max_matches_spinbox.setVisible(is_for_each)
+        self.obj_detector_label.setVisible(not is_for_each)
+        self.obj_detector_combo.setVisible(not is_for_each)
+        self.obj_pyramid_checkbox.setVisible(not is_for_each)
+        self.obj_color_prefilter_checkbox.setVisible(not is_for_each)
+        self.obj_priors_checkbox.setVisible(not is_for_each)
+        self._update_detector_options()
+
+        # Pixel actions check one position; FIND_COLOR searches a region instead
+        self.pixel_position_label.setVisible(not is_find_color)
+        self.pixel_x_spinbox.setVisible(not is_find_color)
+        self.pixel_y_spinbox.setVisible(not is_find_color)
+        self.pixel_region_label.setVisible(is_find_color)
+        self.pixel_region_input.setVisible(is_find_color)
+        self.pixel_timeout_label.setVisible(is_wait_pixel)
+        self.pixel_timeout_spinbox.setVisible(is_wait_pixel)
+
         # Show/hide break condition only for LOOP_END
         self.loop_break_condition_label.setVisible(is_loop_end)
         self.loop_break_condition_combo.setVisible(is_loop_end)
@@ -266,6 +368,13 @@ class AddActionDialog(QDialog):
             self.template_path_input.textChanged.connect(
                 self._update_ok_button_state)
 
+    def _update_detector_options(self):
+        # Coarse-to-fine search, the color prefilter and priors only apply to template matching
+        is_template = self.obj_detector_combo.currentText() != DETECTOR_FEATURES
+        self.obj_pyramid_checkbox.setEnabled(is_template)
+        self.obj_color_prefilter_checkbox.setEnabled(is_template)
+        self.obj_priors_checkbox.setEnabled(is_template)
+
     def _update_ok_button_state(self):
         ok_button = self.button_box.button(QDialogButtonBox.StandardButton.Ok)
         if not ok_button:
@@ -276,8 +385,10 @@ class AddActionDialog(QDialog):
             is_pos_target = self.click_target_combo.currentText() == "Position"
             if is_pos_target and not self.available_positions:
                 can_accept = False
-        elif selected_type in [ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP]:
+        elif selected_type in [ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP, ACTION_FOR_EACH_OBJECT]:
             can_accept = bool(self.template_path_input.text())
+        elif selected_type in [ACTION_IF_PIXEL_COLOR, ACTION_WAIT_FOR_PIXEL_COLOR, ACTION_FIND_COLOR]:
+            can_accept = bool(self.pixel_color_input.text().strip())
         elif selected_type in [ACTION_WAIT, ACTION_END_IF, ACTION_LOOP_START, ACTION_LOOP_END]:
             pass
         else:
@@ -305,7 +416,7 @@ class AddActionDialog(QDialog):
                     raise ValueError(
                         f"Template image path invalid or not found: '{template}'")
                 self.action_data = Action.wait_for_object(template_path=template, confidence=self.confidence_spinbox.value(
-                ), region=region, timeout_ms=timeout if timeout > 0 else None)
+                ), region=region, timeout_ms=timeout if timeout > 0 else None, use_pyramid=self.obj_pyramid_checkbox.isChecked(), detector=self.obj_detector_combo.currentText(), use_color_prefilter=self.obj_color_prefilter_checkbox.isChecked(), use_priors=self.obj_priors_checkbox.isChecked())
             elif selected_type == ACTION_IF_OBJECT_FOUND:
                 template = self.template_path_input.text().strip()
                 region = self._parse_region(self.obj_region_input.text())
@@ -313,7 +424,7 @@ class AddActionDialog(QDialog):
                     raise ValueError(
                         f"Template image path invalid or not found: '{template}'")
                 self.action_data = Action.if_object_found(
-                    template_path=template, confidence=self.confidence_spinbox.value(), region=region)
+                    template_path=template, confidence=self.confidence_spinbox.value(), region=region, use_pyramid=self.obj_pyramid_checkbox.isChecked(), detector=self.obj_detector_combo.currentText(), use_color_prefilter=self.obj_color_prefilter_checkbox.isChecked(), use_priors=self.obj_priors_checkbox.isChecked())
             elif selected_type == ACTION_CHECK_OBJECT_BREAK_LOOP:
                 template = self.template_path_input.text().strip()
                 region = self._parse_region(self.obj_region_input.text())
@@ -321,7 +432,27 @@ class AddActionDialog(QDialog):
                     raise ValueError(
                         f"Template image path invalid or not found: '{template}'")
                 self.action_data = Action.check_object_break_loop(
-                    template_path=template, confidence=self.confidence_spinbox.value(), region=region)
+                    template_path=template, confidence=self.confidence_spinbox.value(), region=region, use_pyramid=self.obj_pyramid_checkbox.isChecked(), detector=self.obj_detector_combo.currentText(), use_color_prefilter=self.obj_color_prefilter_checkbox.isChecked(), use_priors=self.obj_priors_checkbox.isChecked())
+            elif selected_type == ACTION_FOR_EACH_OBJECT:
+                template = self.template_path_input.text().strip()
+                region = self._parse_region(self.obj_region_input.text())
+                if not template or not os.path.exists(template):
+                    raise ValueError(
+                        f"Template image path invalid or not found: '{template}'")
+                self.action_data = Action.for_each_object(
+                    template_path=template, confidence=self.confidence_spinbox.value(), region=region,
+                    sort_by=self.obj_sort_combo.currentText(), max_matches=self.obj_max_matches_spinbox.value())
+            elif selected_type == ACTION_IF_PIXEL_COLOR:
+                self.action_data = Action.if_pixel_color(
+                    x=self.pixel_x_spinbox.value(), y=self.pixel_y_spinbox.value(), color=parse_color(self.pixel_color_input.text()), tolerance=self.pixel_tolerance_spinbox.value())
+            elif selected_type == ACTION_WAIT_FOR_PIXEL_COLOR:
+                timeout = self.pixel_timeout_spinbox.value()
+                self.action_data = Action.wait_for_pixel_color(
+                    x=self.pixel_x_spinbox.value(), y=self.pixel_y_spinbox.value(), color=parse_color(self.pixel_color_input.text()), tolerance=self.pixel_tolerance_spinbox.value(), timeout_ms=timeout if timeout > 0 else None)
+            elif selected_type == ACTION_FIND_COLOR:
+                region = self._parse_region(self.pixel_region_input.text())
+                self.action_data = Action.find_color(
+                    color=parse_color(self.pixel_color_input.text()), region=region, tolerance=self.pixel_tolerance_spinbox.value())
             elif selected_type == ACTION_LOOP_START:
                 self.action_data = Action.loop_start(
                     iterations=self.loop_iterations_spinbox.value())
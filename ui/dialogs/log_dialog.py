@@ -0,0 +1,66 @@
+# ui/dialogs/log_dialog.py
+
+from PyQt6.QtWidgets import (
+    QDialog, QVBoxLayout, QHBoxLayout, QPlainTextEdit, QPushButton, QCheckBox,
+    QFileDialog, QMessageBox
+)
+from PyQt6.QtGui import QFont
+from PyQt6.QtCore import QTimer
+
+from core.log import ring_buffer, RING_BUFFER_SIZE, enable_file_log, disable_file_log
+
+REFRESH_INTERVAL_MS = 500
+
+
+class LogDialog(QDialog):
+    """Non-modal window showing the log ring buffer (core/log.py). Polls for new lines while visible."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Log")
+        self.resize(800, 400)
+        self._sequence = 0
+
+        layout = QVBoxLayout(self)
+        self.log_view = QPlainTextEdit(); self.log_view.setReadOnly(True)
+        self.log_view.setMaximumBlockCount(RING_BUFFER_SIZE) # Keep the view as bounded as the buffer
+        self.log_view.setFont(QFont("Consolas", 9))
+        layout.addWidget(self.log_view)
+
+        button_layout = QHBoxLayout()
+        self.file_log_checkbox = QCheckBox("Write to file...")
+        self.file_log_checkbox.setToolTip("Also write log records to a rotating file (written in the background)")
+        self.file_log_checkbox.toggled.connect(self._toggle_file_log)
+        clear_button = QPushButton("Clear"); clear_button.clicked.connect(self._clear)
+        close_button = QPushButton("Close"); close_button.clicked.connect(self.close)
+        button_layout.addWidget(self.file_log_checkbox); button_layout.addStretch()
+        button_layout.addWidget(clear_button); button_layout.addWidget(close_button)
+        layout.addLayout(button_layout)
+
+        self._timer = QTimer(self); self._timer.setInterval(REFRESH_INTERVAL_MS); self._timer.timeout.connect(self._refresh)
+
+    def showEvent(self, event):
+        self._refresh(); self._timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
+
+    def _refresh(self):
+        self._sequence, lines = ring_buffer.lines_since(self._sequence)
+        if lines: self.log_view.appendPlainText("\n".join(lines))
+
+    def _clear(self):
+        ring_buffer.clear(); self.log_view.clear()
+
+    def _toggle_file_log(self, checked: bool):
+        if not checked:
+            disable_file_log(); return
+        filepath, _ = QFileDialog.getSaveFileName(self, "Log File", "autoclicker.log", "Log Files (*.log);;All Files (*)")
+        if not filepath:
+            self.file_log_checkbox.blockSignals(True); self.file_log_checkbox.setChecked(False); self.file_log_checkbox.blockSignals(False); return
+        try: enable_file_log(filepath)
+        except OSError as e:
+            QMessageBox.warning(self, "Log File", f"Could not open log file:\n{e}")
+            self.file_log_checkbox.blockSignals(True); self.file_log_checkbox.setChecked(False); self.file_log_checkbox.blockSignals(False)
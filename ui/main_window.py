@@ -21,6 +21,7 @@ from ui.widgets.left_panel import LeftPanelWidget
 from ui.widgets.right_panel import RightPanelWidget
 # --- Import AddActionDialog ---
 from ui.dialogs.add_action_dialog import AddActionDialog
+from ui.dialogs.log_dialog import LogDialog
 # --- Import Overlay ---
 from overlay.overlay_window import OverlayWindow
 
@@ -31,7 +32,11 @@ from core.scenario import (
     Scenario, Position, Action, ACTION_TYPES, ACTION_CLICK, ACTION_WAIT,
     ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP # Import needed types
 )
-from core.scenario_runner import ScenarioRunner
+from ui.scenario_runner_thread import ScenarioRunnerThread
+from core.log import get_logger, PROFILES, DEFAULT_PROFILE
+from vision import object_detector, screen_capture
+from vision.capture_service import capture_service
+from vision.frame_recorder import DEFAULT_RECORDINGS_DIR
 
 # Import pynput/pyautogui conditionally
 try: from pynput import keyboard
@@ -45,6 +50,8 @@ ICON_START = None; ICON_STOP = None; ICON_RECORD = None
 RECORD_HOTKEY = keyboard.Key.f7 if keyboard else None
 STOP_HOTKEY = keyboard.Key.f6 if keyboard else None
 
+log = get_logger(__name__)
+
 
 class MainWindow(QMainWindow):
     """Main application window - Orchestrator."""
@@ -55,8 +62,9 @@ class MainWindow(QMainWindow):
         self.setGeometry(100, 100, 900, 700)
 
         self.current_scenario = Scenario()
-        self._scenario_runner: Optional[ScenarioRunner] = None
+        self._scenario_runner: Optional[ScenarioRunnerThread] = None
         self._stop_hotkey_listener = None
+        self._log_dialog: Optional[LogDialog] = None
 
         self._overlay_window = OverlayWindow()
         self.left_panel = LeftPanelWidget(self)
@@ -96,6 +104,28 @@ class MainWindow(QMainWindow):
         self.repetitions_spinbox.setSpecialValueText("Infinite")
         self.repetitions_spinbox.valueChanged.connect(self._update_global_repetitions)
         run_settings_layout.addWidget(self.repetitions_spinbox)
+        run_settings_layout.addSpacing(20)
+        run_settings_layout.addWidget(QLabel("Run Profile:"))
+        self.profile_combo = QComboBox()
+        self.profile_combo.addItems(PROFILES)
+        self.profile_combo.setCurrentText(DEFAULT_PROFILE)
+        self.profile_combo.setToolTip("debug: full logging incl. click traces\nnormal: progress messages\n"
+                                      "turbo: warnings only, no status/overlay updates (max. throughput)")
+        run_settings_layout.addWidget(self.profile_combo)
+        run_settings_layout.addSpacing(20)
+        run_settings_layout.addWidget(QLabel("Capture FPS:"))
+        self.capture_fps_spinbox = QSpinBox()
+        self.capture_fps_spinbox.setRange(0, 60)
+        self.capture_fps_spinbox.setValue(0)
+        self.capture_fps_spinbox.setSpecialValueText("Off")
+        self.capture_fps_spinbox.setToolTip("Capture searched regions on a background thread at this rate,\n"
+                                            "so polling actions don't wait for a fresh capture (Off = capture per action)")
+        run_settings_layout.addWidget(self.capture_fps_spinbox)
+        run_settings_layout.addSpacing(20)
+        self.record_frames_checkbox = QCheckBox("Record Frames")
+        self.record_frames_checkbox.setToolTip("Record the frames detection actions look at, with their results,\n"
+                                               f"for offline profiling and replay (saved under {DEFAULT_RECORDINGS_DIR})")
+        run_settings_layout.addWidget(self.record_frames_checkbox)
         run_settings_layout.addStretch()
 
         # --- Main Layout (Splitter + Run Settings below) ---
@@ -123,7 +153,7 @@ class MainWindow(QMainWindow):
     def _create_menu_bar(self):
         menu_bar = self.menuBar(); menu_bar.clear()
         file_menu = menu_bar.addMenu("&File"); new_action = QAction("&New Scenario", self); new_action.triggered.connect(self._new_scenario); load_action = QAction("&Load Scenario...", self); load_action.triggered.connect(self._load_scenario); save_action = QAction("&Save Scenario", self); save_action.triggered.connect(self._save_scenario); save_as_action = QAction("Save Scenario &As...", self); save_as_action.triggered.connect(self._save_scenario_as); exit_action = QAction("&Exit", self); exit_action.triggered.connect(self.close); file_menu.addAction(new_action); file_menu.addAction(load_action); file_menu.addAction(save_action); file_menu.addAction(save_as_action); file_menu.addSeparator(); file_menu.addAction(exit_action)
-        view_menu = menu_bar.addMenu("&View"); self.toggle_overlay_action = QAction("Show &Overlay", self, checkable=True); self.toggle_overlay_action.setStatusTip("Show/hide the debugging overlay"); self.toggle_overlay_action.toggled.connect(self._toggle_overlay); view_menu.addAction(self.toggle_overlay_action)
+        view_menu = menu_bar.addMenu("&View"); self.toggle_overlay_action = QAction("Show &Overlay", self, checkable=True); self.toggle_overlay_action.setStatusTip("Show/hide the debugging overlay"); self.toggle_overlay_action.toggled.connect(self._toggle_overlay); view_menu.addAction(self.toggle_overlay_action); show_log_action = QAction("Show &Log", self); show_log_action.setStatusTip("Show recent log messages"); show_log_action.triggered.connect(self._show_log); view_menu.addAction(show_log_action)
         run_menu = menu_bar.addMenu("&Run"); self.start_action = QAction("&Start Scenario", self); self.stop_action = QAction("S&top Scenario", self); self.stop_action.setEnabled(False); self.start_action.triggered.connect(self._start_scenario); self.stop_action.triggered.connect(self._stop_scenario); run_menu.addAction(self.start_action); run_menu.addAction(self.stop_action)
         help_menu = menu_bar.addMenu("&Help"); about_action = QAction("&About", self); help_menu.addAction(about_action)
 
@@ -157,12 +187,16 @@ class MainWindow(QMainWindow):
     def closeEvent(self, event):
         if self._scenario_runner and self._scenario_runner.isRunning(): self._stop_scenario()
         if self._prompt_save_if_needed():
-            self.left_panel.stop_listeners(); self._stop_global_listeners(); self._overlay_window.close(); event.accept()
+            self.left_panel.stop_listeners(); self._stop_global_listeners(); self._overlay_window.close(); object_detector.save_priors(); object_detector.shutdown_pool(); capture_service.stop(); screen_capture.close_all_sessions(); event.accept()
         else: event.ignore()
 
     @pyqtSlot(str)
     def update_status(self, message):
-        self.status_bar.showMessage(message); print(f"Status: {message}")
+        self.status_bar.showMessage(message); log.debug("Status: %s", message)
+
+    def _show_log(self):
+        if self._log_dialog is None: self._log_dialog = LogDialog(self)
+        self._log_dialog.show(); self._log_dialog.raise_(); self._log_dialog.activateWindow()
 
     @pyqtSlot(str)
     def _update_target_process(self, text):
@@ -312,7 +346,8 @@ class MainWindow(QMainWindow):
         repetitions = self.repetitions_spinbox.value()
         self._overlay_window.update_status(f"Running: {self.current_scenario.scenario_name} (Rep: 1/{'Infinite' if repetitions == 0 else repetitions})")
 
-        self._scenario_runner = ScenarioRunner(self.current_scenario, repetitions, self)
+        record_dir = os.path.join(DEFAULT_RECORDINGS_DIR, time.strftime("%Y%m%d-%H%M%S")) if self.record_frames_checkbox.isChecked() else None
+        self._scenario_runner = ScenarioRunnerThread(self.current_scenario, repetitions, self, profile=self.profile_combo.currentText(), capture_fps=self.capture_fps_spinbox.value(), record_dir=record_dir)
         # --- Connect ALL signals ---
         self._scenario_runner.status_update.connect(self._on_runner_status_update)
         self._scenario_runner.finished.connect(self._on_scenario_finished)
@@ -0,0 +1,51 @@
+# ui/scenario_runner_thread.py
+
+from PyQt6.QtCore import QThread, pyqtSignal
+
+from core.scenario import Scenario
+from core.scenario_runner import ScenarioRunner, RunnerCallbacks
+
+
+class _SignalCallbacks(RunnerCallbacks):
+    """Forwards runner events to the thread's Qt signals (queued to the GUI thread by Qt)."""
+
+    def __init__(self, thread: "ScenarioRunnerThread"):
+        self._thread = thread
+
+    def status_update(self, message: str): self._thread.status_update.emit(message)
+    def finished(self): self._thread.finished.emit()
+    def error_occurred(self, message: str): self._thread.error_occurred.emit(message)
+    def action_started(self, index: int): self._thread.action_started.emit(index)
+    def action_finished(self, index: int): self._thread.action_finished.emit(index)
+    def object_detected_at(self, x: int, y: int, w: int, h: int, confidence: float, label: str): self._thread.object_detected_at.emit(x, y, w, h, confidence, label)
+    def click_target_calculated(self, x: int, y: int): self._thread.click_target_calculated.emit(x, y)
+    def repetition_update(self, current: int, total: int): self._thread.repetition_update.emit(current, total)
+
+
+class ScenarioRunnerThread(QThread):
+    """Runs a core ScenarioRunner on a QThread and re-emits its events as signals for the GUI."""
+    # --- Signals for UI updates ---
+    status_update = pyqtSignal(str)
+    finished = pyqtSignal()
+    error_occurred = pyqtSignal(str)
+    action_started = pyqtSignal(int)
+    action_finished = pyqtSignal(int)
+    # --- Signals for Overlay ---
+    object_detected_at = pyqtSignal(int, int, int, int, float, str) # x, y, w, h, confidence, template_name
+    click_target_calculated = pyqtSignal(int, int)      # x, y (screen coords)
+    # --- Signal for Repetition Update ---
+    repetition_update = pyqtSignal(int, int) # current_rep, total_reps (0 for infinite)
+    # --- Signals for Overlay Control (Workaround) ---
+    request_hide_overlay = pyqtSignal()
+    request_show_overlay = pyqtSignal()
+
+    def __init__(self, scenario: Scenario, repetitions: int, parent=None, **runner_options):
+        """runner_options are passed to ScenarioRunner (profile, capture_fps, capture_backend, record_dir)."""
+        super().__init__(parent)
+        self.runner = ScenarioRunner(scenario, repetitions, callbacks=_SignalCallbacks(self), **runner_options)
+
+    def run(self):
+        self.runner.run()
+
+    def stop(self):
+        self.runner.stop()
@@ -92,7 +92,7 @@ class RightPanelWidget(QWidget):
         self.action_list_widget.clear()
         indent_level = 0
         # Need Action types here for indentation logic
-        from core.scenario import ACTION_IF_OBJECT_FOUND, ACTION_END_IF, ACTION_LOOP_START, ACTION_LOOP_END # Import locally
+        from core.scenario import ACTION_END_IF, ACTION_LOOP_END, IF_ACTIONS, LOOP_START_ACTIONS # Import locally
 
         for i, action in enumerate(actions):
             # Adjust indent level BEFORE processing the item for END actions
@@ -103,7 +103,7 @@ class RightPanelWidget(QWidget):
             self.action_list_widget.addItem(display_text)
 
             # Adjust indent level AFTER processing the item for START actions
-            if action.type in [ACTION_IF_OBJECT_FOUND, ACTION_LOOP_START]: # Add other IFs/Loops later
+            if action.type in IF_ACTIONS + LOOP_START_ACTIONS:
                  indent_level += 1
         self._update_move_button_state(self.action_list_widget.currentRow()) # Update buttons after list refresh
 
@@ -135,7 +135,9 @@ class RightPanelWidget(QWidget):
         from core.scenario import (
             ACTION_CLICK, ACTION_WAIT, ACTION_WAIT_FOR_OBJECT,
             ACTION_IF_OBJECT_FOUND, ACTION_END_IF, CLICK_TARGET_FOUND_OBJECT,
-            ACTION_LOOP_START, ACTION_LOOP_END, ACTION_CHECK_OBJECT_BREAK_LOOP
+            ACTION_LOOP_START, ACTION_LOOP_END, ACTION_CHECK_OBJECT_BREAK_LOOP,
+            ACTION_FOR_EACH_OBJECT, DETECTOR_FEATURES,
+            ACTION_IF_PIXEL_COLOR, ACTION_WAIT_FOR_PIXEL_COLOR, ACTION_FIND_COLOR
             # ACTION_WAIT_FOR_TEXT, ACTION_IF_TEXT_FOUND, CLICK_TARGET_FOUND_TEXT # Add later
         )
         import os
@@ -149,12 +151,29 @@ class RightPanelWidget(QWidget):
                 # elif pos == CLICK_TARGET_FOUND_TEXT: display_text += f" [Target: Found Text, Offset:({off_x},{off_y}), Btn: {btn}, Type: {clk}]" # Add later
                 else: display_text += f" [Pos: {pos}, Btn: {btn}, Type: {clk}]"
             elif action.type == ACTION_WAIT: dur = details.get('duration_ms', 'N/A'); display_text += f" [Duration: {dur} ms]"
-            elif action.type in [ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP]: # Shared display logic
+            elif action.type in [ACTION_WAIT_FOR_OBJECT, ACTION_IF_OBJECT_FOUND, ACTION_CHECK_OBJECT_BREAK_LOOP, ACTION_FOR_EACH_OBJECT]: # Shared display logic
                 tmpl = os.path.basename(details.get('template_path', 'N/A')); conf = details.get('confidence', 0.8); region = details.get('region')
                 prefix = "Break Loop If Found" if action.type == ACTION_CHECK_OBJECT_BREAK_LOOP else "Template"
+                if action.type == ACTION_FOR_EACH_OBJECT: prefix = "Each Match Of"
                 display_text += f" [{prefix}: {tmpl}, Conf: {conf:.2f}"
                 if region: display_text += f", Region: {region[0]},{region[1]},{region[2]},{region[3]}"
                 if action.type == ACTION_WAIT_FOR_OBJECT: timeout = details.get('timeout_ms', 'Infinite'); display_text += f", Timeout: {timeout}"
+                if details.get('detector') == DETECTOR_FEATURES: display_text += ", Features"
+                elif details.get('use_pyramid'): display_text += ", Pyramid"
+                if details.get('use_color_prefilter') and details.get('detector') != DETECTOR_FEATURES: display_text += ", Color Prefilter"
+                if details.get('use_priors') and details.get('detector') != DETECTOR_FEATURES: display_text += ", Priors"
+                if action.type == ACTION_FOR_EACH_OBJECT:
+                    max_matches = details.get('max_matches', 0)
+                    display_text += f", Order: {details.get('sort_by', 'top_to_bottom')}, Max: {'All' if not max_matches else max_matches}"
+                display_text += "]"
+            elif action.type in [ACTION_IF_PIXEL_COLOR, ACTION_WAIT_FOR_PIXEL_COLOR, ACTION_FIND_COLOR]:
+                color = details.get('color', []); tol = details.get('tolerance', 0)
+                display_text += f" [Color: {','.join(map(str, color))}, Tol: {tol}"
+                if action.type == ACTION_FIND_COLOR:
+                    region = details.get('region')
+                    if region: display_text += f", Region: {region[0]},{region[1]},{region[2]},{region[3]}"
+                else: display_text += f", Pixel: ({details.get('x', 0)},{details.get('y', 0)})"
+                if action.type == ACTION_WAIT_FOR_PIXEL_COLOR: timeout = details.get('timeout_ms') or 'Infinite'; display_text += f", Timeout: {timeout}"
                 display_text += "]"
             elif action.type == ACTION_LOOP_START:
                  iters = details.get('iterations', 1)
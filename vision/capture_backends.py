@@ -0,0 +1,262 @@
+# vision/capture_backends.py
+#
+# Replay capture backends: recorded screens (a directory of PNG frames or a
+# video file) served in place of the live screen, for benchmarks and headless
+# runs. Install one with screen_capture.set_backend() or pass it to the
+# ScenarioRunner (capture_backend=...).
+
+import bisect
+import glob
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple, Union
+
+import cv2
+import numpy as np
+
+from .frame import Frame
+from .screen_capture import CaptureBackend, MssBackend
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_REPLAY_FPS = 10.0 # Frame rate of PNG directories without timestamps
+MAX_DECODED_FRAMES = 8 # Decoded replay frames kept in memory
+IMAGE_EXTENSIONS = (".png", ".bmp", ".jpg", ".jpeg")
+TIMESTAMPS_FILE = "timestamps.txt" # Optional: one capture time in seconds per frame, in file order
+
+CLOCK_VIRTUAL = "virtual"
+CLOCK_WALL = "wall"
+
+
+class WallClock:
+    """Replay time follows real time, starting at the first capture (or reset())."""
+
+    virtual = False
+
+    def __init__(self):
+        self._start: Optional[float] = None
+
+    def now(self) -> float:
+        if self._start is None: self._start = time.monotonic()
+        return time.monotonic() - self._start
+
+    def reset(self):
+        self._start = None
+
+    def on_capture(self):
+        pass
+
+
+class VirtualClock:
+    """
+    Replay time that only moves when told to: the scenario runner advances it
+    by the waits and poll intervals a scenario would have slept, so a replay
+    gives the same results however fast the machine is. step_per_capture
+    additionally advances it by that much after every capture (e.g. 1 / fps to
+    show a new frame per capture).
+    """
+
+    virtual = True
+
+    def __init__(self, step_per_capture: float = 0.0):
+        self.step_per_capture = step_per_capture
+        self._now = 0.0
+        self._lock = threading.Lock()
+
+    def now(self) -> float:
+        with self._lock: return self._now
+
+    def advance(self, seconds: float):
+        if seconds > 0:
+            with self._lock: self._now = round(self._now + seconds, 6) # Microseconds: no float drift over many small steps
+
+    def reset(self):
+        with self._lock: self._now = 0.0
+
+    def on_capture(self):
+        self.advance(self.step_per_capture)
+
+
+Clock = Union[WallClock, VirtualClock]
+
+
+class ReplayBackend(CaptureBackend):
+    """
+    Base of the recorded-screen backends. Serves the recorded frame that was
+    on screen at the clock's current time; regions are cropped out of it
+    without copying (Frame.screen_view). Recorded frames are full screens with
+    their top-left pixel at (0, 0).
+
+    After the last frame the replay holds it and reports finished, unless it
+    loops. Subclasses implement _load(index) and set self.timestamps.
+    """
+
+    live = False
+
+    def __init__(self, clock: Optional[Clock] = None, loop: bool = False):
+        self.clock = clock if clock is not None else VirtualClock()
+        self.loop = loop
+        self.timestamps: List[float] = [] # Seconds from the start of the recording, ascending
+        self.frame_interval = 1.0 / DEFAULT_REPLAY_FPS
+        self.captures = 0
+        self._decoded: "OrderedDict[int, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def frame_count(self) -> int:
+        return len(self.timestamps)
+
+    @property
+    def duration(self) -> float:
+        """Recording length in seconds (the last frame stays on screen for one frame interval)."""
+        return self.timestamps[-1] + self.frame_interval if self.timestamps else 0.0
+
+    @property
+    def finished(self) -> bool:
+        return not self.loop and self.clock.now() >= self.duration
+
+    def frame_index(self) -> int:
+        """Index of the frame on screen at the clock's current time."""
+        t = self.clock.now()
+        if self.loop and self.duration > 0: t %= self.duration
+        return min(max(bisect.bisect_right(self.timestamps, t) - 1, 0), self.frame_count - 1)
+
+    def _load(self, index: int) -> Optional[np.ndarray]:
+        raise NotImplementedError
+
+    def _image(self, index: int) -> Optional[np.ndarray]:
+        with self._lock:
+            image = self._decoded.get(index)
+            if image is not None:
+                self._decoded.move_to_end(index)
+                return image
+            image = self._load(index)
+            if image is not None:
+                image.flags.writeable = False # Shared by every frame served from it
+                self._decoded[index] = image
+                while len(self._decoded) > MAX_DECODED_FRAMES: self._decoded.popitem(last=False)
+            return image
+
+    def capture_frame(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Frame]:
+        if self.frame_count == 0:
+            log.error("Error: Replay %r has no frames.", self)
+            return None
+        index = self.frame_index()
+        image = self._image(index)
+        self.clock.on_capture()
+        if image is None:
+            log.error("Error: Could not decode frame %s of %r.", index, self)
+            return None
+        self.captures += 1
+        # The frame index doubles as the frame id: captures of the same recorded frame are the same image
+        frame = Frame(image, (0, 0), frame_id=index, timestamp=time.monotonic())
+        view = frame.screen_view(region)
+        if view is None:
+            log.error("Error: Capture region %s is outside the recorded screen %s.", region, frame.bounds)
+        return view
+
+    def screen_rect(self) -> Optional[Tuple[int, int, int, int]]:
+        image = self._image(0) if self.frame_count else None
+        return (0, 0, image.shape[1], image.shape[0]) if image is not None else None
+
+    def close(self):
+        with self._lock: self._decoded.clear()
+
+
+class ImageDirectoryBackend(ReplayBackend):
+    """
+    Replays a directory of screenshots, in file name order. Frame times come
+    from a timestamps.txt next to them (one time in seconds per line) or,
+    without one, from a fixed fps.
+    """
+
+    def __init__(self, directory: str, fps: float = DEFAULT_REPLAY_FPS, clock: Optional[Clock] = None, loop: bool = False):
+        super().__init__(clock, loop)
+        self.directory = directory
+        self.name = directory
+        self.paths = sorted(p for p in glob.glob(os.path.join(directory, "*")) if p.lower().endswith(IMAGE_EXTENSIONS))
+        if not self.paths:
+            raise ValueError(f"No image frames found in '{directory}'.")
+        self.frame_interval = 1.0 / fps
+        timestamps_path = os.path.join(directory, TIMESTAMPS_FILE)
+        if os.path.exists(timestamps_path):
+            with open(timestamps_path, "r", encoding="utf-8") as f:
+                times = [float(line) for line in f if line.strip()]
+            if len(times) != len(self.paths):
+                raise ValueError(f"'{timestamps_path}' has {len(times)} entries for {len(self.paths)} frames.")
+            start = times[0]
+            self.timestamps = [t - start for t in times]
+        else:
+            self.timestamps = [i / fps for i in range(len(self.paths))]
+        log.info("Replaying %s frame(s) from '%s' (%.1fs).", len(self.paths), directory, self.duration)
+
+    def _load(self, index: int) -> Optional[np.ndarray]:
+        return cv2.imread(self.paths[index], cv2.IMREAD_UNCHANGED) # BGRA, BGR or grayscale; Frame takes all three
+
+
+class VideoFileBackend(ReplayBackend):
+    """
+    Replays a video file (anything cv2.VideoCapture reads) at its own frame
+    rate. Frames are decoded in order; going back in time seeks.
+    """
+
+    def __init__(self, path: str, clock: Optional[Clock] = None, loop: bool = False, fps: Optional[float] = None):
+        super().__init__(clock, loop)
+        self.path = path
+        self.name = path
+        self._video = cv2.VideoCapture(path)
+        if not self._video.isOpened():
+            raise ValueError(f"Could not open video '{path}'.")
+        count = int(self._video.get(cv2.CAP_PROP_FRAME_COUNT))
+        if count <= 0:
+            raise ValueError(f"Video '{path}' reports no frames.")
+        fps = fps or self._video.get(cv2.CAP_PROP_FPS) or DEFAULT_REPLAY_FPS
+        self.frame_interval = 1.0 / fps
+        self.timestamps = [i / fps for i in range(count)]
+        self._next_index = 0 # Index the next read() returns
+        log.info("Replaying %s frame(s) from '%s' at %.1f fps.", count, path, fps)
+
+    def _load(self, index: int) -> Optional[np.ndarray]:
+        if index < self._next_index or index - self._next_index > 2 * MAX_DECODED_FRAMES:
+            self._video.set(cv2.CAP_PROP_POS_FRAMES, index)
+            self._next_index = index
+        while self._next_index < index: # Skip without decoding
+            if not self._video.grab(): return None
+            self._next_index += 1
+        ok, image = self._video.read()
+        if not ok:
+            return None
+        self._next_index += 1
+        return image
+
+    def close(self):
+        super().close()
+        self._video.release()
+
+
+def create_backend(source: Optional[str] = None, clock: Union[str, Clock, None] = CLOCK_VIRTUAL, fps: Optional[float] = None, loop: bool = False, step_per_capture: float = 0.0) -> CaptureBackend:
+    """
+    Builds a backend from configuration: None or "mss" for the live screen, a
+    directory for PNG frames, anything else for a video file. clock is
+    "virtual", "wall" or a clock object.
+    """
+    if source is None or source == "mss":
+        return MssBackend()
+    if isinstance(clock, str):
+        if clock not in (CLOCK_VIRTUAL, CLOCK_WALL):
+            raise ValueError(f"Unknown replay clock '{clock}' (expected '{CLOCK_VIRTUAL}' or '{CLOCK_WALL}').")
+        clock = VirtualClock(step_per_capture) if clock == CLOCK_VIRTUAL else WallClock()
+    if os.path.isdir(source):
+        return ImageDirectoryBackend(source, fps or DEFAULT_REPLAY_FPS, clock, loop)
+    if os.path.isfile(source):
+        return VideoFileBackend(source, clock, loop, fps)
+    raise ValueError(f"Capture source '{source}' does not exist.")
+
+
+def backend_from_config(config: Optional[Dict[str, Any]]) -> CaptureBackend:
+    """create_backend() from a dict, e.g. {"source": "frames/", "clock": "virtual", "fps": 10}."""
+    config = dict(config or {})
+    return create_backend(config.pop("source", None), **config)
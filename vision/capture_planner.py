@@ -0,0 +1,112 @@
+# vision/capture_planner.py
+
+import threading
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from .capture_service import capture_service
+from .frame import Frame
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+Rect = Tuple[int, int, int, int] # (left, top, width, height) in screen coordinates
+
+MAX_PLANNED_RECTS = 2 # Captures per plan at most
+MAX_MERGE_OVERHEAD = 0.5 # Merge two rects if their union is at most this much larger than both together
+
+
+def _area(rect: Rect) -> int:
+    return rect[2] * rect[3]
+
+def _union(a: Rect, b: Rect) -> Rect:
+    left = min(a[0], b[0]); top = min(a[1], b[1])
+    right = max(a[0] + a[2], b[0] + b[2]); bottom = max(a[1] + a[3], b[1] + b[3])
+    return (left, top, right - left, bottom - top)
+
+def _intersection_area(a: Rect, b: Rect) -> int:
+    ix = max(0, min(a[0] + a[2], b[0] + b[2]) - max(a[0], b[0]))
+    iy = max(0, min(a[1] + a[3], b[1] + b[3]) - max(a[1], b[1]))
+    return ix * iy
+
+def plan_rects(regions: Sequence[Optional[Rect]], max_rects: int = MAX_PLANNED_RECTS, max_overhead: float = MAX_MERGE_OVERHEAD) -> List[Optional[Rect]]:
+    """
+    Covers `regions` with at most max_rects capture rectangles. Rectangles are
+    merged greedily, cheapest union first (extra pixels captured), while there
+    are too many or the union adds little (<= max_overhead of the pixels the
+    two cover). A None region (full screen) makes the plan a single full capture.
+    """
+    if any(region is None for region in regions):
+        return [None]
+    rects: List[Rect] = list(dict.fromkeys(tuple(int(v) for v in region) for region in regions))
+    while len(rects) > 1:
+        best = None
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                merged = _union(rects[i], rects[j])
+                covered = _area(rects[i]) + _area(rects[j]) - _intersection_area(rects[i], rects[j])
+                cost = _area(merged) - covered
+                if best is None or cost < best[0]: best = (cost, i, j, merged, covered)
+        cost, i, j, merged, covered = best
+        if len(rects) <= max_rects and _area(merged) > covered * (1 + max_overhead):
+            break
+        rects = [r for k, r in enumerate(rects) if k not in (i, j)] + [merged]
+    return rects
+
+
+class CapturePlan:
+    """Frames captured for a plan; detectors get zero-copy views of them."""
+
+    def __init__(self, captures: List[Tuple[Optional[Rect], Frame]]):
+        self.captures = captures # (planned rect, None = full screen; frame)
+
+    def frame_for(self, region: Optional[Rect]) -> Optional[Frame]:
+        """View of `region` (None = full screen) if a planned frame contains it, else None."""
+        for rect, frame in self.captures:
+            if region is None:
+                if rect is None: return frame
+                continue
+            view = frame.screen_view(region)
+            if view is not None:
+                return view
+        return None
+
+
+class CapturePlanner:
+    """
+    Captures the regions several upcoming detection actions need in one or two
+    grabs (see plan_rects) instead of one grab per action. Keeps counts of
+    captures made and regions served, for the runner's end-of-run stats.
+    """
+
+    def __init__(self, max_rects: int = MAX_PLANNED_RECTS, max_overhead: float = MAX_MERGE_OVERHEAD):
+        self.max_rects = max_rects
+        self.max_overhead = max_overhead
+        self._lock = threading.Lock()
+        self.plans = 0
+        self.captures = 0 # Grabs made for plans
+        self.regions_planned = 0 # Per-action captures they replace
+
+    def plan(self, regions: Sequence[Optional[Rect]]) -> Optional[CapturePlan]:
+        """Captures the planned rectangles; None if nothing could be captured."""
+        if not regions:
+            return None
+        rects = plan_rects(regions, self.max_rects, self.max_overhead)
+        captures = []
+        for rect in rects:
+            frame = capture_service.grab_frame(rect)
+            if frame is not None: captures.append((rect, frame))
+        log.debug("Capture plan: %s region(s) -> %s capture(s): %s", len(regions), len(captures), rects)
+        with self._lock:
+            self.plans += 1; self.captures += len(captures); self.regions_planned += len(regions)
+        return CapturePlan(captures) if captures else None
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"plans": self.plans, "captures": self.captures, "regions_planned": self.regions_planned}
+
+    def reset_stats(self):
+        with self._lock: self.plans = self.captures = self.regions_planned = 0
+
+
+# Shared planner used by the scenario runner
+capture_planner = CapturePlanner()
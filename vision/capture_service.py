@@ -0,0 +1,223 @@
+# vision/capture_service.py
+
+import itertools
+import threading
+import time
+from collections import OrderedDict, deque
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from . import screen_capture
+from .frame import Frame
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_FPS = 20.0
+DEFAULT_BUFFER_SIZE = 8 # Frames kept per region
+DEFAULT_MAX_AGE_MS = 100.0 # Default "not older than" for consumers
+MAX_WATCHED_REGIONS = 4 # Least recently requested regions are dropped beyond this
+IDLE_TIMEOUT_S = 5.0 # Regions nobody asked for in this long stop being captured
+
+
+class CaptureService:
+    """
+    Optional background capture of the regions detectors ask for.
+
+    While running, a thread grabs every watched region at `fps` and keeps the
+    last `buffer_size` Frames per region, each with a frame id and the
+    time.monotonic() at which its grab started (a frame never predates its
+    timestamp). Consumers ask for the latest frame
+    not older than max_age_ms; a region inside a watched region (e.g. a 1x1
+    pixel inside the full screen) is served as a view of the larger frame.
+    Regions are watched automatically the first time grab() misses on them.
+
+    invalidate() marks every buffered frame as stale, so after a click no
+    consumer is handed a frame captured before the click.
+    """
+
+    def __init__(self, fps: float = DEFAULT_FPS, buffer_size: int = DEFAULT_BUFFER_SIZE, max_age_ms: float = DEFAULT_MAX_AGE_MS):
+        self.fps = fps
+        self.buffer_size = buffer_size
+        self.max_age_ms = max_age_ms
+        # region key (None = primary monitor) -> last request time; insertion order = LRU
+        self._watched: "OrderedDict[Optional[tuple], float]" = OrderedDict()
+        self._buffers: Dict[Optional[tuple], "deque[Frame]"] = {}
+        self._frame_ids = itertools.count(1)
+        self._invalidated_at = 0.0
+        self._condition = threading.Condition()
+        self._thread: Optional[threading.Thread] = None
+        self._stop_event = threading.Event()
+        self.captures = 0
+        self.hits = 0
+        self.misses = 0
+        self.late_ticks = 0 # Ticks where capturing took longer than the frame interval
+        # Called with (region, frame) for every frame handed out by grab_frame() (e.g. the frame recorder)
+        self._taps: List[Callable[[Optional[Tuple[int, int, int, int]], Frame], None]] = []
+
+    # --- Lifecycle ---
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self, fps: Optional[float] = None):
+        """Starts the capture thread (no-op if already running)."""
+        if fps is not None: self.fps = fps
+        if self.running:
+            return
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, name="CaptureService", daemon=True)
+        self._thread.start()
+        log.info("Capture service started at %.1f FPS.", self.fps)
+
+    def stop(self):
+        """Stops the capture thread and drops all buffered frames and watched regions."""
+        thread = self._thread
+        if thread is None:
+            return
+        self._stop_event.set(); thread.join(timeout=2.0); self._thread = None
+        with self._condition:
+            self._watched.clear(); self._buffers.clear(); self._condition.notify_all()
+        log.info("Capture service stopped. Stats: %s", self.stats())
+
+    # --- Regions ---
+
+    def watch(self, region: Optional[Tuple[int, int, int, int]]):
+        """Adds a region to the capture loop (None = primary monitor)."""
+        key = _region_key(region)
+        with self._condition:
+            self._watched[key] = time.monotonic(); self._watched.move_to_end(key)
+            while len(self._watched) > MAX_WATCHED_REGIONS:
+                dropped, _ = self._watched.popitem(last=False); self._buffers.pop(dropped, None)
+
+    def unwatch(self, region: Optional[Tuple[int, int, int, int]]):
+        key = _region_key(region)
+        with self._condition:
+            self._watched.pop(key, None); self._buffers.pop(key, None)
+
+    def invalidate(self):
+        """Treats every frame captured so far as stale (call after input that changes the screen)."""
+        with self._condition: self._invalidated_at = time.monotonic()
+
+    # --- Consumers ---
+
+    def latest(self, region: Optional[Tuple[int, int, int, int]], max_age_ms: Optional[float] = None) -> Optional[Frame]:
+        """Newest frame covering `region` that is at most max_age_ms old (and not invalidated), or None."""
+        max_age_ms = self.max_age_ms if max_age_ms is None else max_age_ms
+        key = _region_key(region)
+        with self._condition:
+            if key in self._watched: self._watched[key] = time.monotonic(); self._watched.move_to_end(key)
+            frame = self._find_fresh(key, max_age_ms)
+            if frame is None: self.misses += 1
+            else: self.hits += 1
+            return frame
+
+    def wait_for_frame(self, region: Optional[Tuple[int, int, int, int]], after_id: int = 0, timeout: float = 1.0) -> Optional[Frame]:
+        """Blocks until a frame of `region` newer than after_id (and not invalidated) exists; None on timeout."""
+        key = _region_key(region)
+        deadline = time.monotonic() + timeout
+        with self._condition:
+            while True:
+                frame = self._find_fresh(key, None)
+                if frame is not None and frame.frame_id > after_id:
+                    return frame
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not self.running:
+                    return None
+                self._condition.wait(remaining)
+
+    def frames(self, region: Optional[Tuple[int, int, int, int]]) -> List[Frame]:
+        """Buffered frames of a watched region, oldest first."""
+        with self._condition: return list(self._buffers.get(_region_key(region), ()))
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]], max_age_ms: Optional[float] = None) -> Optional[np.ndarray]:
+        """
+        BGR image of `region`: a fresh buffered frame when the service is running,
+        otherwise a synchronous capture. A miss while running watches the region,
+        so later polls of it are served from the buffer.
+        """
+        frame = self.grab_frame(region, max_age_ms)
+        return frame.bgr if frame is not None else None
+
+    def grab_frame(self, region: Optional[Tuple[int, int, int, int]], max_age_ms: Optional[float] = None) -> Optional[Frame]:
+        """Like grab(), but returns the Frame (frame_id is None for a synchronous capture)."""
+        frame = None
+        if self.running:
+            frame = self.latest(region, max_age_ms)
+            if frame is None: self.watch(region)
+        if frame is None:
+            frame = screen_capture.capture_frame(region)
+        if frame is not None:
+            for tap in self._taps: tap(region, frame)
+        return frame
+
+    def add_tap(self, tap: Callable[[Optional[Tuple[int, int, int, int]], Frame], None]):
+        """Registers a callback that sees every frame grab_frame() returns. It runs on the caller's thread: keep it cheap."""
+        if tap not in self._taps: self._taps = self._taps + [tap]
+
+    def remove_tap(self, tap: Callable[[Optional[Tuple[int, int, int, int]], Frame], None]):
+        self._taps = [t for t in self._taps if t != tap]
+
+    def stats(self) -> Dict[str, int]:
+        with self._condition:
+            return {"captures": self.captures, "hits": self.hits, "misses": self.misses, "late_ticks": self.late_ticks, "watched_regions": len(self._watched)}
+
+    def reset_stats(self):
+        with self._condition: self.captures = self.hits = self.misses = self.late_ticks = 0
+
+    # --- Internals ---
+
+    def _find_fresh(self, key: Optional[tuple], max_age_ms: Optional[float]) -> Optional[Frame]:
+        """Exact region first, then a view into any buffered frame that contains it. Caller holds the lock."""
+        oldest = self._invalidated_at
+        if max_age_ms is not None: oldest = max(oldest, time.monotonic() - max_age_ms / 1000.0)
+        buffer = self._buffers.get(key)
+        if buffer and buffer[-1].timestamp >= oldest:
+            return buffer[-1]
+        if key is None:
+            return None
+        for buffer in self._buffers.values():
+            if not buffer or buffer[-1].timestamp < oldest: continue
+            view = buffer[-1].screen_view(key) # Zero-copy crop; None if the region is not inside
+            if view is not None:
+                return view
+        return None
+
+    def _run(self):
+        try:
+            while not self._stop_event.is_set():
+                tick_start = time.monotonic()
+                with self._condition:
+                    # Forget regions nobody has asked for recently
+                    for key in [k for k, requested in self._watched.items() if tick_start - requested > IDLE_TIMEOUT_S]:
+                        del self._watched[key]; self._buffers.pop(key, None)
+                    regions = list(self._watched)
+                for key in regions:
+                    grab_start = time.monotonic()
+                    frame = screen_capture.capture_frame(key)
+                    if frame is None: continue
+                    frame.frame_id = next(self._frame_ids); frame.timestamp = grab_start
+                    with self._condition:
+                        if key not in self._watched: continue # Unwatched while capturing
+                        buffer = self._buffers.get(key)
+                        if buffer is None: buffer = self._buffers[key] = deque(maxlen=self.buffer_size)
+                        buffer.append(frame); self.captures += 1
+                        self._condition.notify_all()
+                interval = 1.0 / self.fps if self.fps > 0 else 0.0
+                remaining = interval - (time.monotonic() - tick_start)
+                if remaining > 0: self._stop_event.wait(remaining)
+                elif regions: self.late_ticks += 1
+        except Exception as e:
+            log.exception("Capture service stopped after an error: %s", e)
+        finally:
+            screen_capture.close_session() # Release this thread's mss handle
+
+
+def _region_key(region: Optional[Tuple[int, int, int, int]]) -> Optional[tuple]:
+    return None if region is None else tuple(int(v) for v in region)
+
+
+# Shared service; detectors read from it while it is running (see grab())
+capture_service = CaptureService()
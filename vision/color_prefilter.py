@@ -0,0 +1,134 @@
+# vision/color_prefilter.py
+
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple, List, Dict
+
+import cv2
+import numpy as np
+
+from .template_cache import template_cache
+
+COLOR_SHIFT = 5 # Keep the top 3 bits per channel -> 8 x 8 x 8 = 512 color bins
+SIGNATURE_MIN_FRACTION = 0.1 # A bin must hold this share of template pixels to be a signature color
+MAX_SIGNATURE_BINS = 4
+MIN_COLOR_MATCH = 0.5 # A window must contain this share of each signature color (after scaling)
+MAX_CANDIDATE_FRACTION = 0.6 # Restrict matching to candidate tiles only if they cover less than this
+
+
+@dataclass
+class ColorSignature:
+    """The dominant quantized colors of a template and their pixel counts at scale 1.0."""
+    bins: np.ndarray # int, signature bin indices
+    counts: np.ndarray # float, template pixels per signature bin
+    width: int
+    height: int
+
+
+def quantize(image_bgr: np.ndarray) -> np.ndarray:
+    """Maps each BGR pixel to one of 512 color bins (uint16 image)."""
+    q = (image_bgr >> COLOR_SHIFT).astype(np.uint16)
+    return (q[..., 0] << 6) | (q[..., 1] << 3) | q[..., 2]
+
+
+class ColorPrefilter:
+    """
+    Rejects haystack areas that lack a template's dominant colors.
+
+    The haystack is split into square tiles at least as large as the biggest
+    scaled template, so any placement of the template lies inside one 2 x 2
+    block of tiles. Per-tile counts of the signature colors come from a
+    single np.bincount pass; a block is a candidate if it holds at least
+    MIN_COLOR_MATCH of every signature color (scaled by the smallest scale).
+
+    Counters:
+        rejected:   no candidate block, the search was skipped ("not found")
+        restricted: matching ran only on the candidate blocks
+        full:       candidates covered most of the frame, full search
+        unsupported: the template has no dominant color (or is grayscale only)
+    """
+
+    def __init__(self):
+        self._signatures: Dict[tuple, Optional[ColorSignature]] = {}
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.restricted = 0
+        self.full = 0
+        self.unsupported = 0
+
+    def get_signature(self, template_path: str) -> Optional[ColorSignature]:
+        """Signature of a template file (computed once per file version), or None if it has none."""
+        cached = template_cache.get(template_path, False, [1.0])
+        if cached is None or cached.image.ndim != 3:
+            return None
+        key = (cached.path, cached.mtime_ns)
+        with self._lock:
+            if key in self._signatures: return self._signatures[key]
+        image = cached.image
+        counts = np.bincount(quantize(image).ravel(), minlength=512)
+        total = float(image.shape[0] * image.shape[1])
+        bins = np.argsort(-counts, kind="stable")[:MAX_SIGNATURE_BINS]
+        bins = bins[counts[bins] >= SIGNATURE_MIN_FRACTION * total]
+        signature = ColorSignature(bins=bins, counts=counts[bins].astype(np.float64), width=image.shape[1], height=image.shape[0]) if len(bins) else None
+        with self._lock:
+            for old_key in [k for k in self._signatures if k[0] == cached.path]: del self._signatures[old_key]
+            self._signatures[key] = signature
+        return signature
+
+    def candidate_regions(self, haystack_bgr: np.ndarray, signature: ColorSignature, min_scale: float, max_scale: float) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        Returns haystack rectangles (x0, y0, x1, y1) that could contain the
+        template: [] if none can, None if the candidates cover so much of the
+        frame that a full search is cheaper. Updates the counters.
+        """
+        (haystack_h, haystack_w) = haystack_bgr.shape[:2]
+        tile = int(np.ceil(max(signature.width, signature.height) * max(1.0, max_scale)))
+        tiles_y = -(-haystack_h // tile); tiles_x = -(-haystack_w // tile)
+
+        # Per-pixel signature index (len(bins) = "other color"), then one bincount over tile x index
+        stride = len(signature.bins) + 1
+        lut = np.full(512, len(signature.bins), np.int32); lut[signature.bins] = np.arange(len(signature.bins))
+        tile_row = ((np.arange(haystack_h) // tile) * tiles_x * stride).astype(np.int32)
+        tile_col = ((np.arange(haystack_w) // tile) * stride).astype(np.int32)
+        flat = (np.add.outer(tile_row, tile_col) + lut[quantize(haystack_bgr)]).ravel()
+        counts = np.bincount(flat, minlength=tiles_y * tiles_x * stride).reshape(tiles_y, tiles_x, stride)[..., :len(signature.bins)]
+
+        # Sums over every 2 x 2 block of tiles (zero-padded at the far edges)
+        padded = np.zeros((tiles_y + 1, tiles_x + 1, len(signature.bins)), counts.dtype)
+        padded[:tiles_y, :tiles_x] = counts
+        blocks = padded[:-1, :-1] + padded[1:, :-1] + padded[:-1, 1:] + padded[1:, 1:]
+        required = MIN_COLOR_MATCH * signature.counts * min(1.0, min_scale) ** 2
+        anchors = np.all(blocks >= required, axis=2)
+
+        if not anchors.any():
+            with self._lock: self.rejected += 1
+            return []
+        # Tiles covered by candidate blocks -> connected groups -> pixel rectangles
+        covered = np.zeros((tiles_y + 1, tiles_x + 1), np.uint8)
+        for dy in (0, 1):
+            for dx in (0, 1): covered[dy:dy + tiles_y, dx:dx + tiles_x] |= anchors.astype(np.uint8)
+        covered = covered[:tiles_y, :tiles_x]
+        if covered.sum() >= MAX_CANDIDATE_FRACTION * tiles_y * tiles_x:
+            with self._lock: self.full += 1
+            return None
+        count, _, stats, _ = cv2.connectedComponentsWithStats(covered, connectivity=8)
+        regions = []
+        for label in range(1, count):
+            tx, ty, tw, th = (int(v) for v in stats[label, :4])
+            regions.append((tx * tile, ty * tile, min(haystack_w, (tx + tw) * tile), min(haystack_h, (ty + th) * tile)))
+        with self._lock: self.restricted += 1
+        return regions
+
+    def record_unsupported(self):
+        with self._lock: self.unsupported += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"rejected": self.rejected, "restricted": self.restricted, "full": self.full, "unsupported": self.unsupported}
+
+    def reset_stats(self):
+        with self._lock: self.rejected = self.restricted = self.full = self.unsupported = 0
+
+
+# Shared prefilter used by object_detector
+color_prefilter = ColorPrefilter()
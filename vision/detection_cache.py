@@ -0,0 +1,104 @@
+# vision/detection_cache.py
+
+import itertools
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+
+from .frame import Frame
+from .frame_gate import _NO_RESULT
+
+DEFAULT_TTL_MS = 250.0 # A captured frame is reused for this long (0 disables the cache); covers a full-screen search
+MAX_CACHED_FRAMES = 4 # Regions whose latest frame is kept (LRU)
+
+
+class DetectionCache:
+    """
+    Short-lived cache of captured frames and the detection results computed on them.
+
+    Consecutive actions on the same region (e.g. IF_OBJECT_FOUND X followed by
+    CHECK_OBJECT_BREAK_LOOP X) run within milliseconds of each other. While a
+    region's last capture is younger than ttl_ms, detectors reuse that frame
+    instead of capturing again, and a search that already ran on it (same
+    frame id, template and parameters) returns its stored result. Unlike the
+    frame gate, which still captures and compares every time, nothing is
+    captured or matched on a hit.
+
+    invalidate() drops everything; the runner calls it after clicks and other
+    input that may change the screen.
+    """
+
+    def __init__(self, ttl_ms: float = DEFAULT_TTL_MS, max_frames: int = MAX_CACHED_FRAMES):
+        self.ttl_ms = ttl_ms
+        self.max_frames = max_frames
+        # region key -> {"id": int, "frame": Frame, "captured_at": float, "results": {search key: result}, "source_id": int or None}
+        self._frames: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._frame_ids = itertools.count(1)
+        self._lock = threading.Lock()
+        self.frame_hits = 0 # Captures avoided
+        self.result_hits = 0 # Searches answered from a stored result
+        self.invalidations = 0
+
+    def get_frame(self, region_key: tuple) -> Optional[Tuple[int, Frame]]:
+        """Returns (frame id, frame) of the region's last capture if it is still fresh, else None."""
+        with self._lock:
+            entry = self._frames.get(region_key)
+            if entry is None:
+                return None
+            if (time.monotonic() - entry["captured_at"]) * 1000 > self.ttl_ms:
+                del self._frames[region_key]
+                return None
+            self._frames.move_to_end(region_key)
+            self.frame_hits += 1
+            return entry["id"], entry["frame"]
+
+    def add_frame(self, region_key: tuple, frame: Frame, source_id: Optional[int] = None) -> Optional[int]:
+        """
+        Registers a new capture of a region and returns its frame id (None if the
+        cache is disabled). source_id identifies frames handed out repeatedly by
+        the capture service; registering the same one again keeps its results.
+        """
+        if self.ttl_ms <= 0:
+            return None
+        with self._lock:
+            entry = self._frames.get(region_key)
+            if source_id is not None and entry is not None and entry.get("source_id") == source_id:
+                self._frames.move_to_end(region_key); self.frame_hits += 1
+                return entry["id"]
+            frame_id = next(self._frame_ids)
+            self._frames[region_key] = {"id": frame_id, "frame": frame, "captured_at": time.monotonic(), "results": {}, "source_id": source_id}
+            self._frames.move_to_end(region_key)
+            while len(self._frames) > self.max_frames: self._frames.popitem(last=False)
+            return frame_id
+
+    def lookup(self, region_key: tuple, frame_id: int, search_key: tuple):
+        """Returns the result stored for this frame, or _NO_RESULT (see frame_gate.has_result)."""
+        with self._lock:
+            entry = self._frames.get(region_key)
+            if entry is not None and entry["id"] == frame_id and search_key in entry["results"]:
+                self.result_hits += 1
+                return entry["results"][search_key]
+            return _NO_RESULT
+
+    def store(self, region_key: tuple, frame_id: int, search_key: tuple, result):
+        with self._lock:
+            entry = self._frames.get(region_key)
+            if entry is not None and entry["id"] == frame_id:
+                entry["results"][search_key] = result
+
+    def invalidate(self):
+        """Forgets all frames and results (call after input that may change the screen)."""
+        with self._lock:
+            self._frames.clear(); self.invalidations += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"frame_hits": self.frame_hits, "result_hits": self.result_hits, "invalidations": self.invalidations}
+
+    def reset_stats(self):
+        with self._lock: self.frame_hits = self.result_hits = self.invalidations = 0
+
+
+# Shared cache used by object_detector
+detection_cache = DetectionCache()
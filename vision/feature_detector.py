@@ -0,0 +1,249 @@
+# vision/feature_detector.py
+#
+# Feature-based (ORB) alternative to object_detector's template matching. It
+# finds templates that are rotated, scaled or slightly skewed without a scale
+# loop, and returns the same (x, y, w, h, confidence) tuples. The confidence
+# is on the template matching scale (normalized correlation of the template
+# with the matched area, rectified by the homography), so the same thresholds
+# work for both detectors.
+
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Optional, Tuple, List, Sequence, Union
+
+import cv2
+import numpy as np
+
+from .capture_service import capture_service
+from .frame import Frame
+from .template_cache import template_cache
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+TEMPLATE_FEATURES = 1000 # ORB keypoints kept per template
+HAYSTACK_FEATURES = 5000 # ORB keypoints kept per captured frame
+RATIO_TEST = 0.75 # Lowe's ratio: best match must be this much closer than the second best
+MIN_INLIERS = 8 # RANSAC inliers needed to accept a homography
+RANSAC_REPROJ_THRESHOLD = 5.0 # Pixels
+MAX_AREA_RATIO = 16.0 # Projected template area may differ at most this much from the template's
+MAX_CACHED_TEMPLATES = 64
+
+
+@dataclass
+class TemplateFeatures:
+    """ORB keypoints/descriptors of one template (computed once per file version)."""
+    width: int
+    height: int
+    points: np.ndarray # N x 2 float32 keypoint coordinates
+    descriptors: Optional[np.ndarray]
+    image: np.ndarray # Grayscale template, to score the rectified match
+
+
+class HaystackFeatures:
+    """
+    ORB keypoints/descriptors of one captured frame, computed on first use so
+    several templates searched in the same frame share them.
+    """
+
+    def __init__(self, haystack: np.ndarray, offset: Tuple[int, int] = (0, 0)):
+        self.haystack = haystack
+        self.offset = offset
+        self._points: Optional[np.ndarray] = None
+        self._descriptors: Optional[np.ndarray] = None
+        self._lock = threading.Lock()
+
+    def get(self) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+        with self._lock:
+            if self._points is None:
+                self._points, self._descriptors = _detect(self.haystack, HAYSTACK_FEATURES)
+            return self._points, self._descriptors
+
+
+def _detect(image: np.ndarray, max_features: int) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    # ORB objects are not thread-safe, so each call creates its own (cheap)
+    orb = cv2.ORB_create(nfeatures=max_features)
+    keypoints, descriptors = orb.detectAndCompute(image, None)
+    points = np.array([kp.pt for kp in keypoints], dtype=np.float32).reshape(-1, 2)
+    return points, descriptors
+
+
+class _FeatureCache:
+    """LRU of TemplateFeatures keyed by (path, mtime); decoding goes through template_cache."""
+
+    def __init__(self, max_entries: int = MAX_CACHED_TEMPLATES):
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[tuple, TemplateFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, template_path: str) -> Optional[TemplateFeatures]:
+        cached = template_cache.get(template_path, True, [1.0])
+        if cached is None:
+            return None
+        key = (cached.path, cached.mtime_ns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        (h, w) = cached.image.shape[:2]
+        points, descriptors = _detect(cached.image, TEMPLATE_FEATURES)
+        entry = TemplateFeatures(width=w, height=h, points=points, descriptors=descriptors, image=cached.image)
+        with self._lock:
+            for old_key in [k for k in self._entries if k[0] == cached.path]: del self._entries[old_key] # Older file versions
+            self._entries[key] = entry
+            while len(self._entries) > self.max_entries: self._entries.popitem(last=False)
+        return entry
+
+    def clear(self):
+        with self._lock: self._entries.clear()
+
+
+# Shared template feature cache
+feature_cache = _FeatureCache()
+
+
+def _match_features(template: TemplateFeatures, frame: HaystackFeatures, threshold: float) -> Optional[Tuple[int, int, int, int, float]]:
+    """
+    Matches template descriptors against the frame, verifies the geometry with
+    a RANSAC homography and returns the bounding box of the projected template.
+    Confidence is the TM_CCOEFF_NORMED score of the template against the
+    matched area warped back into the template's frame (see _rectified_score).
+    """
+    frame_points, frame_descriptors = frame.get()
+    if template.descriptors is None or frame_descriptors is None or len(frame_points) < 2:
+        return None
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    pairs = matcher.knnMatch(template.descriptors, frame_descriptors, k=2)
+    good = [p[0] for p in pairs if len(p) == 2 and p[0].distance < RATIO_TEST * p[1].distance]
+    if len(good) < MIN_INLIERS:
+        return None
+
+    src = template.points[[m.queryIdx for m in good]].reshape(-1, 1, 2)
+    dst = frame_points[[m.trainIdx for m in good]].reshape(-1, 1, 2)
+    homography, mask = cv2.findHomography(src, dst, cv2.RANSAC, RANSAC_REPROJ_THRESHOLD)
+    if homography is None or mask is None:
+        return None
+    if int(mask.sum()) < MIN_INLIERS:
+        return None
+
+    corners = np.array([[0, 0], [template.width, 0], [template.width, template.height], [0, template.height]], dtype=np.float32).reshape(-1, 1, 2)
+    projected = cv2.perspectiveTransform(corners, homography).reshape(-1, 2)
+    area = abs(cv2.contourArea(projected))
+    template_area = float(template.width * template.height)
+    if not cv2.isContourConvex(projected.reshape(-1, 1, 2)) or area < template_area / MAX_AREA_RATIO or area > template_area * MAX_AREA_RATIO:
+        return None # Degenerate or implausible homography
+
+    confidence = _rectified_score(template, frame.haystack, homography)
+    if confidence < threshold:
+        return None
+
+    (haystack_h, haystack_w) = frame.haystack.shape[:2]
+    x0 = int(max(0, np.floor(projected[:, 0].min()))); y0 = int(max(0, np.floor(projected[:, 1].min())))
+    x1 = int(min(haystack_w, np.ceil(projected[:, 0].max()))); y1 = int(min(haystack_h, np.ceil(projected[:, 1].max())))
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return (x0 + frame.offset[0], y0 + frame.offset[1], x1 - x0, y1 - y0, float(confidence))
+
+
+def _rectified_score(template: TemplateFeatures, haystack: np.ndarray, homography: np.ndarray) -> float:
+    """
+    Normalized correlation (TM_CCOEFF_NORMED) of the template with the haystack
+    area the homography maps it onto, warped back to the template's size. The
+    inlier ratio alone is no confidence: a few chance matches can be all
+    inliers, and a real hit's ratio says little about how well it matches.
+    """
+    rectified = cv2.warpPerspective(haystack, homography, (template.width, template.height), flags=cv2.INTER_LINEAR | cv2.WARP_INVERSE_MAP, borderMode=cv2.BORDER_REPLICATE)
+    # A light blur on both sides keeps resampling and pixel noise from lowering the score of real hits
+    return float(cv2.matchTemplate(cv2.GaussianBlur(rectified, (5, 5), 0), cv2.GaussianBlur(template.image, (5, 5), 0), cv2.TM_CCOEFF_NORMED)[0, 0])
+
+
+def _haystack_features(region: Optional[Tuple[int, int, int, int]], frame: Optional[Frame]) -> Optional[HaystackFeatures]:
+    """Features of `region` in `frame` (or in a new capture); the gray view comes straight from the raw frame."""
+    if frame is not None:
+        frame = frame.screen_view(region)
+        if frame is None:
+            log.error("Error: Region %s is not inside the given frame.", region)
+            return None
+    else:
+        frame = capture_service.grab_frame(region)
+    if frame is None or frame.raw.size == 0:
+        log.error("Error: Failed to capture screen/region.")
+        return None
+    return HaystackFeatures(frame.gray, frame.origin)
+
+
+def find_template(
+    template_path: str,
+    region: Optional[Tuple[int, int, int, int]] = None,
+    threshold: float = 0.8,
+    haystack_features: Optional[HaystackFeatures] = None,
+    frame: Optional[Frame] = None
+) -> Optional[Tuple[int, int, int, int, float]]:
+    """
+    Finds a template with ORB features and homography verification.
+
+    Args:
+        template_path: Path to the template image file.
+        region: Optional screen region (left, top, width, height) to search within.
+        threshold: Minimum confidence (0-1), on the same scale as template
+                   matching: the correlation of the template with the matched
+                   area, rectified by the homography.
+        haystack_features: Features of an already captured frame to reuse
+                           (region is then ignored).
+        frame: Search this Frame instead of capturing; region (screen
+               coordinates) then selects a part of it.
+
+    Returns:
+        A tuple (x, y, w, h, confidence) of the bounding box of the projected
+        template in absolute screen coordinates, or None if not found.
+    """
+    if not os.path.exists(template_path):
+        log.error("Error: Template file not found at '%s'", template_path)
+        return None
+    try:
+        template = feature_cache.get(template_path)
+        if template is None:
+            return None
+        if template.descriptors is None:
+            log.warning("Warning: Template '%s' has no ORB features (too small or flat); use template matching instead.", template_path)
+            return None
+        if haystack_features is None:
+            haystack_features = _haystack_features(region, frame)
+            if haystack_features is None:
+                return None
+        match = _match_features(template, haystack_features, threshold)
+        if match:
+            log.debug("Object found (features): Conf=%.4f, Screen Coords=(%s,%s), Size=(%sx%s)", match[4], match[0], match[1], match[2], match[3])
+        return match
+    except cv2.error as e:
+        log.error("OpenCV Error during feature matching: %s", e)
+        return None
+
+
+def find_templates(
+    template_paths: List[str],
+    region: Optional[Tuple[int, int, int, int]] = None,
+    threshold: Union[float, Sequence[float]] = 0.8,
+    frame: Optional[Frame] = None
+) -> List[Optional[Tuple[int, int, int, int, float]]]:
+    """
+    Finds several templates in one captured frame (or in `frame`); the frame's
+    keypoints and descriptors are computed once and shared. Returns one entry
+    per path, as object_detector.find_templates does.
+    """
+    results: List[Optional[Tuple[int, int, int, int, float]]] = [None] * len(template_paths)
+    thresholds = [float(threshold)] * len(template_paths) if isinstance(threshold, (int, float)) else [float(t) for t in threshold]
+    if len(thresholds) != len(template_paths):
+        log.error("Error: Got %s thresholds for %s templates.", len(thresholds), len(template_paths))
+        return results
+    if not template_paths:
+        return results
+    haystack_features = _haystack_features(region, frame)
+    if haystack_features is None:
+        return results
+    for i, template_path in enumerate(template_paths):
+        results[i] = find_template(template_path, threshold=thresholds[i], haystack_features=haystack_features)
+    return results
@@ -0,0 +1,210 @@
+# vision/fft_match.py
+
+import math
+import threading
+from collections import OrderedDict
+from typing import Tuple, List, Optional, Sequence
+
+import cv2
+import numpy as np
+
+# --- Cost model ---
+# cv2.matchTemplate already correlates via the DFT internally, so its cost grows
+# with the haystack, not the template, and it re-transforms the frame on every
+# call. Here the frame is transformed once per capture and each template variant
+# once (cached), so a search costs one spectrum product, one inverse transform
+# and the window sums over its result map (haystack minus template size). A
+# template spectrum is as large as the padded frame, so when a search's
+# variants do not all fit the spectrum cache they are evicted in turn and
+# re-transformed on every search. Costs are ns per point and channel (padded
+# haystack points, except where noted), measured with
+# benchmarks/bench_fft_crossover.py; only their ratios matter.
+SPATIAL_NS_PER_POINT = 29.0 # One grayscale matchTemplate call (per haystack point)
+SPATIAL_COLOR_NS_PER_POINT = 65.0 # One multi-channel matchTemplate call (its multi-channel path is slower per channel)
+FFT_PRODUCT_NS_PER_POINT = 10.0 # Spectrum product and inverse transform of one search
+FFT_WINDOW_NS_PER_POINT = 14.0 # Window sums and normalization (per result map point)
+FFT_TEMPLATE_NS_PER_POINT = 12.0 # Transform of one template variant (when not cached)
+FFT_FRAME_NS_PER_POINT = 23.0 # Frame transform, shared by all searches on the frame
+FFT_MODES = ["auto", "always", "never"]
+DEFAULT_SPECTRUM_CACHE_BYTES = 128 * 1024 * 1024
+
+
+def dft_size(haystack_w: int, haystack_h: int) -> Tuple[int, int]:
+    """
+    Padded transform size (w, h). The circular correlation at every valid
+    match position never wraps because the transform is at least as large as
+    the haystack, so one size serves every template and scale.
+    """
+    return cv2.getOptimalDFTSize(haystack_w), cv2.getOptimalDFTSize(haystack_h)
+
+
+def prefer_fft(
+    haystack_w: int, haystack_h: int, searches: int = 1, frame_ready: bool = False,
+    template_sizes: Optional[Sequence[Tuple[int, int]]] = None, channels: int = 1, cache_bytes: Optional[int] = None, variants: Optional[int] = None
+) -> bool:
+    """
+    Cost model: True if `searches` correlations against one frame are predicted
+    to be cheaper in the frequency domain. frame_ready means the frame spectrum
+    already exists (e.g. an earlier template of a batch computed it).
+
+    template_sizes are the (w, h) of the searched variants (default: `searches`
+    tiny templates). Their spectra count as re-transformed on every search if
+    the `variants` spectra used with this frame size (default: one per
+    searched size) do not all fit in cache_bytes (default: the shared spectrum
+    cache's budget); `channels` sizes them.
+    """
+    dw, dh = dft_size(haystack_w, haystack_h)
+    sizes = list(template_sizes) if template_sizes is not None else [(1, 1)] * max(1, searches)
+    if not sizes: return False
+    spectrum_bytes = dw * dh * 4 * channels
+    budget = spectrum_cache.max_bytes if cache_bytes is None else cache_bytes
+    per_search = FFT_PRODUCT_NS_PER_POINT * dw * dh + (FFT_TEMPLATE_NS_PER_POINT * dw * dh if (variants or len(sizes)) * spectrum_bytes > budget else 0.0)
+    fft = sum(per_search + FFT_WINDOW_NS_PER_POINT * max(0, haystack_w - w + 1) * max(0, haystack_h - h + 1) for (w, h) in sizes)
+    if not frame_ready: fft += FFT_FRAME_NS_PER_POINT * dw * dh
+    spatial = SPATIAL_COLOR_NS_PER_POINT if channels > 1 else SPATIAL_NS_PER_POINT
+    return fft < spatial * haystack_w * haystack_h * len(sizes)
+
+
+def _planes(image: np.ndarray) -> List[np.ndarray]:
+    return [image] if image.ndim == 2 else list(cv2.split(image))
+
+
+def _padded_dft(plane: np.ndarray, size: Tuple[int, int]) -> np.ndarray:
+    """Real (CCS packed) float32 spectrum of `plane` zero-padded to size (w, h)."""
+    (h, w) = plane.shape[:2]
+    padded = np.zeros((size[1], size[0]), np.float32)
+    padded[:h, :w] = plane
+    return cv2.dft(padded, nonzeroRows=h)
+
+
+class FFTHaystack:
+    """
+    One captured frame prepared for frequency-domain matching.
+
+    The padded spectrum of every channel is computed once and shared by all
+    templates and scales matched against this frame. Window sums for the
+    normalization are memoized per template size.
+    """
+
+    def __init__(self, haystack: np.ndarray):
+        self.haystack = haystack
+        (self.height, self.width) = haystack.shape[:2]
+        self.size = dft_size(self.width, self.height)
+        self._planes: Optional[List[np.ndarray]] = None
+        self._centered: Optional[List[np.ndarray]] = None
+        self._spectra: Optional[List[np.ndarray]] = None
+        self._window_std: "OrderedDict[Tuple[int, int], np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def frame_ready(self) -> bool:
+        return self._spectra is not None
+
+    def _ensure_planes(self):
+        """Float copies of the channels, made on first use (caller must hold the lock)."""
+        if self._planes is None:
+            self._planes = [plane.astype(np.float32) for plane in _planes(self.haystack)]
+            self._centered = [cv2.subtract(plane, float(plane.mean())) for plane in self._planes]
+
+    def spectra(self) -> List[np.ndarray]:
+        with self._lock:
+            if self._spectra is None:
+                self._ensure_planes()
+                self._spectra = [_padded_dft(plane, self.size) for plane in self._planes]
+            return self._spectra
+
+    def window_std(self, w: int, h: int) -> np.ndarray:
+        """
+        sqrt(sum over channels of window sum(I^2) - sum(I)^2 / N) for every
+        valid w x h window, i.e. the image half of the TM_CCOEFF_NORMED denominator.
+        """
+        with self._lock:
+            cached = self._window_std.get((w, h))
+            if cached is not None: return cached
+            self._ensure_planes()
+        out_h = self.height - h + 1; out_w = self.width - w + 1
+        variance = None
+        for plane in self._centered:
+            # Box sums of the frame-centered plane: float32 keeps them fast, centering keeps
+            # the cancellation in sum(I^2) - sum(I)^2 / N small enough for matching
+            sums = cv2.boxFilter(plane, cv2.CV_32F, (w, h), anchor=(0, 0), normalize=False, borderType=cv2.BORDER_CONSTANT)[:out_h, :out_w]
+            squares = cv2.sqrBoxFilter(plane, cv2.CV_32F, (w, h), anchor=(0, 0), normalize=False, borderType=cv2.BORDER_CONSTANT)[:out_h, :out_w]
+            plane_variance = cv2.subtract(squares, cv2.multiply(sums, sums, scale=1.0 / (w * h)))
+            variance = plane_variance if variance is None else cv2.add(variance, plane_variance)
+        std = cv2.sqrt(cv2.max(variance, 0.0)).astype(np.float32)
+        with self._lock:
+            self._window_std[(w, h)] = std
+            while len(self._window_std) > 4: self._window_std.popitem(last=False)
+        return std
+
+
+class TemplateSpectrumCache:
+    """
+    LRU cache of zero-mean template spectra per (template entry, scale, size).
+    A padded 1080p spectrum is ~8 MB per channel, so it has its own byte
+    budget instead of living in the template cache entries.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_SPECTRUM_CACHE_BYTES):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[tuple, Tuple[List[np.ndarray], float]]" = OrderedDict()
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+
+    def get(self, key: tuple, template: np.ndarray, size: Tuple[int, int]) -> Tuple[List[np.ndarray], float]:
+        """Returns (spectra per channel, template norm), computing them on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+                return entry
+        spectra = []; norm_sq = 0.0
+        for plane in _planes(template):
+            zero_mean = plane.astype(np.float32) - np.float32(plane.mean())
+            norm_sq += float(np.dot(zero_mean.ravel().astype(np.float64), zero_mean.ravel().astype(np.float64)))
+            spectra.append(_padded_dft(zero_mean, size))
+        entry = (spectra, math.sqrt(norm_sq))
+        with self._lock:
+            if key not in self._entries:
+                self._entries[key] = entry
+                self._current_bytes += sum(s.nbytes for s in spectra)
+            while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+                _, (old_spectra, _) = self._entries.popitem(last=False)
+                self._current_bytes -= sum(s.nbytes for s in old_spectra)
+        return entry
+
+    def __len__(self) -> int:
+        with self._lock: return len(self._entries)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear(); self._current_bytes = 0
+
+
+def match_ccoeff_normed(fft_haystack: FFTHaystack, template: np.ndarray, spectra: List[np.ndarray], template_norm: float) -> np.ndarray:
+    """
+    TM_CCOEFF_NORMED result map computed in the frequency domain.
+
+    numerator   = sum over the window of T' * I   (T' = zero-mean template)
+    denominator = |T'| * window_std
+
+    Near-flat windows follow OpenCV: scores within 12.5% past +-1 are
+    clamped to +-1, anything further out (rounding noise over ~0) and flat
+    windows become 0.
+    """
+    (h, w) = template.shape[:2]
+    out_h = fft_haystack.height - h + 1; out_w = fft_haystack.width - w + 1
+    numerator = None
+    for haystack_spectrum, template_spectrum in zip(fft_haystack.spectra(), spectra):
+        product = cv2.mulSpectrums(haystack_spectrum, template_spectrum, 0, conjB=True)
+        correlation = cv2.idft(product, flags=cv2.DFT_REAL_OUTPUT | cv2.DFT_SCALE)[:out_h, :out_w]
+        numerator = correlation if numerator is None else cv2.add(numerator, correlation)
+
+    result = cv2.divide(numerator, fft_haystack.window_std(w, h), scale=1.0 / template_norm if template_norm > 0 else 0.0)
+    result[~(np.abs(result) <= 1.125)] = 0.0 # Also clears NaN/inf from zero-variance windows
+    np.clip(result, -1.0, 1.0, out=result)
+    return result
+
+
+# Shared template spectrum cache used by object_detector
+spectrum_cache = TemplateSpectrumCache()
@@ -0,0 +1,208 @@
+# vision/frame.py
+
+import sys
+import threading
+import weakref
+from collections import defaultdict
+from typing import Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .dirty_tiles import DIRTY_TILE_SIZE, tile_checksums, dirty_mask
+
+MAX_POOLED_PER_SHAPE = 4 # Free buffers kept per (shape, dtype)
+
+
+class BufferPool:
+    """
+    Free list of conversion buffers, keyed by shape and dtype. Polling the same
+    region converts frames of the same size over and over, so the BGR/gray
+    buffers of a dropped frame are reused by the next one instead of
+    allocating a new full-frame array per poll.
+    """
+
+    def __init__(self, max_per_shape: int = MAX_POOLED_PER_SHAPE):
+        self.max_per_shape = max_per_shape
+        self._free: Dict[tuple, List[np.ndarray]] = defaultdict(list)
+        self._lock = threading.Lock()
+        self.reused = 0
+        self.allocated = 0
+
+    def acquire(self, shape: Tuple[int, ...], dtype=np.uint8) -> np.ndarray:
+        """Returns an uninitialized array of this shape (recycled if one is free)."""
+        key = (tuple(shape), np.dtype(dtype).str)
+        with self._lock:
+            free = self._free.get(key)
+            if free:
+                self.reused += 1
+                return free.pop()
+            self.allocated += 1
+        return np.empty(shape, dtype=dtype)
+
+    def release(self, array: np.ndarray):
+        key = (array.shape, array.dtype.str)
+        with self._lock:
+            free = self._free[key]
+            if len(free) < self.max_per_shape: free.append(array)
+
+    def clear(self):
+        with self._lock: self._free.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"reused": self.reused, "allocated": self.allocated, "free": sum(len(v) for v in self._free.values())}
+
+
+def _recycle(pool: BufferPool, views: dict, pooled: List[np.ndarray]):
+    """Finalizer of a Frame: returns its conversion buffers unless something still references them."""
+    views.clear()
+    while pooled:
+        array = pooled.pop()
+        # References: `array` and getrefcount's argument. Anything more (a caller
+        # holding frame.gray, a frame gate, a numpy view) keeps it out of the pool.
+        if sys.getrefcount(array) <= 2: pool.release(array)
+
+
+class Frame:
+    """
+    A captured image plus the derived images detectors need, created on demand.
+
+    The raw buffer (BGRA from mss, or an existing BGR/grayscale array) is
+    wrapped without copying. bgr, gray and downscaled() are computed once per
+    frame and memoized; their buffers come from a BufferPool and go back to it
+    when the frame is garbage collected, unless a caller still holds them.
+    Treat all returned arrays as read-only.
+
+    origin is the screen position of the top-left pixel, so detectors can
+    return absolute coordinates for any view() of the frame.
+    """
+
+    def __init__(self, raw: np.ndarray, origin: Tuple[int, int] = (0, 0), frame_id: Optional[int] = None, timestamp: Optional[float] = None, pool: Optional["BufferPool"] = None):
+        if raw.ndim not in (2, 3) or (raw.ndim == 3 and raw.shape[2] not in (3, 4)):
+            raise ValueError(f"Unsupported frame shape {raw.shape} (expected BGRA, BGR or grayscale).")
+        self.raw = raw
+        self.origin = (int(origin[0]), int(origin[1]))
+        self.frame_id = frame_id
+        self.timestamp = timestamp
+        self._pool = pool or buffer_pool
+        self._views: Dict[tuple, np.ndarray] = {}
+        self._pooled: List[np.ndarray] = []
+        self._checksums: Dict[int, np.ndarray] = {}
+        self._lock = threading.Lock()
+        weakref.finalize(self, _recycle, self._pool, self._views, self._pooled)
+
+    @classmethod
+    def from_screenshot(cls, screenshot, origin: Tuple[int, int], **kwargs) -> "Frame":
+        """Wraps an mss ScreenShot's BGRA bytes (a fresh buffer per grab) without copying."""
+        (width, height) = screenshot.size
+        raw = np.frombuffer(screenshot.raw, dtype=np.uint8).reshape(height, width, 4)
+        return cls(raw, origin, **kwargs)
+
+    @property
+    def width(self) -> int:
+        return self.raw.shape[1]
+
+    @property
+    def height(self) -> int:
+        return self.raw.shape[0]
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.raw.shape[:2]
+
+    @property
+    def bounds(self) -> Tuple[int, int, int, int]:
+        """Screen (left, top, width, height) covered by the frame."""
+        return (self.origin[0], self.origin[1], self.width, self.height)
+
+    @property
+    def bgr(self) -> np.ndarray:
+        if self.raw.ndim == 3 and self.raw.shape[2] == 3:
+            return self.raw
+        code = cv2.COLOR_BGRA2BGR if self.raw.ndim == 3 else cv2.COLOR_GRAY2BGR
+        return self._convert(("bgr",), lambda dst: cv2.cvtColor(self.raw, code, dst=dst), self.shape + (3,))
+
+    @property
+    def gray(self) -> np.ndarray:
+        if self.raw.ndim == 2:
+            return self.raw
+        # Straight from the raw buffer; no intermediate BGR copy
+        code = cv2.COLOR_BGRA2GRAY if self.raw.shape[2] == 4 else cv2.COLOR_BGR2GRAY
+        return self._convert(("gray",), lambda dst: cv2.cvtColor(self.raw, code, dst=dst), self.shape)
+
+    def image(self, grayscale: bool) -> np.ndarray:
+        return self.gray if grayscale else self.bgr
+
+    def downscaled(self, factor: float, grayscale: bool = True) -> np.ndarray:
+        """The gray/BGR image resized by `factor` (INTER_AREA), memoized per factor."""
+        source = self.image(grayscale)
+        size = (max(1, int(round(self.width * factor))), max(1, int(round(self.height * factor))))
+        shape = (size[1], size[0]) + source.shape[2:]
+        return self._convert(("scaled", float(factor), bool(grayscale)), lambda dst: cv2.resize(source, size, dst=dst, interpolation=cv2.INTER_AREA), shape)
+
+    def tile_checksums(self, tile_size: int = DIRTY_TILE_SIZE) -> np.ndarray:
+        """Per-tile checksums of the raw image (see vision/dirty_tiles.py), memoized per tile size."""
+        with self._lock:
+            checksums = self._checksums.get(tile_size)
+            if checksums is None:
+                checksums = self._checksums[tile_size] = tile_checksums(self.raw, tile_size)
+            return checksums
+
+    def dirty_mask(self, previous: Optional["Frame"], tile_size: int = DIRTY_TILE_SIZE) -> Optional[np.ndarray]:
+        """
+        Tiles that differ from `previous` (an earlier frame of the same region)
+        as a boolean (rows, cols) mask; None if there is no comparable frame,
+        i.e. everything is dirty.
+        """
+        if previous is None or previous.shape != self.shape:
+            return None
+        return dirty_mask(previous.tile_checksums(tile_size), self.tile_checksums(tile_size))
+
+    def view(self, x: int, y: int, width: int, height: int) -> "Frame":
+        """
+        Sub-frame at (x, y) relative to this frame, sharing the raw buffer (no
+        copy). Memoized conversions of this frame are cropped rather than redone.
+        """
+        x = max(0, int(x)); y = max(0, int(y))
+        x1 = min(self.width, x + int(width)); y1 = min(self.height, y + int(height))
+        sub = Frame(self.raw[y:y1, x:x1], (self.origin[0] + x, self.origin[1] + y), self.frame_id, self.timestamp, self._pool)
+        with self._lock:
+            for key in [("bgr",), ("gray",)]:
+                if key in self._views: sub._views[key] = self._views[key][y:y1, x:x1]
+        return sub
+
+    def screen_view(self, region: Optional[Tuple[int, int, int, int]]) -> Optional["Frame"]:
+        """Sub-frame for a screen region (left, top, width, height); None if it is not fully inside."""
+        if region is None:
+            return self
+        (left, top, width, height) = (int(v) for v in region)
+        x = left - self.origin[0]; y = top - self.origin[1]
+        if x < 0 or y < 0 or x + width > self.width or y + height > self.height or width <= 0 or height <= 0:
+            return None
+        if (x, y, width, height) == (0, 0, self.width, self.height):
+            return self
+        return self.view(x, y, width, height)
+
+    def _convert(self, key: tuple, convert, shape: tuple) -> np.ndarray:
+        with self._lock:
+            cached = self._views.get(key)
+            if cached is not None:
+                return cached
+            dst = self._pool.acquire(shape)
+            result = convert(dst)
+            if result is dst: self._pooled.append(dst) # Only pool what we own; OpenCV may reallocate
+            else: self._pool.release(dst)
+            self._views[key] = result
+            return result
+
+
+def as_frame(image, origin: Tuple[int, int] = (0, 0)) -> Optional[Frame]:
+    """Wraps an ndarray in a Frame; Frames and None pass through."""
+    if image is None or isinstance(image, Frame):
+        return image
+    return Frame(image, origin)
+
+
+# Shared pool for frame conversions
+buffer_pool = BufferPool()
@@ -0,0 +1,90 @@
+# vision/frame_gate.py
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Any
+
+import cv2
+import numpy as np
+
+MAX_GATED_REGIONS = 8 # Regions whose last frame is remembered (LRU)
+DEFAULT_PIXEL_TOLERANCE = 0 # Max per-pixel difference still counted as "unchanged"
+
+_NO_RESULT = object()
+
+
+class FrameGate:
+    """
+    Skips template matching when the captured region did not change.
+
+    For each region (and color mode) the last captured frame is kept. A new
+    capture is compared to it with cv2.norm(NORM_INF), the largest per-pixel
+    absolute difference, which costs about a millisecond at 1080p. When
+    nothing changed beyond the tolerance, results computed on the previous
+    frame (positive or negative) are returned without calling matchTemplate.
+    """
+
+    def __init__(self, pixel_tolerance: int = DEFAULT_PIXEL_TOLERANCE, max_regions: int = MAX_GATED_REGIONS):
+        self.pixel_tolerance = pixel_tolerance
+        self.max_regions = max_regions
+        # region key -> {"frame": ndarray, "version": int, "results": {search key: result}}
+        self._regions: "OrderedDict[tuple, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.skipped = 0 # Searches answered from the previous frame
+        self.evaluated = 0 # Searches that had to run
+        self.changed_frames = 0
+
+    def observe(self, region_key: tuple, frame: np.ndarray) -> int:
+        """
+        Registers a new capture of a region and returns its frame version. The
+        version only changes when the content changed, so results stored under
+        the same version stay valid.
+        """
+        with self._lock:
+            entry = self._regions.get(region_key)
+            if entry is not None:
+                self._regions.move_to_end(region_key)
+                previous = entry["frame"]
+                if previous.shape == frame.shape and cv2.norm(previous, frame, cv2.NORM_INF) <= self.pixel_tolerance:
+                    return entry["version"]
+                entry["frame"] = frame; entry["version"] += 1; entry["results"] = {}
+                self.changed_frames += 1
+                return entry["version"]
+            self._regions[region_key] = {"frame": frame, "version": 0, "results": {}}
+            while len(self._regions) > self.max_regions: self._regions.popitem(last=False)
+            return 0
+
+    def lookup(self, region_key: tuple, version: int, search_key: tuple):
+        """Returns the stored result for this frame version, or _NO_RESULT (see has_result)."""
+        with self._lock:
+            entry = self._regions.get(region_key)
+            if entry is not None and entry["version"] == version and search_key in entry["results"]:
+                self.skipped += 1
+                return entry["results"][search_key]
+            self.evaluated += 1
+            return _NO_RESULT
+
+    def store(self, region_key: tuple, version: int, search_key: tuple, result):
+        with self._lock:
+            entry = self._regions.get(region_key)
+            if entry is not None and entry["version"] == version:
+                entry["results"][search_key] = result
+
+    def reset(self):
+        """Forgets all frames and results (e.g. after input that may change the screen)."""
+        with self._lock: self._regions.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"skipped": self.skipped, "evaluated": self.evaluated, "changed_frames": self.changed_frames}
+
+    def reset_stats(self):
+        with self._lock: self.skipped = self.evaluated = self.changed_frames = 0
+
+
+def has_result(value) -> bool:
+    return value is not _NO_RESULT
+
+
+# Shared gate used by object_detector
+frame_gate = FrameGate()
@@ -0,0 +1,399 @@
+# vision/frame_recorder.py
+#
+# Opt-in recording of the frames detection actions looked at, for offline
+# profiling and replay (see benchmarks/extract_recording.py).
+#
+# A recording is a directory of segment files plus recording.json. Each
+# segment starts with MAGIC, followed by records:
+#
+#   <u32 header length> <u32 payload length> <JSON header> <payload>
+#
+# Frame records hold the timestamp, action index/type and capture region in
+# the header and PNG-compressed tiles as payload. After its frames, every
+# recorded action execution ("run") adds a result record with what it found.
+# The first frame of each region in a segment (and every KEYFRAME_INTERVAL-th
+# after it) is a key frame stored whole. The others store only the tiles
+# that changed since the previous frame of that region ("base"). A closed
+# segment ends with an index record (seq -> file offset) and INDEX_TRAILER,
+# so readers can seek. A segment cut short by a crash is scanned instead.
+
+import json
+import os
+import queue
+import struct
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from .capture_service import capture_service
+from .frame import Frame
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+MAGIC = b"CVREC1\n"
+INDEX_TRAILER = b"CVRIDX1\n"
+META_FILE = "recording.json"
+SEGMENT_PATTERN = "segment_%06d.cvrec"
+DEFAULT_RECORDINGS_DIR = os.path.join(os.path.expanduser("~"), ".cv_autoclicker", "recordings")
+
+TILE_SIZE = 64 # Pixels per tile side
+KEYFRAME_INTERVAL = 30 # Frames of a region between key frames
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024 # Whole recording; the oldest segments are deleted beyond this
+DEFAULT_MAX_AGE_S = 600.0 # Segments that ended longer ago than this are deleted
+SEGMENTS_PER_RECORDING = 8 # A segment is closed at 1/8 of either limit
+QUEUE_SIZE = 64 # Actions waiting for the writer; more are dropped, never waited for
+PNG_COMPRESSION = 1 # Fast; screen content compresses well even at low levels
+
+_RECORD = struct.Struct("<II")
+_TRAILER = struct.Struct("<Q")
+_STOP = object()
+
+
+def _json_default(value):
+    return value.item() if isinstance(value, np.generic) else str(value)
+
+
+def _changed_tiles(previous: np.ndarray, current: np.ndarray, tile_size: int) -> List[Tuple[int, int, int, int]]:
+    """(x, y, w, h) of the tiles that differ between two frames of the same shape."""
+    (height, width) = current.shape[:2]
+    diff = previous != current
+    if diff.ndim == 3: diff = diff.any(axis=2)
+    rows = -(-height // tile_size); cols = -(-width // tile_size)
+    padded = np.zeros((rows * tile_size, cols * tile_size), dtype=bool)
+    padded[:height, :width] = diff
+    changed = padded.reshape(rows, tile_size, cols, tile_size).any(axis=(1, 3))
+    return [(int(c) * tile_size, int(r) * tile_size, min(tile_size, width - int(c) * tile_size), min(tile_size, height - int(r) * tile_size)) for r, c in zip(*np.nonzero(changed))]
+
+
+class _SegmentWriter:
+    """One open segment file plus the per-region delta state (which does not cross segments)."""
+
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+        self.size = len(MAGIC)
+        self.opened_at = time.monotonic()
+        self.index: List[Tuple[int, int]] = [] # (seq, offset)
+        self.streams: Dict[tuple, Dict[str, Any]] = {} # stream key -> {"image", "seq", "since_key"}
+
+    def write(self, seq: int, header: Dict[str, Any], payload: bytes = b""):
+        data = json.dumps(header, separators=(",", ":"), default=_json_default).encode("utf-8")
+        self.index.append((seq, self.size))
+        self._file.write(_RECORD.pack(len(data), len(payload))); self._file.write(data); self._file.write(payload)
+        self.size += _RECORD.size + len(data) + len(payload)
+
+    def close(self):
+        index_offset = self.size
+        data = json.dumps({"index": self.index}, separators=(",", ":")).encode("utf-8")
+        self._file.write(_RECORD.pack(len(data), 0)); self._file.write(data)
+        self._file.write(_TRAILER.pack(index_offset)); self._file.write(INDEX_TRAILER)
+        self._file.close()
+
+
+class FrameRecorder:
+    """
+    Records the frames captured while a detection action runs, with its
+    index, type and result. Captures are seen through a capture_service tap;
+    the runner marks action boundaries with begin_action()/end_action().
+
+    The run thread only queues references to the frames (no copies; captured
+    frames are never modified). A writer thread diffs, compresses and writes
+    them; when it falls behind, new records are dropped (and counted) rather
+    than slowing the run down. Disk use is bounded by max_bytes and
+    max_age_s: segments are rotated and the oldest deleted, so the most
+    recent part of a long run is kept.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES, max_age_s: float = DEFAULT_MAX_AGE_S, tile_size: int = TILE_SIZE, keyframe_interval: int = KEYFRAME_INTERVAL):
+        self.max_bytes = max_bytes
+        self.max_age_s = max_age_s
+        self.tile_size = tile_size
+        self.keyframe_interval = keyframe_interval
+        self.directory: Optional[str] = None
+        self._queue: "queue.Queue" = queue.Queue(maxsize=QUEUE_SIZE)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self._context: Optional[Dict[str, Any]] = None
+        self._run = 0 # Action executions recorded; frames and the result of one execution share a run number
+        self._segment: Optional[_SegmentWriter] = None
+        self._segment_number = 0
+        self._seq = 0
+        self._started_at = 0.0
+        self.frames = 0 # Frame records written
+        self.results = 0 # Result records written (one per recorded action execution)
+        self.dropped = 0 # Records dropped because the writer was behind
+        self.tiles_written = 0
+        self.tiles_unchanged = 0
+        self.bytes_written = 0
+        self.segments_deleted = 0
+
+    @property
+    def recording(self) -> bool:
+        return self._thread is not None
+
+    def start(self, directory: str, meta: Optional[Dict[str, Any]] = None) -> str:
+        """Starts recording into `directory` (created if needed, must not hold a recording yet); returns it."""
+        if self.recording: self.stop()
+        os.makedirs(directory, exist_ok=True)
+        if segment_paths(directory):
+            raise FileExistsError(f"'{directory}' already contains a recording.")
+        self.directory = directory; self._segment_number = 0; self._seq = 0; self._run = 0; self._context = None
+        self._started_at = time.monotonic()
+        info = {"version": 1, "started": time.strftime("%Y-%m-%dT%H:%M:%S"), "tile_size": self.tile_size, "keyframe_interval": self.keyframe_interval, **(meta or {})}
+        with open(os.path.join(directory, META_FILE), "w", encoding="utf-8") as f:
+            json.dump(info, f, indent=2, default=_json_default)
+        self._thread = threading.Thread(target=self._write_loop, name="FrameRecorder", daemon=True)
+        self._thread.start()
+        capture_service.add_tap(self._on_capture)
+        log.info("Recording detection frames to '%s'.", directory)
+        return directory
+
+    def stop(self):
+        """Flushes queued actions, closes the segment and stops recording."""
+        if not self.recording:
+            return
+        capture_service.remove_tap(self._on_capture)
+        self.end_action(None)
+        self._queue.put(_STOP)
+        self._thread.join(); self._thread = None
+        log.info("Recording stopped: %s", self.stats())
+
+    # --- Run thread ---
+
+    def begin_action(self, action_index: int, action_type: str):
+        if not self.recording: return
+        if self._context is not None: self.end_action(None) # The previous action ended without a result (e.g. it raised)
+        self._run += 1
+        self._context = {"run": self._run, "action": action_index, "type": action_type}
+
+    def end_action(self, result: Any):
+        if not self.recording or self._context is None: return
+        self._enqueue(("result", self._context, time.monotonic() - self._started_at, time.time(), result)); self._context = None
+
+    def _on_capture(self, region: Optional[Tuple[int, int, int, int]], frame: Frame):
+        if self._context is not None:
+            self._enqueue(("frame", self._context, time.monotonic() - self._started_at, time.time(), (region, frame)))
+
+    def _enqueue(self, item: tuple):
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            with self._lock: self.dropped += 1
+
+    # --- Writer thread ---
+
+    def _write_loop(self):
+        while True:
+            item = self._queue.get()
+            if item is _STOP:
+                break
+            kind, context, t, wall, data = item
+            try:
+                segment = self._current_segment()
+                self._seq += 1
+                header = {"seq": self._seq, "kind": kind, "t": round(t, 6), "wall": wall, **context}
+                if kind == "frame":
+                    self._write_frame(segment, header, *data)
+                else:
+                    header["result"] = data; segment.write(self._seq, header)
+                    with self._lock: self.results += 1
+            except Exception as e:
+                log.error("Error writing frame recording: %s", e)
+        if self._segment is not None:
+            self._segment.close(); self._segment = None
+
+    def _write_frame(self, segment: _SegmentWriter, header: Dict[str, Any], region: Optional[Tuple[int, int, int, int]], frame: Frame):
+        image = frame.raw; seq = header["seq"]
+        stream_key = (tuple(region) if region is not None else None, image.shape, image.dtype.str)
+        stream = segment.streams.get(stream_key)
+        key_frame = stream is None or stream["since_key"] + 1 >= self.keyframe_interval
+        tiles = [(0, 0, image.shape[1], image.shape[0])] if key_frame else _changed_tiles(stream["image"], image, self.tile_size)
+        payload = bytearray(); entries = []
+        for (x, y, w, h) in tiles:
+            ok, encoded = cv2.imencode(".png", np.ascontiguousarray(image[y:y + h, x:x + w]), [cv2.IMWRITE_PNG_COMPRESSION, PNG_COMPRESSION])
+            if not ok: raise RuntimeError(f"Could not encode tile {(x, y, w, h)}")
+            entries.append([x, y, w, h, len(payload), len(encoded)]); payload += encoded.tobytes()
+        header.update({"region": list(region) if region is not None else None, "origin": list(frame.origin), "shape": list(image.shape), "key": key_frame, "base": None if key_frame else stream["seq"], "tiles": entries})
+        segment.write(seq, header, bytes(payload))
+        segment.streams[stream_key] = {"image": image, "seq": seq, "since_key": 0 if key_frame else stream["since_key"] + 1}
+        total_tiles = -(-image.shape[0] // self.tile_size) * -(-image.shape[1] // self.tile_size)
+        with self._lock:
+            self.frames += 1; self.bytes_written += len(payload)
+            self.tiles_written += len(tiles) if not key_frame else total_tiles
+            if not key_frame: self.tiles_unchanged += total_tiles - len(tiles)
+
+    def _current_segment(self) -> _SegmentWriter:
+        segment = self._segment
+        if segment is not None and (segment.size >= self.max_bytes / SEGMENTS_PER_RECORDING or time.monotonic() - segment.opened_at >= self.max_age_s / SEGMENTS_PER_RECORDING):
+            segment.close(); segment = None
+        if segment is None:
+            self._segment_number += 1
+            segment = self._segment = _SegmentWriter(os.path.join(self.directory, SEGMENT_PATTERN % self._segment_number))
+            self._enforce_limits()
+        return segment
+
+    def _enforce_limits(self):
+        """Deletes the oldest closed segments while the recording is over its size or age limit."""
+        closed = [p for p in segment_paths(self.directory) if p != self._segment.path]
+        sizes = {p: os.path.getsize(p) for p in closed}
+        total = sum(sizes.values()) + self._segment.size
+        now = time.time()
+        for path in closed:
+            if total <= self.max_bytes and now - os.path.getmtime(path) <= self.max_age_s:
+                break
+            os.remove(path); total -= sizes[path]
+            with self._lock: self.segments_deleted += 1
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"frames": self.frames, "results": self.results, "dropped": self.dropped, "tiles_written": self.tiles_written,
+                    "tiles_unchanged": self.tiles_unchanged, "bytes": self.bytes_written, "segments_deleted": self.segments_deleted}
+
+    def reset_stats(self):
+        with self._lock: self.frames = self.results = self.dropped = self.tiles_written = self.tiles_unchanged = self.bytes_written = self.segments_deleted = 0
+
+
+def segment_paths(directory: str) -> List[str]:
+    """Segment files of a recording, oldest first."""
+    return sorted(os.path.join(directory, name) for name in os.listdir(directory) if name.startswith("segment_") and name.endswith(".cvrec"))
+
+
+class RecordingReader:
+    """
+    Reads a recording. records() iterates all headers; frames() decodes the
+    frames in order (applying tile deltas incrementally); frame(seq) seeks to
+    one frame through the segment index. Frame headers returned by both carry
+    the "result" of their run.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        meta_path = os.path.join(directory, META_FILE)
+        self.meta: Dict[str, Any] = {}
+        if os.path.exists(meta_path):
+            with open(meta_path, "r", encoding="utf-8") as f: self.meta = json.load(f)
+        self.segments = segment_paths(directory)
+        self._indexes: Dict[str, Dict[int, int]] = {}
+        self._results: Optional[Dict[int, Any]] = None
+
+    def results(self) -> Dict[int, Any]:
+        """Result of each recorded action execution, by run number."""
+        if self._results is None:
+            self._results = {r["run"]: r.get("result") for r in self.records() if r.get("kind") == "result"}
+        return self._results
+
+    def records(self) -> Iterator[Dict[str, Any]]:
+        for path in self.segments:
+            for header, _ in self._scan(path, payloads=False):
+                yield header
+
+    def frames(self, action: Optional[int] = None) -> Iterator[Tuple[Dict[str, Any], np.ndarray]]:
+        """(header, image) of every frame record, optionally only those of one action index."""
+        results = self.results()
+        for path in self.segments:
+            images: Dict[int, np.ndarray] = {} # Last image of each region stream, by seq (the next delta's base)
+            for header, payload in self._scan(path, payloads=True):
+                if header.get("kind") != "frame":
+                    continue
+                base = images.pop(header["base"], None) if header["base"] is not None else None
+                if not header["key"] and base is None:
+                    continue # Unreadable base; resume at the next key frame
+                image = self._apply(header, payload, base)
+                images[header["seq"]] = image
+                if action is None or header.get("action") == action:
+                    header["result"] = results.get(header["run"])
+                    yield header, image
+
+    def frame(self, seq: int) -> Optional[Tuple[Dict[str, Any], np.ndarray]]:
+        """Decodes one frame: seeks to its key frame and applies the deltas up to it."""
+        for path in self.segments:
+            index = self._index(path)
+            if seq not in index:
+                continue
+            with open(path, "rb") as f:
+                chain = []
+                header, payload = self._read_at(f, index[seq])
+                if header.get("kind") != "frame":
+                    return None
+                while True:
+                    chain.append((header, payload))
+                    if header["key"]: break
+                    if header["base"] not in index: return None
+                    header, payload = self._read_at(f, index[header["base"]])
+            image = None
+            for header, payload in reversed(chain):
+                image = self._apply(header, payload, image)
+            header = chain[0][0]; header["result"] = self.results().get(header["run"])
+            return header, image
+        return None
+
+    # --- Internals ---
+
+    @staticmethod
+    def _apply(header: Dict[str, Any], payload: bytes, base: Optional[np.ndarray]) -> np.ndarray:
+        image = np.empty(header["shape"], dtype=np.uint8) if base is None else base.copy()
+        for x, y, w, h, offset, length in header["tiles"]:
+            tile = cv2.imdecode(np.frombuffer(payload, dtype=np.uint8, count=length, offset=offset), cv2.IMREAD_UNCHANGED)
+            image[y:y + h, x:x + w] = tile.reshape(image[y:y + h, x:x + w].shape)
+        return image
+
+    @staticmethod
+    def _read_at(f, offset: int) -> Tuple[Dict[str, Any], bytes]:
+        f.seek(offset)
+        header_len, payload_len = _RECORD.unpack(f.read(_RECORD.size))
+        header = json.loads(f.read(header_len).decode("utf-8"))
+        return header, f.read(payload_len)
+
+    def _index(self, path: str) -> Dict[int, int]:
+        index = self._indexes.get(path)
+        if index is None:
+            index = self._read_index(path)
+            if index is None: # Unclosed segment: scan it
+                index = {}
+                for header, _, offset in self._scan(path, payloads=False, offsets=True): index[header["seq"]] = offset
+            self._indexes[path] = index
+        return index
+
+    @staticmethod
+    def _read_index(path: str) -> Optional[Dict[int, int]]:
+        with open(path, "rb") as f:
+            f.seek(0, os.SEEK_END); size = f.tell()
+            if size < len(MAGIC) + _TRAILER.size + len(INDEX_TRAILER):
+                return None
+            f.seek(size - len(INDEX_TRAILER) - _TRAILER.size)
+            (index_offset,) = _TRAILER.unpack(f.read(_TRAILER.size))
+            if f.read(len(INDEX_TRAILER)) != INDEX_TRAILER:
+                return None
+            header, _ = RecordingReader._read_at(f, index_offset)
+            return {int(seq): int(offset) for seq, offset in header["index"]}
+
+    @staticmethod
+    def _scan(path: str, payloads: bool, offsets: bool = False):
+        """Reads records front to back; stops at the index record or a truncated tail."""
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                log.warning("Warning: '%s' is not a frame recording segment.", path); return
+            while True:
+                offset = f.tell()
+                prefix = f.read(_RECORD.size)
+                if len(prefix) < _RECORD.size: return
+                header_len, payload_len = _RECORD.unpack(prefix)
+                data = f.read(header_len)
+                if len(data) < header_len: return
+                header = json.loads(data.decode("utf-8"))
+                if "index" in header: return
+                if payloads:
+                    payload = f.read(payload_len)
+                    if len(payload) < payload_len: return
+                else:
+                    payload = None; f.seek(payload_len, os.SEEK_CUR)
+                yield (header, payload, offset) if offsets else (header, payload)
+
+
+# Shared recorder used by the scenario runner
+frame_recorder = FrameRecorder()
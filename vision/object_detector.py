@@ -2,12 +2,654 @@
 
 import cv2
 import numpy as np
-from typing import Optional, Tuple, List
+from typing import Optional, Tuple, List, Sequence, Union
 import imutils # Ensure installed: pip install imutils
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
 
-# Import screen capture function relative to this file's location
-from . import screen_capture
+# Screen frames come through the capture service (direct capture unless it is running)
+from .capture_service import capture_service
+from .frame import Frame
+from .template_cache import template_cache
+from .tracker import tracker
+from .frame_gate import frame_gate, has_result
+from .detection_cache import detection_cache
+from .fft_match import FFTHaystack, FFT_MODES, prefer_fft, match_ccoeff_normed, spectrum_cache
+from .color_prefilter import color_prefilter
+from .dirty_tiles import correlation_cache, dirty_mask, dirty_rects, DIRTY_TILE_SIZE
+from persistence.detector_priors import detector_priors
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+def get_scales(
+    use_multiscale: bool = True,
+    scale_range: Tuple[float, float] = (0.7, 1.3),
+    scale_steps: int = 7
+) -> List[float]:
+    """Returns the list of template scales find_template checks for these settings."""
+    if use_multiscale and scale_steps > 1 and scale_range[0] < scale_range[1]:
+        return [float(s) for s in np.linspace(scale_range[0], scale_range[1], scale_steps)]
+    return [1.0] # Only check original scale
+
+# --- Coarse-to-fine (pyramid) settings ---
+DEFAULT_PYRAMID_LEVELS = 1
+PYRAMID_MIN_TEMPLATE_SIZE = 12 # Below this (coarse px) a scale falls back to the exhaustive search
+PYRAMID_CANDIDATE_SLACK = 0.15 # Coarse scores may be this far below threshold and still be refined
+PYRAMID_PEAK_MARGIN = 0.3 # Every coarse peak this close to the best one is refined (look-alikes score alike when coarse)
+PYRAMID_MAX_CANDIDATES = 16 # More peaks within the margin than this: search the scale at full resolution
+PYRAMID_TOLERANCE = 0.05 # Best refined score this far below the best coarse peak: search the scale at full resolution
+
+def _is_sqdiff(method) -> bool:
+    return method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]
+
+def _match_score(haystack: np.ndarray, template: np.ndarray, method) -> Tuple[float, Tuple[int, int]]:
+    """Runs matchTemplate once and returns (confidence, top_left) of the best peak."""
+    result = cv2.matchTemplate(haystack, template, method)
+    min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+    if _is_sqdiff(method):
+        return 1.0 - min_val, min_loc
+    return max_val, max_loc
+
+def _coarse_peaks(result: np.ndarray, method, min_score: float, count: int, suppress_w: int, suppress_h: int, margin: float = np.inf) -> List[Tuple[float, Tuple[int, int]]]:
+    """
+    Picks up to `count` separated (score, location) peaks from a coarse
+    correlation map, best first, scoring at least min_score and at most
+    `margin` below the best peak.
+    """
+    scores = 1.0 - result if _is_sqdiff(method) else result.copy()
+    peaks: List[Tuple[float, Tuple[int, int]]] = []
+    for _ in range(count):
+        _, max_val, _, max_loc = cv2.minMaxLoc(scores)
+        if max_val < min_score or (peaks and max_val < peaks[0][0] - margin): break
+        peaks.append((max_val, max_loc))
+        x, y = max_loc # Suppress the neighbourhood so the next peak is a different spot
+        scores[max(0, y - suppress_h):y + suppress_h + 1, max(0, x - suppress_w):x + suppress_w + 1] = -np.inf
+    return peaks
+
+def _match_scale_pyramid(
+    haystack: np.ndarray, coarse_haystack: np.ndarray, factor: float,
+    template: np.ndarray, coarse_template: np.ndarray, method, threshold: float
+) -> Optional[Tuple[float, Tuple[int, int]]]:
+    """
+    Coarse-to-fine match of one template variant. The refined result is an exact
+    full-resolution score inside small ROIs, so whenever the true peak is among
+    the coarse candidates it equals the exhaustive search result.
+
+    Downsampling blurs away what tells look-alikes apart, so the true peak need
+    not be the best coarse one: every coarse peak within PYRAMID_PEAK_MARGIN
+    of the best is refined. The scale is searched at full resolution instead
+    when that leaves too many candidates, or when the best refined score falls
+    more than PYRAMID_TOLERANCE below the best coarse peak (the coarse map
+    misled).
+    """
+    (h, w) = template.shape[:2]
+    (ch, cw) = coarse_template.shape[:2]
+    (haystack_h, haystack_w) = haystack.shape[:2]
+    coarse_result = cv2.matchTemplate(coarse_haystack, coarse_template, method)
+    peaks = _coarse_peaks(coarse_result, method, threshold - PYRAMID_CANDIDATE_SLACK, PYRAMID_MAX_CANDIDATES + 1, max(1, cw // 2), max(1, ch // 2), PYRAMID_PEAK_MARGIN)
+    if len(peaks) > PYRAMID_MAX_CANDIDATES:
+        return _match_score(haystack, template, method)
+
+    margin = int(np.ceil(1.0 / factor)) + 2 # Covers the position uncertainty of one coarse pixel
+    best: Optional[Tuple[float, Tuple[int, int]]] = None
+    for _, (cx, cy) in peaks:
+        x0 = max(0, int(cx / factor) - margin); y0 = max(0, int(cy / factor) - margin)
+        x1 = min(haystack_w, int(cx / factor) + margin + w); y1 = min(haystack_h, int(cy / factor) + margin + h)
+        if x1 - x0 < w or y1 - y0 < h: continue
+        confidence, (rx, ry) = _match_score(haystack[y0:y1, x0:x1], template, method)
+        if best is None or confidence > best[0]:
+            best = (confidence, (x0 + rx, y0 + ry))
+    if peaks and (best is None or best[0] < peaks[0][0] - PYRAMID_TOLERANCE):
+        return _match_score(haystack, template, method)
+    return best
+
+# --- Parallel matching engine ---
+# cv2.matchTemplate releases the GIL, so scales (and tiles of very large haystacks)
+# are spread across one shared thread pool.
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+TILE_MIN_PIXELS = 2560 * 1440 # Haystacks at least this large are split into tiles
+TILE_SIZE = 1024 # Result-map span of one tile, in pixels (tiles overlap by the template size)
+
+_max_workers = DEFAULT_WORKERS
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+def set_max_workers(workers: int):
+    """Sets the worker count of the shared matching pool (1 = serial matching)."""
+    global _max_workers
+    workers = max(1, int(workers))
+    with _pool_lock:
+        if workers != _max_workers:
+            _max_workers = workers
+            _shutdown_pool_locked()
+
+def get_max_workers() -> int:
+    return _max_workers
+
+def shutdown_pool():
+    """Stops the shared matching pool. It is recreated on the next parallel search."""
+    with _pool_lock:
+        _shutdown_pool_locked()
+
+def _shutdown_pool_locked():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=True)
+        _pool = None
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=_max_workers, thread_name_prefix="match")
+        return _pool
+
+def _tile_spans(length: int, template_length: int, tile_size: int) -> List[Tuple[int, int]]:
+    """
+    Splits the valid result positions [0, length - template_length] into spans of
+    at most tile_size. Each span (start, stop) needs haystack[start:stop + template_length - 1].
+    """
+    positions = length - template_length + 1
+    return [(start, min(start + tile_size, positions)) for start in range(0, positions, tile_size)]
+
+def _build_tiles(haystack_w: int, haystack_h: int, w: int, h: int, tile_size: int) -> List[Optional[Tuple[int, int, int, int]]]:
+    """Returns haystack slices (x0, y0, x1, y1) covering every match position exactly once."""
+    if haystack_w * haystack_h < TILE_MIN_PIXELS:
+        return [None] # Whole haystack in one piece
+    tiles = []
+    for (y0, y_stop) in _tile_spans(haystack_h, h, tile_size):
+        for (x0, x_stop) in _tile_spans(haystack_w, w, tile_size):
+            tiles.append((x0, y0, x_stop + w - 1, y_stop + h - 1))
+    return tiles
+
+def _run_task(task) -> Optional[Tuple[float, Tuple[int, int]]]:
+    """Runs one (scale, tile) matching task; returns (confidence, top_left) or None."""
+    kind, scale, haystack, template, extra, method, threshold = task
+    try:
+        if kind == "pyramid":
+            coarse_haystack, coarse_template, factor = extra
+            return _match_scale_pyramid(haystack, coarse_haystack, factor, template, coarse_template, method, threshold)
+        if kind == "fft":
+            fft_haystack, spectrum_key = extra
+            spectra, template_norm = spectrum_cache.get(spectrum_key, template, fft_haystack.size)
+            _, max_val, _, max_loc = cv2.minMaxLoc(match_ccoeff_normed(fft_haystack, template, spectra, template_norm))
+            return max_val, max_loc
+        if extra is None:
+            return _match_score(haystack, template, method)
+        x0, y0, x1, y1 = extra
+        confidence, (tx, ty) = _match_score(haystack[y0:y1, x0:x1], template, method)
+        return confidence, (x0 + tx, y0 + ty)
+    except cv2.error as e:
+        log.warning("OpenCV error during matchTemplate at scale %.2f: %s", scale, e)
+        return None
+
+# --- Scale ordering / early exit ---
+DEFAULT_CERTAIN_CONFIDENCE = 0.99 # A match this good ends the scale search immediately
+
+_search_info = threading.local()
+
+def get_last_search_stats() -> dict:
+    """
+    Stats of the last template search made by the calling thread:
+    scales_evaluated, scales_total and stop_reason ("exhausted", "certain",
+    "tracked", "unchanged" or "prefilter ...").
+    """
+    return dict(getattr(_search_info, "stats", {}))
+
+def _best_first_order(scales: List[float], start_scale: Optional[float]) -> List[int]:
+    """Indices of `scales`, starting at the one closest to start_scale (default 1.0) and working outward."""
+    if not scales: return []
+    target = 1.0 if start_scale is None else start_scale
+    start = int(np.argmin([abs(s - target) for s in scales]))
+    order = [start]
+    for step in range(1, len(scales)):
+        if start + step < len(scales): order.append(start + step)
+        if start - step >= 0: order.append(start - step)
+    return order
+
+def _fft_pays_off(haystack: np.ndarray, cached, fft_haystack: Optional[FFTHaystack], workers: int, start_scale: Optional[float], early_exit_confidence: Optional[float]) -> bool:
+    """
+    fft_mode "auto": asks the cost model of vision/fft_match.py about the
+    scales that are certainly searched. With early exit that is only the
+    first wave, which then carries the frame transform alone.
+    """
+    (haystack_h, haystack_w) = haystack.shape[:2]
+    fitting = [(scale, (t.shape[1], t.shape[0])) for scale, t in cached.variants if t.shape[1] <= haystack_w and t.shape[0] <= haystack_h]
+    sizes = [size for _, size in fitting]
+    expected = sizes if early_exit_confidence is None else [sizes[i] for i in _best_first_order([scale for scale, _ in fitting], start_scale)[:workers]]
+    return prefer_fft(haystack_w, haystack_h, frame_ready=fft_haystack is not None and fft_haystack.frame_ready, template_sizes=expected,
+                      channels=haystack.shape[2] if haystack.ndim == 3 else 1, variants=len(sizes))
+
+def _search_haystack(
+    haystack: np.ndarray,
+    cached,
+    threshold: float,
+    method,
+    offset: Tuple[int, int] = (0, 0),
+    use_pyramid: bool = False,
+    pyramid_levels: int = DEFAULT_PYRAMID_LEVELS,
+    warn_if_too_large: bool = False,
+    workers: Optional[int] = None,
+    coarse_haystack: Optional[Tuple[np.ndarray, float]] = None,
+    start_scale: Optional[float] = None,
+    early_exit_confidence: Optional[float] = DEFAULT_CERTAIN_CONFIDENCE,
+    fft_mode: str = "auto",
+    fft_haystack: Optional[FFTHaystack] = None
+) -> Optional[Tuple[int, int, int, int, float]]:
+    """
+    Searches an already captured and converted haystack for the scale variants
+    of a cached template.
+
+    Scales are visited best-first: from start_scale (the last scale that
+    matched, default 1.0) outward. With early_exit_confidence set, the search
+    runs in waves of `workers` scales and stops after a wave once a match
+    reaches that confidence. None evaluates every scale.
+
+    Only a certain match ends the search: a look-alike can win at the start
+    scale while the neighbouring scales score worse everywhere, and the real
+    target still be at a scale further out.
+
+    Scales and tiles run on the shared pool when more than one worker is
+    configured. Results are merged in evaluation order with a strict
+    greater-than, so the outcome does not depend on completion order.
+
+    `coarse_haystack` is an optional precomputed (image, factor) pair from
+    _make_coarse_haystack, so batch searches downsample the frame only once.
+
+    With TM_CCOEFF_NORMED, full-resolution scales use the frequency-domain
+    correlation of vision/fft_match.py when fft_mode is "always", or "auto"
+    and its cost model predicts it is cheaper. `fft_haystack` lets batch
+    searches share the frame spectrum.
+
+    Returns:
+        (x, y, w, h, confidence) of the best match above threshold, with `offset`
+        added to the position, or None.
+    """
+    (haystack_h, haystack_w) = haystack.shape[:2]
+    workers = _max_workers if workers is None else max(1, int(workers))
+
+    factor = 1.0
+    if use_pyramid:
+        if coarse_haystack is None: coarse_haystack = _make_coarse_haystack(haystack, pyramid_levels)
+        coarse_haystack, factor = coarse_haystack
+    else:
+        coarse_haystack = None
+
+    use_fft = method == cv2.TM_CCOEFF_NORMED and (fft_mode == "always" or (fft_mode == "auto" and _fft_pays_off(
+        haystack, cached, fft_haystack, workers, start_scale, early_exit_confidence)))
+    if use_fft and fft_haystack is None: fft_haystack = FFTHaystack(haystack)
+
+    # --- Build (scale, tile) tasks, grouped per scale ---
+    scale_tasks = []; scales = []
+    for scale, template in cached.variants:
+        (h, w) = template.shape[:2]
+        if w > haystack_w or h > haystack_h:
+            if warn_if_too_large: log.warning("Warning: Template (%sx%s) is larger than search area (%sx%s).", w, h, haystack_w, haystack_h)
+            continue
+
+        tasks = []
+        if coarse_haystack is not None and min(w, h) * factor >= PYRAMID_MIN_TEMPLATE_SIZE:
+            coarse_template = cached.get_coarse_variant(scale, template, factor)
+            if coarse_template.shape[0] <= coarse_haystack.shape[0] and coarse_template.shape[1] <= coarse_haystack.shape[1]:
+                tasks.append(("pyramid", scale, haystack, template, (coarse_haystack, coarse_template, factor), method, threshold))
+        if not tasks and use_fft:
+            spectrum_key = (cached.path, cached.mtime_ns, cached.use_grayscale, scale, fft_haystack.size)
+            tasks.append(("fft", scale, haystack, template, (fft_haystack, spectrum_key), method, threshold))
+        if not tasks:
+            tiles = _build_tiles(haystack_w, haystack_h, w, h, TILE_SIZE) if workers > 1 else [None]
+            tasks = [("full", scale, haystack, template, tile, method, threshold) for tile in tiles]
+        scale_tasks.append((tasks, (w, h))); scales.append(scale)
+
+    order = _best_first_order(scales, start_scale)
+    wave_size = workers if early_exit_confidence is not None else max(1, len(order))
+
+    best_match: Optional[Tuple[int, int, int, int, float]] = None
+    scale_confidence = {} # Position in `scales` -> best confidence at that scale
+    stop_reason = "exhausted"
+    for wave_start in range(0, len(order), wave_size):
+        wave = order[wave_start:wave_start + wave_size]
+        tasks = [task for i in wave for task in scale_tasks[i][0]]
+
+        # --- Run tasks (serially or on the shared pool) ---
+        if workers > 1 and len(tasks) > 1:
+            results = iter(list(_get_pool().map(_run_task, tasks)))
+        else:
+            results = iter([_run_task(task) for task in tasks])
+
+        # --- Deterministic merge: first strictly-best result in evaluation order wins ---
+        for i in wave:
+            (w, h) = scale_tasks[i][1]
+            scale_confidence[i] = -np.inf
+            for _ in scale_tasks[i][0]:
+                match = next(results)
+                if match is None: continue
+                confidence, top_left = match
+                scale_confidence[i] = max(scale_confidence[i], confidence)
+                if confidence >= threshold:
+                    if best_match is None or confidence > best_match[4]:
+                        best_match = (top_left[0] + offset[0], top_left[1] + offset[1], w, h, confidence)
+
+        # --- Early exit check ---
+        if early_exit_confidence is None or best_match is None or len(scale_confidence) == len(order): continue
+        if best_match[4] >= early_exit_confidence:
+            stop_reason = "certain"; break
+
+    _search_info.stats = {"scales_evaluated": len(scale_confidence), "scales_total": len(order), "stop_reason": stop_reason}
+    return best_match
+
+# --- Temporal tracking ---
+def _track_key(cached) -> tuple:
+    """Per template file version: a rewritten template starts over from scale 1.0."""
+    return (cached.path, cached.mtime_ns, cached.use_grayscale)
+
+def _scale_for_size(cached, w: int, h: int) -> float:
+    for scale, template in cached.variants:
+        if template.shape[1] == w and template.shape[0] == h: return scale
+    return 1.0
+
+def _search_with_tracking(
+    haystack: np.ndarray, cached, threshold: float, method, offset: Tuple[int, int],
+    use_tracking: bool, incremental: Optional[Tuple[Frame, tuple]] = None, **search_kwargs
+) -> Optional[Tuple[int, int, int, int, float]]:
+    """
+    _search_haystack with a local check first: if the template was found before
+    (and use_tracking is on), match only its last scale in a small window around
+    the predicted position. The full search runs only when that check misses,
+    starting from the last successful scale. With `incremental` set to
+    (frame, correlation cache key), it updates the cached correlation maps of
+    this search instead (see _search_incremental).
+    """
+    key = _track_key(cached)
+    window = tracker.get_search_window(key) if use_tracking else None
+    if window is not None:
+        state, (ax0, ay0, ax1, ay1) = window
+        template = next((t for scale, t in cached.variants if scale == state.scale), None)
+        (haystack_h, haystack_w) = haystack.shape[:2]
+        x0 = max(0, ax0 - offset[0]); y0 = max(0, ay0 - offset[1])
+        x1 = min(haystack_w, ax1 - offset[0]); y1 = min(haystack_h, ay1 - offset[1])
+        if template is not None and x1 - x0 >= template.shape[1] and y1 - y0 >= template.shape[0]:
+            try:
+                confidence, (tx, ty) = _match_score(haystack[y0:y1, x0:x1], template, method)
+            except cv2.error as e:
+                log.warning("OpenCV error during tracked match: %s", e); confidence = -1.0
+            if confidence >= threshold:
+                match = (x0 + tx + offset[0], y0 + ty + offset[1], template.shape[1], template.shape[0], confidence)
+                tracker.record_hit(key, match, state.scale, tracked=True)
+                _search_info.stats = {"scales_evaluated": 1, "scales_total": len(cached.variants), "stop_reason": "tracked"}
+                return match
+        tracker.record_miss()
+
+    # Full search; its result also seeds the best-first scale order of the next call
+    if incremental is not None:
+        best_match = _search_incremental(haystack, incremental[0], incremental[1], cached, threshold, method, offset, tracker.get_last_scale(key), search_kwargs.get("workers"))
+    else:
+        best_match = _search_haystack(haystack, cached, threshold, method, offset=offset, start_scale=tracker.get_last_scale(key), **search_kwargs)
+    if best_match:
+        tracker.record_hit(key, best_match, _scale_for_size(cached, best_match[2], best_match[3]), tracked=False)
+    return best_match
+
+def _search_with_prefilter(
+    haystack: np.ndarray, haystack_bgr: Optional[np.ndarray], template_path: str, cached, threshold: float, method,
+    offset: Tuple[int, int], use_tracking: bool, **search_kwargs
+) -> Optional[Tuple[int, int, int, int, float]]:
+    """
+    _search_with_tracking behind the color prefilter (vision/color_prefilter.py)
+    when a BGR copy of the frame is given: returns None without matching if no
+    part of the frame has the template's dominant colors, or matches only the
+    candidate areas if they are a small part of the frame.
+    """
+    signature = color_prefilter.get_signature(template_path) if haystack_bgr is not None else None
+    if haystack_bgr is not None and signature is None: color_prefilter.record_unsupported()
+    scales = [scale for scale, _ in cached.variants]
+    regions = color_prefilter.candidate_regions(haystack_bgr, signature, min(scales), max(scales)) if signature is not None and scales else None
+    if regions is None:
+        return _search_with_tracking(haystack, cached, threshold, method, offset, use_tracking, **search_kwargs)
+    if not regions:
+        _search_info.stats = {"scales_evaluated": 0, "scales_total": len(scales), "stop_reason": "prefilter"}
+        return None
+
+    # Candidate areas only; the shared full-frame helpers do not apply to crops
+    search_kwargs.pop("coarse_haystack", None); search_kwargs.pop("fft_haystack", None); search_kwargs.pop("incremental", None)
+    key = _track_key(cached); best_match = None; evaluated = 0
+    for (x0, y0, x1, y1) in regions:
+        match = _search_haystack(haystack[y0:y1, x0:x1], cached, threshold, method, offset=(offset[0] + x0, offset[1] + y0), start_scale=tracker.get_last_scale(key), **search_kwargs)
+        evaluated += get_last_search_stats().get("scales_evaluated", 0)
+        if match and (best_match is None or match[4] > best_match[4]): best_match = match
+    if best_match:
+        tracker.record_hit(key, best_match, _scale_for_size(cached, best_match[2], best_match[3]), tracked=False)
+    _search_info.stats = {"scales_evaluated": evaluated, "scales_total": len(scales) * len(regions), "stop_reason": f"prefilter, {len(regions)} area(s)"}
+    return best_match
+
+# --- Incremental correlation on dirty tiles ---
+def _correlation_map(task) -> np.ndarray:
+    haystack, template, method = task
+    return cv2.matchTemplate(haystack, template, method)
+
+def _search_incremental(
+    haystack: np.ndarray, frame: Frame, key: tuple, cached, threshold: float, method,
+    offset: Tuple[int, int], start_scale: Optional[float] = None, workers: Optional[int] = None
+) -> Optional[Tuple[int, int, int, int, float]]:
+    """
+    Exhaustive multi-scale search that keeps the full correlation map of every
+    scale in the correlation cache, together with the tile checksums of the
+    frame it was computed on. The next search with the same key recomputes
+    each map only at the positions whose template window touches a dirty
+    tile (the dirty tiles expanded by the template size) and reuses the rest,
+    so the result is that of a full search on the new frame.
+
+    Scales are merged best-first from start_scale with a strict greater-than,
+    as in _search_haystack without early exit.
+    """
+    (haystack_h, haystack_w) = haystack.shape[:2]
+    workers = _max_workers if workers is None else max(1, int(workers))
+    checksums = frame.tile_checksums(DIRTY_TILE_SIZE)
+    variants = [(scale, template) for scale, template in cached.variants if template.shape[1] <= haystack_w and template.shape[0] <= haystack_h]
+
+    entry = correlation_cache.take(key) # Taken out while updated in place; a concurrent search builds its own
+    mask = None
+    if entry is not None and entry["shape"] == haystack.shape and all(scale in entry["maps"] for scale, _ in variants):
+        mask = dirty_mask(entry["checksums"], checksums)
+    if mask is not None and mask.mean() > correlation_cache.max_dirty_fraction:
+        mask = None
+
+    if mask is None:
+        # --- Full build: one map per scale (on the shared pool when allowed) ---
+        tasks = [(haystack, template, method) for _, template in variants]
+        if workers > 1 and len(tasks) > 1: maps = list(_get_pool().map(_correlation_map, tasks))
+        else: maps = [_correlation_map(task) for task in tasks]
+        maps = {scale: result for (scale, _), result in zip(variants, maps)}
+        correlation_cache.record("full")
+    else:
+        # --- Partial update: only positions whose window overlaps a dirty tile ---
+        maps = entry["maps"]
+        dirty = int(mask.sum())
+        for (x0, y0, x1, y1) in dirty_rects(mask, DIRTY_TILE_SIZE, haystack.shape):
+            for scale, template in variants:
+                (h, w) = template.shape[:2]
+                px0 = max(0, x0 - w + 1); px1 = min(haystack_w - w + 1, x1)
+                py0 = max(0, y0 - h + 1); py1 = min(haystack_h - h + 1, y1)
+                if px1 > px0 and py1 > py0:
+                    maps[scale][py0:py1, px0:px1] = cv2.matchTemplate(haystack[py0:py1 + h - 1, px0:px1 + w - 1], template, method)
+        correlation_cache.record("partial" if dirty else "clean", dirty, mask.size)
+    correlation_cache.put(key, checksums, haystack.shape, maps)
+
+    # --- Deterministic merge over all scales ---
+    best_match: Optional[Tuple[int, int, int, int, float]] = None
+    for i in _best_first_order([scale for scale, _ in variants], start_scale):
+        scale, template = variants[i]
+        min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(maps[scale])
+        (confidence, top_left) = (1.0 - min_val, min_loc) if _is_sqdiff(method) else (max_val, max_loc)
+        if confidence >= threshold and (best_match is None or confidence > best_match[4]):
+            best_match = (top_left[0] + offset[0], top_left[1] + offset[1], template.shape[1], template.shape[0], confidence)
+    _search_info.stats = {"scales_evaluated": len(variants), "scales_total": len(cached.variants), "stop_reason": "dirty tiles"}
+    return best_match
+
+def _correlation_bytes(frame: Frame, cached) -> int:
+    """Size of the float32 correlation maps of all scales that fit the frame."""
+    (height, width) = frame.shape
+    return sum((height - t.shape[0] + 1) * (width - t.shape[1] + 1) * 4 for _, t in cached.variants if t.shape[0] <= height and t.shape[1] <= width)
+
+def _incremental_search(use_dirty_tiles: bool, frame: Frame, gate_key: tuple, search_key: tuple, cached) -> Optional[Tuple[Frame, tuple]]:
+    """
+    The `incremental` argument for _search_with_tracking: for searches whose
+    maps are kept, and from the second search with this key on if its maps
+    can be kept (see CorrelationCache.admit). Otherwise the normal search,
+    with early exit and FFT, runs.
+    """
+    if not use_dirty_tiles:
+        return None
+    key = (gate_key, search_key)
+    if correlation_cache.retained(key):
+        return (frame, key)
+    if not correlation_cache.seen_before(key):
+        return None
+    return (frame, key) if correlation_cache.admit(_correlation_bytes(frame, cached)) else None
+
+def get_dirty_tile_stats() -> dict:
+    """Correlation maps built in full, updated on dirty tiles only, or reused (see vision/dirty_tiles.py)."""
+    return correlation_cache.stats()
+
+def get_prefilter_stats() -> dict:
+    """How often the color prefilter rejected, restricted or passed a search (see vision/color_prefilter.py)."""
+    return color_prefilter.stats()
+
+def _apply_priors(template_path: str, cached, use_grayscale: bool, region: Optional[Tuple[int, int, int, int]], scales: List[float]):
+    """
+    Looks up the persisted prior of a template for this region size.
+
+    Returns:
+        (cached template for the narrowed scale set, prior key, sub-region
+        relative to the region or None). The template entry is unchanged when
+        the prior is too young or has widened after repeated misses.
+    """
+    region_size = (region[2], region[3]) if region else None
+    prior_key = detector_priors.make_key(cached.content_hash, region_size)
+    narrowed = detector_priors.suggest(prior_key, scales, region_size)
+    if not narrowed:
+        return cached, prior_key, None
+    narrowed_scales, sub_region = narrowed
+    return template_cache.get(template_path, use_grayscale, narrowed_scales) or cached, prior_key, sub_region
+
+def _record_priors(prior_key: str, cached, best_match: Optional[Tuple[int, int, int, int, float]], origin: Tuple[int, int]):
+    """Feeds a search result back into the persisted prior."""
+    if best_match:
+        scale = _scale_for_size(cached, best_match[2], best_match[3])
+        detector_priors.record_hit(prior_key, scale, (best_match[0] - origin[0], best_match[1] - origin[1], best_match[2], best_match[3]))
+    else:
+        detector_priors.record_miss(prior_key)
+
+def save_priors():
+    """Persists learned scale/region priors (no-op if nothing changed)."""
+    detector_priors.save()
+
+def get_tracking_stats() -> dict:
+    """Hit/miss counters of the temporal ROI tracker (see vision/tracker.py)."""
+    return tracker.stats()
+
+def get_change_gating_stats() -> dict:
+    """Searches skipped/evaluated because the captured region was (un)changed (see vision/frame_gate.py)."""
+    return frame_gate.stats()
+
+def _gated_search(gate_key: Optional[tuple], version: Optional[int], search_key: tuple, cached, search) -> Tuple[Optional[Tuple[int, int, int, int, float]], bool]:
+    """
+    Runs `search()` unless the same search already ran on an identical frame of
+    this region; returns (result, skipped). version None disables the gate.
+    """
+    if version is None:
+        return search(), False
+    previous = frame_gate.lookup(gate_key, version, search_key)
+    if has_result(previous):
+        _search_info.stats = {"scales_evaluated": 0, "scales_total": len(cached.variants), "stop_reason": "unchanged"}
+        return previous, True
+    result = search()
+    frame_gate.store(gate_key, version, search_key, result)
+    return result, False
+
+def _gate_search_key(
+    cached, threshold: float, method, use_pyramid: bool, pyramid_levels: int, sub_region=None, use_color_prefilter: bool = False,
+    early_exit_confidence: Optional[float] = DEFAULT_CERTAIN_CONFIDENCE, use_tracking: bool = True, use_dirty_tiles: bool = True
+) -> tuple:
+    """
+    Everything besides the frame that decides a search result. Early exit,
+    tracking and dirty tiles can change which match wins (e.g. a tracked hit
+    above threshold versus a better one elsewhere); workers and fft_mode cannot.
+    """
+    return (cached.path, cached.mtime_ns, tuple(s for s, _ in cached.variants), float(threshold), int(method), bool(use_pyramid), int(pyramid_levels), sub_region, bool(use_color_prefilter),
+            None if early_exit_confidence is None else float(early_exit_confidence), bool(use_tracking), bool(use_dirty_tiles))
+
+def get_detection_cache_stats() -> dict:
+    """Captures and searches answered from the short-lived frame/result cache (see vision/detection_cache.py)."""
+    return detection_cache.stats()
+
+def invalidate_detection_cache():
+    """Drops cached frames and results; call after clicks or other input that may change the screen."""
+    detection_cache.invalidate(); capture_service.invalidate()
+
+def _cached_search(region_key: tuple, frame_id: Optional[int], search_key: tuple, cached, search) -> Tuple[Optional[Tuple[int, int, int, int, float]], bool]:
+    """
+    Returns the result of the same search on the same captured frame if there
+    is one, else runs `search()` (which returns (result, skipped)) and stores
+    it. frame_id None disables the cache.
+    """
+    if frame_id is None:
+        return search()
+    previous = detection_cache.lookup(region_key, frame_id, search_key)
+    if has_result(previous):
+        _search_info.stats = {"scales_evaluated": 0, "scales_total": len(cached.variants), "stop_reason": "cached"}
+        return previous, True
+    result, skipped = search()
+    detection_cache.store(region_key, frame_id, search_key, result)
+    return result, skipped
+
+def _capture_frame(region: Optional[Tuple[int, int, int, int]], use_detection_cache: bool, frame: Optional[Frame] = None) -> Tuple[Optional[int], Optional[Frame]]:
+    """
+    Returns (frame id, Frame) of the screen/region. A capture younger than
+    the detection cache TTL is reused; frame id is None when the cache is not
+    used. The frame is None if the capture failed. While the capture service
+    runs, its buffered frames replace the cache's TTL-based reuse. A given
+    `frame` is cropped to the region instead of capturing (not cached).
+    """
+    if frame is not None:
+        view = frame.screen_view(region)
+        if view is None:
+            log.error("Error: Region %s is not inside the given frame %s.", region, frame.bounds)
+        return None, view
+    if use_detection_cache and not capture_service.running:
+        fresh = detection_cache.get_frame(region)
+        if fresh is not None:
+            return fresh
+    captured = _capture_screen(region)
+    if captured is None or not use_detection_cache:
+        return None, captured
+    return detection_cache.add_frame(region, captured, source_id=captured.frame_id), captured
+
+def _capture_screen(region: Optional[Tuple[int, int, int, int]]) -> Optional[Frame]:
+    """
+    Captures the screen/region; returns None on failure. A fresh buffered
+    frame (with its frame_id) is used while the capture service runs, else
+    the screen is captured directly (frame_id None).
+    """
+    captured = capture_service.grab_frame(region)
+    if captured is None:
+        log.error("Error: Failed to capture screen/region.")
+        return None
+    (haystack_h, haystack_w) = captured.shape
+    if haystack_h == 0 or haystack_w == 0:
+         log.error("Error: Captured screen/region has zero dimensions.")
+         return None
+    return captured
+
+def _make_coarse_haystack(haystack: np.ndarray, pyramid_levels: int) -> Tuple[np.ndarray, float]:
+    """Downsamples a haystack for the coarse pyramid pass; returns (image, factor)."""
+    factor = 0.5 ** max(1, int(pyramid_levels))
+    return cv2.resize(haystack, None, fx=factor, fy=factor, interpolation=cv2.INTER_AREA), factor
+
+def _frame_coarse_haystack(frame: Frame, use_grayscale: bool, pyramid_levels: int) -> Tuple[np.ndarray, float]:
+    """_make_coarse_haystack on a Frame; memoized, so reused frames are downsampled once."""
+    factor = 0.5 ** max(1, int(pyramid_levels))
+    return frame.downscaled(factor, use_grayscale), factor
 
 def find_template(
     template_path: str,
@@ -17,7 +659,19 @@ def find_template(
     use_grayscale: bool = True, # Default to grayscale
     use_multiscale: bool = True, # Default to multi-scale
     scale_range: Tuple[float, float] = (0.7, 1.3), # Scale range (e.g., 70% to 130%)
-    scale_steps: int = 7 # Number of scales to check (odd number recommended)
+    scale_steps: int = 7, # Number of scales to check (odd number recommended)
+    use_pyramid: bool = False, # Coarse-to-fine search (faster on large regions)
+    pyramid_levels: int = DEFAULT_PYRAMID_LEVELS,
+    workers: Optional[int] = None, # None = shared pool size (see set_max_workers)
+    use_tracking: bool = True, # Check near the last hit before the full search
+    early_exit_confidence: Optional[float] = DEFAULT_CERTAIN_CONFIDENCE, # None = always check every scale
+    use_priors: bool = False, # Narrow scales/region using persisted match history
+    use_change_gating: bool = True, # Reuse the last result if the region did not change
+    fft_mode: str = "auto", # "auto" (cost model), "always" or "never" use frequency-domain matching
+    use_color_prefilter: bool = False, # Skip areas that lack the template's dominant colors
+    use_detection_cache: bool = True, # Reuse a capture (and results on it) younger than the cache TTL
+    use_dirty_tiles: bool = True, # When polling, re-correlate only the parts of the region that changed
+    frame: Optional[Frame] = None # Search this frame instead of capturing
 ) -> Optional[Tuple[int, int, int, int, float]]:
     """
     Finds a template image using template matching.
@@ -33,6 +687,49 @@ def find_template(
         use_multiscale: Perform matching at different template scales.
         scale_range: Tuple (min_scale, max_scale) for multi-scale search.
         scale_steps: Number of scales to check within the range.
+        use_pyramid: Match a downsampled haystack/template first and re-match at
+                     full resolution only around the best coarse peaks.
+        pyramid_levels: Number of halvings for the coarse pass (1 = half size).
+        workers: Threads used for the scale/tile search. None uses the shared
+                 pool setting, 1 forces the serial loop.
+        use_tracking: First match the last successful scale in a small window
+                      around where this template was last found (plus its last
+                      motion); the full search only runs if that misses.
+        early_exit_confidence: Scales are checked best-first (from the last
+                      successful scale outward); stop once a match reaches this
+                      confidence. None checks every scale. See get_last_search_stats().
+        use_priors: Use the persisted history of this template (by content hash
+                    and region size) to check only the scales and the part of the
+                    region earlier matches came from. After repeated misses the
+                    full search is used again until the next hit.
+        use_change_gating: Compare the capture with the previous capture of the
+                    same region; if it is pixel-identical, return the result
+                    of the same search on that frame without matching again.
+                    See get_change_gating_stats().
+        fft_mode: For TM_CCOEFF_NORMED, correlate in the frequency domain with
+                  the frame and template spectra cached ("auto" decides per
+                  search with a cost model, see vision/fft_match.py).
+        use_color_prefilter: Compare the template's dominant colors with
+                  tiled color histograms of the frame first; return None
+                  right away if no area has them, or match only the areas
+                  that do. See get_prefilter_stats().
+        use_detection_cache: If this region was captured less than
+                  detection_cache.ttl_ms ago (and no input happened since,
+                  see invalidate_detection_cache), reuse that frame instead of
+                  capturing, and the result of an identical search on it.
+                  See get_detection_cache_stats().
+        use_dirty_tiles: From the second search of the same region and
+                  template on, keep the correlation map of every scale and
+                  recompute it only around the tiles of the region that
+                  changed since (checked with per-tile checksums). Every
+                  scale is evaluated, so early_exit_confidence and fft_mode
+                  do not apply then. Regions whose maps do not fit the
+                  memory budget are searched normally. Not combined with
+                  use_pyramid or use_color_prefilter. See get_dirty_tile_stats().
+        frame: An already captured Frame (see vision/frame.py) to search
+               instead of capturing; region, in screen coordinates, selects
+               a zero-copy view of it. Its gray/BGR conversions are
+               memoized, so several searches on one frame convert it once.
 
     Returns:
         A tuple (x, y, w, h, confidence) of the best match found above the
@@ -40,93 +737,330 @@ def find_template(
         Coordinates are absolute screen coordinates.
     """
     if not os.path.exists(template_path):
-        print(f"Error: Template file not found at '{template_path}'")
+        log.error("Error: Template file not found at '%s'", template_path)
+        return None
+    if fft_mode not in FFT_MODES:
+        log.error("Error: Invalid FFT mode '%s'. Use one of %s.", fft_mode, FFT_MODES)
         return None
 
     try:
-        # --- Load Template ---
-        img_mode = cv2.IMREAD_GRAYSCALE if use_grayscale else cv2.IMREAD_COLOR
-        template_orig = cv2.imread(template_path, img_mode)
-        if template_orig is None:
-            print(f"Error: Could not load template image at '{template_path}' (invalid format or permissions?).")
+        # --- Load Template (decoded image + resized variants come from the cache) ---
+        scales_to_check = get_scales(use_multiscale, scale_range, scale_steps)
+        cached = template_cache.get(template_path, use_grayscale, scales_to_check)
+        if cached is None:
             return None
-        (orig_h, orig_w) = template_orig.shape[:2]
+        (orig_h, orig_w) = cached.image.shape[:2]
         if orig_h == 0 or orig_w == 0:
-             print(f"Error: Template image '{template_path}' has zero dimensions.")
+             log.error("Error: Template image '%s' has zero dimensions.", template_path)
              return None
 
-        # --- Capture Screen/Region ---
-        haystack_bgr = screen_capture.capture(region)
-        if haystack_bgr is None:
-            print("Error: Failed to capture screen/region.")
-            return None
+        # --- Apply learned priors (narrower scale set and sub-region) ---
+        search_region = region; prior_key = None; sub_region = None
+        origin = (region[0], region[1]) if region else (0, 0)
+        if use_priors:
+            cached, prior_key, sub_region = _apply_priors(template_path, cached, use_grayscale, region, scales_to_check)
+            if sub_region: search_region = (origin[0] + sub_region[0], origin[1] + sub_region[1], sub_region[2], sub_region[3])
 
-        # --- Convert Haystack if needed ---
-        haystack = cv2.cvtColor(haystack_bgr, cv2.COLOR_BGR2GRAY) if use_grayscale else haystack_bgr
-        (haystack_h, haystack_w) = haystack.shape[:2]
-        if haystack_h == 0 or haystack_w == 0:
-             print("Error: Captured screen/region has zero dimensions.")
-             return None
+        # --- Capture Screen/Region (or reuse a fresh capture / view the given frame) ---
+        frame_id, haystack_frame = _capture_frame(search_region, use_detection_cache, frame)
+        if haystack_frame is None:
+            return None
+        search_key = _gate_search_key(cached, threshold, method, use_pyramid, pyramid_levels, None, use_color_prefilter, early_exit_confidence, use_tracking, use_dirty_tiles)
 
+        def search():
+            # Gray/BGR view of the frame (converted once per frame); the multi-scale loop is skipped if the region is unchanged
+            haystack = haystack_frame.image(use_grayscale)
+            gate_key = (search_region, bool(use_grayscale))
+            version = frame_gate.observe(gate_key, haystack) if use_change_gating else None
+            incremental = _incremental_search(use_dirty_tiles and not use_pyramid and not use_color_prefilter, haystack_frame, gate_key, search_key, cached)
+            return _gated_search(
+                gate_key, version, search_key, cached,
+                lambda: _search_with_prefilter(
+                    haystack, haystack_frame.bgr if use_color_prefilter else None, template_path, cached, threshold, method,
+                    haystack_frame.origin, use_tracking,
+                    use_pyramid=use_pyramid, pyramid_levels=pyramid_levels, warn_if_too_large=len(scales_to_check) == 1,
+                    workers=workers, early_exit_confidence=early_exit_confidence, fft_mode=fft_mode, incremental=incremental,
+                    coarse_haystack=_frame_coarse_haystack(haystack_frame, use_grayscale, pyramid_levels) if use_pyramid else None
+                )
+            )
+        best_match, skipped = _cached_search(search_region, frame_id, search_key + (bool(use_grayscale),), cached, search)
 
-        # --- Multi-Scale Loop (or single pass if disabled) ---
-        best_match: Optional[Tuple[int, int, int, int, float]] = None
+        # --- Update priors (a reused result adds no new evidence) ---
+        if prior_key is not None and not skipped:
+            _record_priors(prior_key, cached, best_match, origin)
 
-        if use_multiscale and scale_steps > 1 and scale_range[0] < scale_range[1]:
-            scales_to_check = np.linspace(scale_range[0], scale_range[1], scale_steps)
+        # --- Return Best Match ---
+        if best_match:
+            stats = get_last_search_stats()
+            log.debug("Object found: Conf=%.4f, Screen Coords=(%s,%s), Size=(%sx%s), Scales: %s/%s (%s)", best_match[4], best_match[0], best_match[1], best_match[2], best_match[3], stats.get('scales_evaluated'), stats.get('scales_total'), stats.get('stop_reason'))
+            return best_match
         else:
-            scales_to_check = [1.0] # Only check original scale
+            return None
 
-        for scale in scales_to_check:
-            # Resize template (ensure dimensions are valid)
-            new_w = int(orig_w * scale)
-            new_h = int(orig_h * scale)
+    except cv2.error as e:
+        log.error("OpenCV Error during template processing: %s", e)
+        return None
+    except Exception as e:
+        log.exception("Unexpected error during template matching: %s", e)
+        return None
 
-            if new_w <= 0 or new_h <= 0: continue
-            if new_w > haystack_w or new_h > haystack_h:
-                if len(scales_to_check) == 1: print(f"Warning: Template ({new_w}x{new_h}) is larger than search area ({haystack_w}x{haystack_h}).")
-                continue
+def find_templates(
+    template_paths: List[str],
+    region: Optional[Tuple[int, int, int, int]] = None,
+    threshold: Union[float, Sequence[float]] = 0.8,
+    method=cv2.TM_CCOEFF_NORMED,
+    use_grayscale: bool = True,
+    use_multiscale: bool = True,
+    scale_range: Tuple[float, float] = (0.7, 1.3),
+    scale_steps: int = 7,
+    use_pyramid: bool = False,
+    pyramid_levels: int = DEFAULT_PYRAMID_LEVELS,
+    workers: Optional[int] = None,
+    use_tracking: bool = True,
+    early_exit_confidence: Optional[float] = DEFAULT_CERTAIN_CONFIDENCE,
+    use_priors: bool = False,
+    use_change_gating: bool = True,
+    fft_mode: str = "auto",
+    use_color_prefilter: bool = False,
+    use_detection_cache: bool = True,
+    use_dirty_tiles: bool = True,
+    frame: Optional[Frame] = None
+) -> List[Optional[Tuple[int, int, int, int, float]]]:
+    """
+    Finds several templates in one captured frame.
+    The screen/region is captured and converted (and downsampled, in pyramid
+    mode, or transformed, for frequency-domain matching) once, then every
+    template is matched against the shared frame.
+
+    Args:
+        template_paths: Paths to the template image files.
+        region: Optional screen region (left, top, width, height) shared by all templates.
+        threshold: Minimum confidence, either one value for all templates or one per template.
+        use_priors: As in find_template; a learned sub-region is applied as a
+                    (zero-copy) crop of the shared frame.
+        use_change_gating: As in find_template; the shared frame is compared once
+                    and each template reuses its own previous result.
+        use_color_prefilter: As in find_template, per template on the shared BGR frame.
+        use_detection_cache: As in find_template; each template reuses its own
+                    result on a cached frame.
+        use_dirty_tiles: As in find_template, per template (not for templates
+                    searched in a learned sub-region).
+        frame: As in find_template; searched instead of capturing.
+        (remaining arguments as in find_template)
+
+    Returns:
+        A list with one entry per template path: (x, y, w, h, confidence) in
+        absolute screen coordinates, or None if that template was not found.
+    """
+    results: List[Optional[Tuple[int, int, int, int, float]]] = [None] * len(template_paths)
+    thresholds = [float(threshold)] * len(template_paths) if isinstance(threshold, (int, float)) else [float(t) for t in threshold]
+    if len(thresholds) != len(template_paths):
+        log.error("Error: Got %s thresholds for %s templates.", len(thresholds), len(template_paths))
+        return results
+    if not template_paths:
+        return results
+    if fft_mode not in FFT_MODES:
+        log.error("Error: Invalid FFT mode '%s'. Use one of %s.", fft_mode, FFT_MODES)
+        return results
 
-            interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
-            template = cv2.resize(template_orig, (new_w, new_h), interpolation=interpolation)
-            (h, w) = template.shape[:2]
+    try:
+        scales_to_check = get_scales(use_multiscale, scale_range, scale_steps)
+        frame_id, haystack_frame = _capture_frame(region, use_detection_cache, frame)
+        if haystack_frame is None:
+            return results
+        haystack = haystack_frame.image(use_grayscale)
+        haystack_bgr = haystack_frame.bgr if use_color_prefilter else None
+        coarse_haystack = _frame_coarse_haystack(haystack_frame, use_grayscale, pyramid_levels) if use_pyramid else None
+        fft_haystack = FFTHaystack(haystack) # Spectrum is computed on first use and shared by all templates
+        offset = haystack_frame.origin
+        gate_key = (region, bool(use_grayscale))
+        version = frame_gate.observe(gate_key, haystack) if use_change_gating else None
 
-            # --- Perform Template Matching ---
+        for i, template_path in enumerate(template_paths):
+            if not os.path.exists(template_path):
+                log.error("Error: Template file not found at '%s'", template_path)
+                continue
+            cached = template_cache.get(template_path, use_grayscale, scales_to_check)
+            if cached is None or cached.image.shape[0] == 0 or cached.image.shape[1] == 0:
+                continue
+            search_haystack = haystack; search_offset = offset; search_coarse = coarse_haystack; search_fft = fft_haystack
+            search_bgr = haystack_bgr
+            prior_key = None; sub_region = None; skipped = False
+            if use_priors:
+                cached, prior_key, sub_region = _apply_priors(template_path, cached, use_grayscale, region, scales_to_check)
+                if sub_region:
+                    sx, sy, sw, sh = sub_region
+                    search_haystack = haystack[sy:sy + sh, sx:sx + sw]
+                    search_offset = (offset[0] + sx, offset[1] + sy); search_coarse = None; search_fft = None
+                    if search_bgr is not None: search_bgr = search_bgr[sy:sy + sh, sx:sx + sw]
             try:
-                result = cv2.matchTemplate(haystack, template, method)
-                min_val, max_val, min_loc, max_loc = cv2.minMaxLoc(result)
+                search_key = _gate_search_key(cached, thresholds[i], method, use_pyramid, pyramid_levels, sub_region, use_color_prefilter, early_exit_confidence, use_tracking, use_dirty_tiles)
+                incremental = _incremental_search(use_dirty_tiles and not use_pyramid and not use_color_prefilter and not sub_region, haystack_frame, gate_key, search_key, cached)
+                results[i], skipped = _cached_search(
+                    region, frame_id, search_key + (bool(use_grayscale),), cached,
+                    lambda: _gated_search(
+                        gate_key, version, search_key, cached,
+                        lambda: _search_with_prefilter(
+                            search_haystack, search_bgr, template_path, cached, thresholds[i], method, search_offset, use_tracking,
+                            use_pyramid=use_pyramid, pyramid_levels=pyramid_levels, warn_if_too_large=len(scales_to_check) == 1,
+                            workers=workers, coarse_haystack=search_coarse, early_exit_confidence=early_exit_confidence,
+                            fft_mode=fft_mode, fft_haystack=search_fft, incremental=incremental
+                        )
+                    )
+                )
             except cv2.error as e:
-                 print(f"OpenCV error during matchTemplate at scale {scale:.2f}: {e}")
-                 continue
+                log.error("OpenCV Error while matching '%s': %s", template_path, e)
+            if prior_key is not None and not skipped:
+                _record_priors(prior_key, cached, results[i], offset)
+            if results[i]:
+                match = results[i]
+                stats = get_last_search_stats()
+                log.debug("Object found (%s): Conf=%.4f, Screen Coords=(%s,%s), Size=(%sx%s), Scales: %s/%s (%s)", os.path.basename(template_path), match[4], match[0], match[1], match[2], match[3], stats.get('scales_evaluated'), stats.get('scales_total'), stats.get('stop_reason'))
+        return results
 
-            if method in [cv2.TM_SQDIFF, cv2.TM_SQDIFF_NORMED]:
-                confidence = 1.0 - min_val; top_left = min_loc
-            else:
-                confidence = max_val; top_left = max_loc
+    except cv2.error as e:
+        log.error("OpenCV Error during batch template processing: %s", e)
+        return results
+    except Exception as e:
+        log.exception("Unexpected error during batch template matching: %s", e)
+        return results
 
-            # --- Update Best Match ---
-            if confidence >= threshold:
-                if best_match is None or confidence > best_match[4]:
-                    match_x_rel = top_left[0]; match_y_rel = top_left[1]
-                    match_x_abs = match_x_rel + (region[0] if region else 0)
-                    match_y_abs = match_y_rel + (region[1] if region else 0)
-                    best_match = (match_x_abs, match_y_abs, w, h, confidence)
+# --- Multi-match search ---
+FIND_ALL_SORT_KEYS = ["confidence", "top_to_bottom", "left_to_right"]
+FIND_ALL_MAX_CANDIDATES = 5000 # Per scale, strongest local maxima kept before NMS
 
-        # --- Return Best Match ---
-        if best_match:
-            print(f"Object found: Conf={best_match[4]:.4f}, Screen Coords=({best_match[0]},{best_match[1]}), Size=({best_match[2]}x{best_match[3]})")
-            return best_match
+def _scale_candidates(haystack: np.ndarray, template: np.ndarray, method, threshold: float) -> Optional[np.ndarray]:
+    """
+    Thresholds one scale's correlation map and returns its local maxima as an
+    (N, 5) float array of [x, y, w, h, confidence] rows (haystack coordinates).
+    """
+    (h, w) = template.shape[:2]
+    try:
+        result = cv2.matchTemplate(haystack, template, method)
+    except cv2.error as e:
+        log.warning("OpenCV error during matchTemplate (%sx%s): %s", w, h, e)
+        return None
+    scores = 1.0 - result if _is_sqdiff(method) else result
+    # A pixel is a candidate if it is above threshold and the maximum of its 3x3 neighbourhood
+    local_max = cv2.dilate(scores, np.ones((3, 3), np.uint8))
+    ys, xs = np.nonzero((scores >= threshold) & (scores >= local_max))
+    if xs.size == 0:
+        return None
+    confidences = scores[ys, xs]
+    if confidences.size > FIND_ALL_MAX_CANDIDATES:
+        keep = np.argpartition(-confidences, FIND_ALL_MAX_CANDIDATES)[:FIND_ALL_MAX_CANDIDATES]
+        xs, ys, confidences = xs[keep], ys[keep], confidences[keep]
+    return np.column_stack([xs, ys, np.full(xs.shape, w), np.full(xs.shape, h), confidences]).astype(np.float64)
+
+def _non_max_suppression(candidates: np.ndarray, overlap_threshold: float) -> np.ndarray:
+    """
+    Greedy NMS over [x, y, w, h, confidence] rows: keeps the most confident box and
+    drops every remaining box whose IoU with it exceeds overlap_threshold. Overlaps
+    are computed for all remaining boxes at once with NumPy.
+    """
+    if candidates.shape[0] == 0:
+        return candidates
+    x1 = candidates[:, 0]; y1 = candidates[:, 1]
+    x2 = x1 + candidates[:, 2]; y2 = y1 + candidates[:, 3]
+    areas = candidates[:, 2] * candidates[:, 3]
+    # Stable sort so equal-confidence candidates keep scale/scan order (deterministic output)
+    order = np.argsort(-candidates[:, 4], kind="stable")
+    keep: List[int] = []
+    while order.size > 0:
+        i = order[0]; keep.append(i); rest = order[1:]
+        inter_w = np.clip(np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]), 0, None)
+        inter_h = np.clip(np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]), 0, None)
+        intersection = inter_w * inter_h
+        iou = intersection / (areas[i] + areas[rest] - intersection)
+        order = rest[iou <= overlap_threshold]
+    return candidates[keep]
+
+def find_all(
+    template_path: str,
+    region: Optional[Tuple[int, int, int, int]] = None,
+    threshold: float = 0.8,
+    method=cv2.TM_CCOEFF_NORMED,
+    use_grayscale: bool = True,
+    use_multiscale: bool = True,
+    scale_range: Tuple[float, float] = (0.7, 1.3),
+    scale_steps: int = 7,
+    sort_by: str = "confidence",
+    overlap_threshold: float = 0.3,
+    max_results: int = 0,
+    workers: Optional[int] = None,
+    use_detection_cache: bool = True,
+    frame: Optional[Frame] = None
+) -> List[Tuple[int, int, int, int, float]]:
+    """
+    Finds every instance of a template in one capture.
+    All scales are thresholded, their peaks merged and de-duplicated with
+    non-maximum suppression, so overlapping hits across scales count once.
+
+    Args:
+        template_path: Path to the template image file.
+        region: Optional screen region (left, top, width, height) to search within.
+        threshold: Minimum matching confidence for a hit.
+        sort_by: "confidence" (best first), "top_to_bottom" (rows, then left to
+                 right) or "left_to_right" (columns, then top to bottom).
+        overlap_threshold: Boxes overlapping a better hit by more than this IoU are dropped.
+        max_results: Maximum number of matches to return (0 = all).
+        use_detection_cache: Reuse a fresh capture of the region (see find_template).
+        frame: Search this Frame instead of capturing (see find_template).
+        (remaining arguments as in find_template)
+
+    Returns:
+        A list of (x, y, w, h, confidence) tuples in absolute screen coordinates,
+        ordered by `sort_by`. Empty if nothing was found.
+    """
+    if sort_by not in FIND_ALL_SORT_KEYS:
+        log.error("Error: Invalid sort key '%s'. Use one of %s.", sort_by, FIND_ALL_SORT_KEYS)
+        return []
+    if not os.path.exists(template_path):
+        log.error("Error: Template file not found at '%s'", template_path)
+        return []
+
+    try:
+        scales_to_check = get_scales(use_multiscale, scale_range, scale_steps)
+        cached = template_cache.get(template_path, use_grayscale, scales_to_check)
+        if cached is None:
+            return []
+        _, haystack_frame = _capture_frame(region, use_detection_cache, frame)
+        if haystack_frame is None:
+            return []
+        haystack = haystack_frame.image(use_grayscale)
+        (haystack_h, haystack_w) = haystack.shape[:2]
+
+        templates = [t for _, t in cached.variants if t.shape[1] <= haystack_w and t.shape[0] <= haystack_h]
+        tasks = [(haystack, t, method, threshold) for t in templates]
+        workers = _max_workers if workers is None else max(1, int(workers))
+        if workers > 1 and len(tasks) > 1:
+            per_scale = list(_get_pool().map(lambda task: _scale_candidates(*task), tasks))
         else:
-            return None
+            per_scale = [_scale_candidates(*task) for task in tasks]
+        per_scale = [c for c in per_scale if c is not None]
+        if not per_scale:
+            return []
+
+        matches = _non_max_suppression(np.vstack(per_scale), overlap_threshold)
+        if sort_by == "top_to_bottom":
+            matches = matches[np.lexsort((matches[:, 0], matches[:, 1]))]
+        elif sort_by == "left_to_right":
+            matches = matches[np.lexsort((matches[:, 1], matches[:, 0]))]
+        # "confidence": NMS already returns best-first
+        if max_results > 0:
+            matches = matches[:max_results]
+
+        (offset_x, offset_y) = haystack_frame.origin
+        results = [(int(m[0]) + offset_x, int(m[1]) + offset_y, int(m[2]), int(m[3]), float(m[4])) for m in matches]
+        log.info("Found %s match(es) for '%s'.", len(results), os.path.basename(template_path))
+        return results
 
     except cv2.error as e:
-        print(f"OpenCV Error during template processing: {e}")
-        return None
+        log.error("OpenCV Error during multi-match processing: %s", e)
+        return []
     except Exception as e:
-        print(f"Unexpected error during template matching: {e}")
-        import traceback
-        traceback.print_exc()
-        return None
+        log.exception("Unexpected error during multi-match search: %s", e)
+        return []
 
 # --- Example Usage ---
 if __name__ == '__main__':
@@ -0,0 +1,88 @@
+# vision/pixel_color.py
+
+import cv2
+import numpy as np
+from typing import Optional, Tuple
+
+from .capture_service import capture_service
+from .frame import Frame
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+def parse_color(color) -> Tuple[int, int, int]:
+    """Accepts an (r, g, b) sequence or a '#rrggbb' / 'r,g,b' string; returns an (r, g, b) tuple."""
+    if isinstance(color, str):
+        text = color.strip()
+        if text.startswith("#") and len(text) == 7:
+            return tuple(int(text[i:i + 2], 16) for i in (1, 3, 5))
+        color = [p.strip() for p in text.split(",")]
+    rgb = tuple(int(c) for c in color)
+    if len(rgb) != 3 or not all(0 <= c <= 255 for c in rgb):
+        raise ValueError(f"Invalid color: {color!r} (expected R,G,B with values 0-255)")
+    return rgb
+
+def _bounds(color_rgb: Tuple[int, int, int], tolerance: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Per-channel inclusive BGR bounds for cv2.inRange."""
+    bgr = np.array(color_rgb[::-1], dtype=np.int16)
+    return np.clip(bgr - tolerance, 0, 255).astype(np.uint8), np.clip(bgr + tolerance, 0, 255).astype(np.uint8)
+
+def _region_frame(region: Optional[Tuple[int, int, int, int]], frame: Optional[Frame]) -> Optional[Frame]:
+    """View of `region` in `frame`, or a new capture of it if no frame is given."""
+    if frame is None:
+        return capture_service.grab_frame(region)
+    view = frame.screen_view(region)
+    if view is None: log.error("Error: Region %s is not inside the given frame %s.", region, frame.bounds)
+    return view
+
+def get_pixel(x: int, y: int, frame: Optional[Frame] = None) -> Optional[Tuple[int, int, int]]:
+    """Captures a single screen pixel (or reads it from `frame`) and returns its (r, g, b), or None on failure."""
+    frame = _region_frame((x, y, 1, 1), frame)
+    if frame is None or frame.raw.size == 0 or frame.raw.ndim != 3:
+        return None
+    b, g, r = (int(v) for v in frame.raw[0, 0, :3]) # BGR(A) channel order; no conversion needed for one pixel
+    return (r, g, b)
+
+def pixel_matches(x: int, y: int, color_rgb: Tuple[int, int, int], tolerance: int = 0, frame: Optional[Frame] = None) -> Tuple[bool, Optional[Tuple[int, int, int]]]:
+    """
+    Checks whether the screen pixel at (x, y) is within `tolerance` (per channel)
+    of color_rgb. Returns (matches, actual (r, g, b) or None if capture failed).
+    """
+    actual = get_pixel(x, y, frame)
+    if actual is None:
+        return False, None
+    return all(abs(a - c) <= tolerance for a, c in zip(actual, color_rgb)), actual
+
+def find_color(
+    color_rgb: Tuple[int, int, int],
+    region: Optional[Tuple[int, int, int, int]] = None,
+    tolerance: int = 0,
+    frame: Optional[Frame] = None
+) -> Optional[Tuple[int, int]]:
+    """
+    Finds the first pixel (top to bottom, then left to right) of a color.
+
+    Args:
+        color_rgb: Target color (r, g, b).
+        region: Optional screen region (left, top, width, height) to search
+                within. If None, searches the primary monitor.
+        tolerance: Maximum per-channel difference still counted as a match.
+        frame: Search this Frame instead of capturing (region selects a view of it).
+
+    Returns:
+        The absolute screen coordinates (x, y) of the first matching pixel, or
+        None if the color is not present (or the capture failed).
+    """
+    haystack_frame = _region_frame(region, frame)
+    if haystack_frame is None or haystack_frame.raw.size == 0:
+        log.error("Error: Failed to capture screen/region.")
+        return None
+    haystack = haystack_frame.bgr
+    lower, upper = _bounds(color_rgb, tolerance)
+    mask = cv2.inRange(haystack, lower, upper) # One vectorized pass, 255 where all channels are in range
+    index = int(np.argmax(mask)) # First nonzero in row-major order (0 if there is none)
+    if mask.flat[index] == 0:
+        return None
+    (_, width) = mask.shape[:2]
+    y, x = divmod(index, width)
+    return (x + haystack_frame.origin[0], y + haystack_frame.origin[1])
@@ -1,12 +1,106 @@
 # vision/screen_capture.py
 
+import threading
+import weakref
 import numpy as np
 import mss
 import cv2 # For converting color format
-from typing import Optional, Tuple
+from typing import Optional, Tuple, Dict, Any
+from core.log import get_logger
+from .frame import Frame
+
+log = get_logger(__name__)
+
+
+class CaptureSession:
+    """
+    Long-lived mss handle plus the primary monitor lookup.
+
+    mss handles must not be shared between threads (they hold per-thread
+    display/device contexts), so each thread gets its own session through
+    get_session(). Creating the handle once per thread instead of once per
+    capture removes the setup/teardown cost from every grab.
+    """
+
+    def __init__(self):
+        self._sct = mss.mss()
+        self._monitor: Optional[Dict[str, int]] = None
+        self.thread_name = threading.current_thread().name
+        self.captures = 0
+        # Releases the handle when the owning thread ends and the session is dropped
+        self._finalizer = weakref.finalize(self, self._sct.close)
+
+    def primary_monitor(self) -> Optional[Dict[str, Any]]:
+        """Primary monitor geometry, looked up once per session (see refresh_monitors)."""
+        if self._monitor is None:
+            monitors = self._sct.monitors
+            # monitors[0] is the virtual screen bounding all monitors, monitors[1] the primary one
+            if len(monitors) > 1: self._monitor = monitors[1]
+            elif len(monitors) == 1: self._monitor = monitors[0] # Only the virtual screen exists? Use it.
+        return self._monitor
+
+    def refresh_monitors(self):
+        """Forgets the cached monitor lookup (e.g. after a resolution change)."""
+        self._monitor = None
+
+    def grab_frame(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Frame]:
+        """Captures `region` (left, top, width, height) or the primary monitor as a Frame wrapping the BGRA bytes."""
+        if region:
+            monitor = {"top": int(region[1]), "left": int(region[0]), "width": int(region[2]), "height": int(region[3])}
+            if monitor["width"] <= 0 or monitor["height"] <= 0:
+                log.error("Error: Invalid capture region dimensions: %s", monitor)
+                return None
+        else:
+            monitor = self.primary_monitor()
+            if monitor is None:
+                log.error("Error: No monitors found by mss.")
+                return None
+        sct_img = self._sct.grab(monitor)
+        self.captures += 1
+        return Frame.from_screenshot(sct_img, (monitor["left"], monitor["top"]))
+
+    def grab(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
+        """Captures `region` or the primary monitor as a BGR array."""
+        frame = self.grab_frame(region)
+        return frame.bgr if frame is not None else None
+
+    @property
+    def closed(self) -> bool:
+        return not self._finalizer.alive
+
+    def close(self):
+        """Releases the mss handle (idempotent)."""
+        self._finalizer()
+
+
+_local = threading.local()
+_sessions: "weakref.WeakSet[CaptureSession]" = weakref.WeakSet()
+_sessions_lock = threading.Lock()
+
+
+def get_session() -> CaptureSession:
+    """Returns the calling thread's capture session, creating it on first use."""
+    session = getattr(_local, "session", None)
+    if session is None or session.closed:
+        session = CaptureSession(); _local.session = session
+        with _sessions_lock: _sessions.add(session)
+        log.debug("Opened capture session for thread '%s'.", session.thread_name)
+    return session
+
+
+def close_session():
+    """Closes the calling thread's session; the next capture opens a new one."""
+    session = getattr(_local, "session", None)
+    if session is not None:
+        session.close(); _local.session = None
+
+
+def close_all_sessions():
+    """Closes every open session (call on shutdown). Threads that capture again get a new one."""
+    with _sessions_lock:
+        sessions = list(_sessions); _sessions.clear()
+    for session in sessions: session.close()
 
-# REMOVE the global sct instance:
-# sct = mss.mss() # <--- REMOVE THIS LINE
 
 def capture(region: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.ndarray]:
     """
@@ -20,51 +114,92 @@ def capture(region: Optional[Tuple[int, int, int, int]] = None) -> Optional[np.n
         A NumPy array representing the captured image in BGR format (compatible with OpenCV),
         or None if capture fails.
     """
-    try:
-        # --- Create mss instance INSIDE the function ---
-        with mss.mss() as sct: # Use context manager for cleanup
-            if region:
-                # Ensure region values are integers
-                monitor = {
-                    "top": int(region[1]),
-                    "left": int(region[0]),
-                    "width": int(region[2]),
-                    "height": int(region[3])
-                }
-                if monitor["width"] <= 0 or monitor["height"] <= 0:
-                     print(f"Error: Invalid capture region dimensions: {monitor}")
-                     return None
-            else:
-                # Capture primary monitor by default if no region specified
-                # mss.monitors[0] is the virtual screen bounding all monitors
-                # mss.monitors[1] is the primary monitor
-                if len(sct.monitors) > 1:
-                    monitor = sct.monitors[1]
-                elif len(sct.monitors) == 1: # Only the virtual screen exists? Use it.
-                     monitor = sct.monitors[0]
-                else:
-                     print("Error: No monitors found by mss.")
-                     return None
-
-
-            # Grab the data
-            sct_img = sct.grab(monitor)
-
-            # Convert to NumPy array
-            img = np.array(sct_img)
-
-            # Convert BGRA to BGR for OpenCV processing
-            img_bgr = cv2.cvtColor(img, cv2.COLOR_BGRA2BGR)
-
-            return img_bgr
-
-    except Exception as e:
-        # Provide more context if possible
-        print(f"Error during screen capture (Region: {region}): {e}")
-        # import traceback
-        # traceback.print_exc() # Uncomment for detailed stack trace if needed
+    frame = capture_frame(region)
+    return frame.bgr if frame is not None else None
+
+
+def capture_frame(region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Frame]:
+    """
+    Like capture(), but returns a Frame around the raw BGRA capture (no copy,
+    no conversion). Detectors take the gray/BGR views they need from it.
+    Frames come from the current capture backend (see set_backend).
+    """
+    return _backend.capture_frame(region)
+
+
+class CaptureBackend:
+    """
+    Source of captured frames. Everything that captures (capture(),
+    capture_frame(), the capture service, the detectors) goes through the
+    backend set with set_backend(), so scenarios can run against recorded
+    screens instead of the live one (see vision/capture_backends.py).
+
+    live is False for backends that do not show the real screen; the scenario
+    runner then does not send input and ignores the target window.
+    """
+
+    live = True
+    name = "backend"
+
+    def capture_frame(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Frame]:
+        """Returns `region` (left, top, width, height) or the whole screen as a Frame, or None on failure."""
+        raise NotImplementedError
+
+    def screen_rect(self) -> Optional[Tuple[int, int, int, int]]:
+        """Bounds of the full-screen frame (left, top, width, height), if known."""
         return None
 
+    def close(self):
+        """Releases whatever the backend holds open (idempotent)."""
+
+    def __repr__(self) -> str:
+        return f"<{type(self).__name__} {self.name}>"
+
+
+class MssBackend(CaptureBackend):
+    """The live screen through the calling thread's mss CaptureSession (the default backend)."""
+
+    name = "mss"
+
+    def capture_frame(self, region: Optional[Tuple[int, int, int, int]] = None) -> Optional[Frame]:
+        try:
+            return get_session().grab_frame(region)
+        except Exception as e:
+            # Provide more context if possible
+            log.error("Error during screen capture (Region: %s): %s", region, e)
+            # The handle may be stale (display change, lost device context): start over on the next call
+            close_session()
+            return None
+
+    def screen_rect(self) -> Optional[Tuple[int, int, int, int]]:
+        monitor = get_session().primary_monitor()
+        return (monitor["left"], monitor["top"], monitor["width"], monitor["height"]) if monitor else None
+
+    def close(self):
+        close_all_sessions()
+
+
+_default_backend = MssBackend()
+_backend: CaptureBackend = _default_backend
+
+
+def get_backend() -> CaptureBackend:
+    return _backend
+
+
+def set_backend(backend: Optional[CaptureBackend]) -> CaptureBackend:
+    """
+    Makes `backend` the source of all captures (None restores the mss default)
+    and returns the previous one, so callers can put it back. The previous
+    backend is not closed.
+    """
+    global _backend
+    previous = _backend
+    _backend = backend if backend is not None else _default_backend
+    if _backend is not previous: log.info("Capture backend: %r", _backend)
+    return previous
+
+
 # Example Usage (Keep as is for testing)
 if __name__ == '__main__':
     import time
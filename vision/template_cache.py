@@ -0,0 +1,183 @@
+# vision/template_cache.py
+
+import os
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional, Tuple, List, Dict
+
+import cv2
+import numpy as np
+from core.log import get_logger
+
+log = get_logger(__name__)
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024 # 64 MB of decoded + resized templates
+
+
+@dataclass
+class CachedTemplate:
+    """A decoded template and its precomputed resized variants."""
+    path: str
+    mtime_ns: int
+    use_grayscale: bool
+    image: np.ndarray
+    content_hash: str = "" # SHA-1 of the file bytes, stable across renames/moves
+    # (scale, resized image) pairs in the order the scales were requested.
+    # Scales that would produce an empty image are left out.
+    variants: List[Tuple[float, np.ndarray]] = field(default_factory=list)
+    # Downsampled copies of the variants for coarse (pyramid) matching, keyed by (scale, factor).
+    # Filled lazily; at most a quarter of the variant size each, so not counted in nbytes.
+    coarse_variants: Dict[Tuple[float, float], np.ndarray] = field(default_factory=dict)
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.image.nbytes + sum(v.nbytes for _, v in self.variants))
+
+    def get_coarse_variant(self, scale: float, template: np.ndarray, factor: float) -> np.ndarray:
+        """Returns the variant for `scale` shrunk by `factor`, computing it once per entry."""
+        key = (scale, factor)
+        coarse = self.coarse_variants.get(key)
+        if coarse is None:
+            (h, w) = template.shape[:2]
+            size = (max(1, int(round(w * factor))), max(1, int(round(h * factor))))
+            coarse = cv2.resize(template, size, interpolation=cv2.INTER_AREA)
+            coarse.setflags(write=False)
+            self.coarse_variants[key] = coarse # Benign race: identical value if two threads compute it
+        return coarse
+
+
+def _resize_for_scale(image: np.ndarray, scale: float) -> Optional[np.ndarray]:
+    """Resizes a template for one scale step, or None if it collapses to nothing."""
+    (orig_h, orig_w) = image.shape[:2]
+    new_w = int(orig_w * scale); new_h = int(orig_h * scale)
+    if new_w <= 0 or new_h <= 0: return None
+    if new_w == orig_w and new_h == orig_h: return image
+    interpolation = cv2.INTER_AREA if scale < 1.0 else cv2.INTER_LINEAR
+    return cv2.resize(image, (new_w, new_h), interpolation=interpolation)
+
+
+class TemplateCache:
+    """
+    Thread-safe LRU cache of decoded templates and their scaled variants.
+
+    Entries are keyed by (path, file mtime, grayscale mode, scale set). The file
+    is stat'ed on every lookup, so a template edited on disk is reloaded on the
+    next call and its stale entries are dropped. Eviction is least-recently-used
+    against a byte budget covering the decoded image plus all resized variants.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.max_bytes = max(0, int(max_bytes))
+        self._entries: "OrderedDict[tuple, CachedTemplate]" = OrderedDict()
+        self._mtimes: Dict[str, int] = {}
+        self._current_bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, template_path: str, use_grayscale: bool, scales) -> Optional[CachedTemplate]:
+        """
+        Returns the cached template for the given path/mode/scale set, loading
+        and resizing it on a miss.
+
+        Args:
+            template_path: Path to the template image file.
+            use_grayscale: Load the template as grayscale instead of BGR.
+            scales: Iterable of scale factors to precompute.
+
+        Returns:
+            A CachedTemplate, or None if the file is missing or cannot be decoded.
+        """
+        path = os.path.abspath(template_path)
+        try:
+            mtime_ns = os.stat(path).st_mtime_ns
+        except OSError:
+            with self._lock: self._drop_path(path)
+            return None
+
+        scale_key = tuple(round(float(s), 6) for s in scales)
+        key = (path, mtime_ns, bool(use_grayscale), scale_key)
+
+        with self._lock:
+            if self._mtimes.get(path, mtime_ns) != mtime_ns:
+                self._drop_path(path) # File changed on disk since it was cached
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key); self.hits += 1
+                return entry
+            self.misses += 1
+            base_entry = self._find_base_entry(path, mtime_ns, bool(use_grayscale))
+
+        # Decode/resize outside the lock so other threads are not blocked on disk I/O
+        if base_entry is not None:
+            base = base_entry.image; content_hash = base_entry.content_hash
+        else:
+            try:
+                with open(path, 'rb') as f: data = f.read()
+            except OSError as e:
+                log.error("Error: Could not read template image at '%s': %s", template_path, e)
+                return None
+            content_hash = hashlib.sha1(data).hexdigest()
+            img_mode = cv2.IMREAD_GRAYSCALE if use_grayscale else cv2.IMREAD_COLOR
+            base = cv2.imdecode(np.frombuffer(data, np.uint8), img_mode) if data else None
+            if base is None:
+                log.error("Error: Could not load template image at '%s' (invalid format or permissions?).", template_path)
+                return None
+            base.setflags(write=False)
+
+        variants: List[Tuple[float, np.ndarray]] = []
+        for scale in scale_key:
+            resized = _resize_for_scale(base, scale)
+            if resized is None: continue
+            resized.setflags(write=False)
+            variants.append((scale, resized))
+
+        entry = CachedTemplate(path=path, mtime_ns=mtime_ns, use_grayscale=bool(use_grayscale), image=base, content_hash=content_hash, variants=variants)
+        with self._lock:
+            if self._mtimes.get(path, mtime_ns) != mtime_ns: self._drop_path(path)
+            existing = self._entries.pop(key, None)
+            if existing is not None: self._current_bytes -= existing.nbytes
+            self._entries[key] = entry
+            self._mtimes[path] = mtime_ns
+            self._current_bytes += entry.nbytes
+            self._evict(keep=key)
+        return entry
+
+    def invalidate(self, template_path: Optional[str] = None):
+        """Drops cached entries for one template, or everything if no path is given."""
+        with self._lock:
+            if template_path is None:
+                self._entries.clear(); self._mtimes.clear(); self._current_bytes = 0
+            else:
+                self._drop_path(os.path.abspath(template_path))
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"entries": len(self._entries), "bytes": self._current_bytes, "max_bytes": self.max_bytes, "hits": self.hits, "misses": self.misses}
+
+    # --- Internal helpers (caller must hold the lock) ---
+    def _find_base_entry(self, path: str, mtime_ns: int, use_grayscale: bool) -> Optional[CachedTemplate]:
+        """Finds another scale set of the same file so its decoded image can be reused."""
+        for (e_path, e_mtime, e_gray, _), entry in self._entries.items():
+            if e_path == path and e_mtime == mtime_ns and e_gray == use_grayscale:
+                return entry
+        return None
+
+    def _drop_path(self, path: str):
+        for key in [k for k in self._entries if k[0] == path]:
+            self._current_bytes -= self._entries.pop(key).nbytes
+        self._mtimes.pop(path, None)
+
+    def _evict(self, keep: tuple):
+        while self._current_bytes > self.max_bytes and len(self._entries) > 1:
+            oldest_key = next(iter(self._entries))
+            if oldest_key == keep: # Never evict the entry that was just inserted
+                self._entries.move_to_end(oldest_key); oldest_key = next(iter(self._entries))
+                if oldest_key == keep: break
+            self._current_bytes -= self._entries.pop(oldest_key).nbytes
+
+
+# Shared cache used by object_detector
+template_cache = TemplateCache()
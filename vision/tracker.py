@@ -0,0 +1,95 @@
+# vision/tracker.py
+
+import threading
+from dataclasses import dataclass
+from typing import Optional, Tuple, Dict
+
+TRACK_MARGIN = 24 # Pixels searched around the predicted position (plus the last motion)
+
+
+@dataclass
+class TrackState:
+    """Where a template was last found (absolute screen coords) and how it moved."""
+    x: int
+    y: int
+    w: int
+    h: int
+    scale: float
+    dx: int = 0 # Motion between the last two tracked hits
+    dy: int = 0
+
+
+class TemplateTracker:
+    """
+    Remembers the last match of each template so the next search can start with
+    a small matchTemplate call around the predicted spot at the last scale.
+
+    Counters:
+        hits:   the local check found the template (full search skipped)
+        misses: the local check failed and the full search ran
+        cold:   no previous match was known, the full search ran directly
+    """
+
+    def __init__(self, margin: int = TRACK_MARGIN):
+        self.margin = margin
+        self._states: Dict[tuple, TrackState] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.cold = 0
+
+    def get_search_window(self, key: tuple) -> Optional[Tuple[TrackState, Tuple[int, int, int, int]]]:
+        """
+        Returns the last state and the predicted search window (x0, y0, x1, y1) in
+        absolute screen coordinates, or None if the template has no track yet.
+        """
+        with self._lock:
+            state = self._states.get(key)
+            if state is None:
+                self.cold += 1
+                return None
+            px = state.x + state.dx; py = state.y + state.dy
+            mx = self.margin + abs(state.dx); my = self.margin + abs(state.dy)
+            return state, (px - mx, py - my, px + state.w + mx, py + state.h + my)
+
+    def get_last_scale(self, key: tuple) -> Optional[float]:
+        """The scale of the template's last match, used to order the full search."""
+        with self._lock:
+            state = self._states.get(key)
+            return state.scale if state else None
+
+    def record_hit(self, key: tuple, match: Tuple[int, int, int, int, float], scale: float, tracked: bool):
+        """
+        Stores a new match. `tracked` is True when it came from the local check;
+        only then is the movement kept as motion (a full-search re-acquisition
+        may be a jump, not motion).
+        """
+        x, y, w, h, _ = match
+        with self._lock:
+            previous = self._states.get(key)
+            if tracked:
+                self.hits += 1
+                dx = x - previous.x if previous else 0; dy = y - previous.y if previous else 0
+            else:
+                dx = dy = 0
+            self._states[key] = TrackState(x=x, y=y, w=w, h=h, scale=scale, dx=dx, dy=dy)
+
+    def record_miss(self):
+        with self._lock: self.misses += 1
+
+    def forget(self, key: Optional[tuple] = None):
+        """Drops the track of one template, or of all templates if no key is given."""
+        with self._lock:
+            if key is None: self._states.clear()
+            else: self._states.pop(key, None)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "cold": self.cold, "tracked_templates": len(self._states)}
+
+    def reset_stats(self):
+        with self._lock: self.hits = self.misses = self.cold = 0
+
+
+# Shared tracker used by object_detector
+tracker = TemplateTracker()